@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Booking, Expense
+from .ledger import set_total
+from .models import Booking, BookingBalance, Expense, OutboundEmail, Payment
 
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
@@ -11,4 +12,52 @@ class BookingAdmin(admin.ModelAdmin):
 @admin.register(Expense)
 class ExpenseAdmin(admin.ModelAdmin):
     list_display = ['function_date', 'advance', 'balance', 'total']
-    ordering = ['-function_date']
\ No newline at end of file
+    ordering = ['-function_date']
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ['id', 'subject', 'to', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['status']
+    search_fields = ['to', 'subject']
+    ordering = ['-created_at']
+
+class LedgerDeleteMixin:
+    """
+    Ledger rows are never deleted on their own, only along with their
+    booking: delete is refused on this model's own admin pages and left to
+    the normal permission check when a booking delete cascades to them.
+    """
+    def has_delete_permission(self, request, obj=None):
+        match = request.resolver_match
+        own_view = f'{self.opts.app_label}_{self.opts.model_name}_'
+        if match is not None and (match.url_name or '').startswith(own_view):
+            return False
+        return super().has_delete_permission(request, obj)
+
+@admin.register(Payment)
+class PaymentAdmin(LedgerDeleteMixin, admin.ModelAdmin):
+    list_display = ['id', 'booking', 'amount', 'reference', 'created_at']
+    search_fields = ['reference']
+    ordering = ['-created_at']
+
+    # The ledger is append-only; payments come in through the API
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(BookingBalance)
+class BookingBalanceAdmin(LedgerDeleteMixin, admin.ModelAdmin):
+    list_display = ['booking', 'total_amount', 'paid_amount', 'payment_count', 'updated_at']
+    fields = ['booking', 'total_amount', 'paid_amount', 'payment_count', 'updated_at']
+    readonly_fields = ['paid_amount', 'payment_count', 'updated_at']
+    raw_id_fields = ['booking']
+    ordering = ['-updated_at']
+
+    def get_readonly_fields(self, request, obj=None):
+        return self.readonly_fields + (['booking'] if obj else [])
+
+    def save_model(self, request, obj, form, change):
+        # Only the price is staff-edited; a full save could overwrite a concurrent payment
+        set_total(obj.booking_id, obj.total_amount)
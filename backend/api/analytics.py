@@ -0,0 +1,273 @@
+"""
+Hall utilization and revenue analytics for the dashboard.
+
+Each report pulls its columns with one ``values_list`` query per table
+(bookings, expenses) and does the arithmetic on NumPy arrays: day occupancy
+from a difference array over booking spans, and group sums with
+``bincount``. Nothing loops over rows in Python. Figures cover approved
+bookings. A report is cached per period under a version token that booking
+and expense writes replace (see ``cache_versions``).
+"""
+import calendar
+from datetime import date
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Q
+from django.db.models.functions import TruncDate
+
+from .cache_versions import bump_versions, current_version
+from .models import Booking, Expense
+
+CACHE_TIMEOUT = 24 * 60 * 60
+VERSION_KEY = 'analytics:version'
+REPORT_KEY = 'analytics:{}:{}:{}'
+
+# Lower bounds of the estimated_guests buckets; the last is open-ended
+GUEST_BUCKETS = (0, 50, 100, 200, 300, 500, 1000)
+
+DAY = np.timedelta64(1, 'D')
+
+
+def invalidate_analytics():
+    bump_versions(VERSION_KEY)
+
+
+def _money(value):
+    return f"{value:.2f}"
+
+
+def _stats(values):
+    """Count, mean, median and 90th percentile of a 1-D array (None when empty)."""
+    if not values.size:
+        return {"count": 0, "mean": None, "median": None, "p90": None}
+    median, p90 = np.percentile(values, [50, 90])
+    return {
+        "count": int(values.size),
+        "mean": round(float(values.mean()), 1),
+        "median": round(float(median), 1),
+        "p90": round(float(p90), 1),
+    }
+
+
+def _month_label(month):
+    """``numpy.datetime64`` month → ``(year, month)``."""
+    value = month.astype(object)
+    return value.year, value.month
+
+
+def _booking_columns(first_day, last_day):
+    """Approved bookings overlapping the period, as arrays (None when there are none)."""
+    bookings = Booking.objects.filter(status='approved', from_date__isnull=False)
+    if last_day:
+        bookings = bookings.filter(from_date__lte=last_day)
+    if first_day:
+        bookings = bookings.filter(Q(to_date__gte=first_day) | Q(to_date__isnull=True, from_date__gte=first_day))
+    rows = list(
+        bookings.annotate(created_day=TruncDate('created_at'))
+        .values_list('from_date', 'to_date', 'event_type', 'estimated_guests', 'created_day')
+    )
+    if not rows:
+        return None
+    from_dates, to_dates, event_types, guests, created = zip(*rows)
+    start = np.array(from_dates, dtype='datetime64[D]')
+    to = np.array(to_dates, dtype='datetime64[D]')  # None → NaT
+    return {
+        "start": start,
+        "end": np.where(np.isnat(to), start, np.maximum(to, start)),
+        "event_type": np.array(event_types, dtype=object),
+        "guests": np.array(guests, dtype=float),    # None → nan
+        "created": np.array(created, dtype='datetime64[D]'),
+    }
+
+
+def _expense_columns(first_day, last_day):
+    expenses = Expense.objects.all()
+    if first_day:
+        expenses = expenses.filter(function_date__gte=first_day)
+    if last_day:
+        expenses = expenses.filter(function_date__lte=last_day)
+    rows = list(expenses.values_list('function_date', 'total', *Expense.INCOME_FIELDS))
+    if not rows:
+        return None
+    columns = np.array(rows, dtype=object)
+    return {
+        "day": columns[:, 0].astype('datetime64[D]'),
+        "costs": columns[:, 1].astype(float),
+        "income": columns[:, 2:].astype(float).sum(axis=1),
+    }
+
+
+def _month_end(day):
+    return day.replace(day=calendar.monthrange(day.year, day.month)[1])
+
+
+def _period(first_day, last_day, bookings, expenses):
+    """
+    Fill open ends of the period from the data, widened to whole months. A
+    supplied bound is kept; when the data lies wholly on the other side of
+    it (or there is none), the open end becomes that bound's month.
+    """
+    starts, ends = [], []
+    if bookings is not None:
+        starts.append(bookings["start"].min())
+        ends.append(bookings["end"].max())
+    if expenses is not None:
+        starts.append(expenses["day"].min())
+        ends.append(expenses["day"].max())
+    if first_day is None:
+        first_day = min(starts).astype(object).replace(day=1) if starts else None
+        if last_day is not None and (first_day is None or first_day > last_day):
+            first_day = last_day.replace(day=1)
+    if last_day is None:
+        last_day = _month_end(max(ends).astype(object)) if ends else None
+        if first_day is not None and (last_day is None or last_day < first_day):
+            last_day = _month_end(first_day)
+    return first_day, last_day
+
+
+def _occupancy(bookings, first_day, last_day):
+    days = np.arange(np.datetime64(first_day), np.datetime64(last_day) + DAY)
+    occupied = np.zeros(days.size, dtype=bool)
+    if bookings is not None:
+        # +1 where a booking starts, -1 the day after it ends; a running sum > 0 is a booked day
+        first = np.datetime64(first_day)
+        starts = np.clip((bookings["start"] - first) // DAY, 0, days.size)
+        ends = np.clip((bookings["end"] - first) // DAY + 1, 0, days.size)
+        marks = np.zeros(days.size + 1, dtype=np.int64)
+        np.add.at(marks, starts, 1)
+        np.add.at(marks, ends, -1)
+        occupied = np.cumsum(marks[:-1]) > 0
+
+    months, month_index = np.unique(days.astype('datetime64[M]'), return_inverse=True)
+    month_days = np.bincount(month_index)
+    month_booked = np.bincount(month_index, weights=occupied).astype(int)
+    # 1970-01-01 was a Thursday; shift so Monday is 0 like date.weekday()
+    weekday = (days.astype(np.int64) + 3) % 7
+    weekday_days = np.bincount(weekday, minlength=7)
+    weekday_booked = np.bincount(weekday, weights=occupied, minlength=7).astype(int)
+
+    def rate(booked, total):
+        return round(float(booked) / float(total), 4) if total else None
+
+    return {
+        "days": int(days.size),
+        "occupied_days": int(occupied.sum()),
+        "rate": rate(occupied.sum(), days.size),
+        "months": [
+            {"year": year, "month": month, "days": int(total), "occupied_days": int(booked), "rate": rate(booked, total)}
+            for (year, month), total, booked in zip(map(_month_label, months), month_days, month_booked)
+        ],
+        "weekdays": [
+            {"weekday": calendar.day_name[day], "days": int(weekday_days[day]),
+             "occupied_days": int(weekday_booked[day]), "rate": rate(weekday_booked[day], weekday_days[day])}
+            for day in range(7)
+        ],
+    }
+
+
+def _in_period(bookings, first_day, last_day):
+    """Mask of bookings whose event starts inside the period."""
+    return (bookings["start"] >= np.datetime64(first_day)) & (bookings["start"] <= np.datetime64(last_day))
+
+
+def _lead_time(bookings, first_day, last_day):
+    if bookings is None:
+        return {**_stats(np.array([])), "months": []}
+    chosen = _in_period(bookings, first_day, last_day) & ~np.isnat(bookings["created"])
+    start = bookings["start"][chosen]
+    lead = ((start - bookings["created"][chosen]) // DAY).astype(float)
+
+    months, month_index = np.unique(start.astype('datetime64[M]'), return_inverse=True)
+    counts = np.bincount(month_index)
+    sums = np.bincount(month_index, weights=lead)
+    return {
+        **_stats(lead),
+        "months": [
+            {"year": year, "month": month, "count": int(count), "mean": round(float(total / count), 1)}
+            for (year, month), count, total in zip(map(_month_label, months), counts, sums)
+        ],
+    }
+
+
+def _guests(bookings, first_day, last_day):
+    labels = [f"{low}-{high - 1}" for low, high in zip(GUEST_BUCKETS, GUEST_BUCKETS[1:])] + [f"{GUEST_BUCKETS[-1]}+"]
+    if bookings is None:
+        return {**_stats(np.array([])), "buckets": [{"range": label, "count": 0} for label in labels],
+                "event_types": []}
+    chosen = _in_period(bookings, first_day, last_day) & ~np.isnan(bookings["guests"])
+    guests = bookings["guests"][chosen]
+    bucket = np.searchsorted(GUEST_BUCKETS, guests, side='right') - 1
+    bucket_counts = np.bincount(bucket[bucket >= 0], minlength=len(GUEST_BUCKETS))
+
+    types, type_index = np.unique(bookings["event_type"][chosen].astype(str), return_inverse=True)
+    type_counts = np.bincount(type_index, minlength=types.size)
+    type_sums = np.bincount(type_index, weights=guests, minlength=types.size)
+    return {
+        **_stats(guests),
+        "buckets": [{"range": label, "count": int(count)} for label, count in zip(labels, bucket_counts)],
+        "event_types": [
+            {"event_type": str(name), "count": int(count), "mean": round(float(total / count))}
+            for name, count, total in zip(types, type_counts, type_sums)
+        ],
+    }
+
+
+def _expense_trends(expenses):
+    if expenses is None:
+        return {"functions": 0, "months": [], "cost_per_function_trend": None}
+    months, month_index = np.unique(expenses["day"].astype('datetime64[M]'), return_inverse=True)
+    functions = np.bincount(month_index)
+    costs = np.bincount(month_index, weights=expenses["costs"])
+    income = np.bincount(month_index, weights=expenses["income"])
+    per_function = costs / functions
+
+    # Least-squares change in cost per function per calendar month
+    trend = None
+    if months.size > 1:
+        month_numbers = months.astype(np.int64).astype(float)
+        trend = _money(np.polyfit(month_numbers, per_function, 1)[0])
+    return {
+        "functions": int(functions.sum()),
+        "months": [
+            {"year": year, "month": month, "functions": int(count), "costs": _money(cost),
+             "income": _money(earned), "cost_per_function": _money(cost / count),
+             "net_per_function": _money((earned - cost) / count)}
+            for (year, month), count, cost, earned in zip(map(_month_label, months), functions, costs, income)
+        ],
+        "cost_per_function_trend": trend,
+    }
+
+
+def _build(first_day, last_day):
+    bookings = _booking_columns(first_day, last_day)
+    expenses = _expense_columns(first_day, last_day)
+    first_day, last_day = _period(first_day, last_day, bookings, expenses)
+    if first_day is None:
+        # No bounds and no data
+        first_day = last_day = date.today()
+    return {
+        "from": first_day.isoformat(),
+        "to": last_day.isoformat(),
+        "occupancy": _occupancy(bookings, first_day, last_day),
+        "lead_time": _lead_time(bookings, first_day, last_day),
+        "guests": _guests(bookings, first_day, last_day),
+        "expense_trends": _expense_trends(expenses),
+    }
+
+
+def analytics_report(first_day=None, last_day=None):
+    """
+    Utilization and revenue figures for the period (open ends extend to the
+    first/last month with data): day occupancy per month and weekday, lead
+    time from request to event, guest counts, and expenses per function.
+    Raises ValueError when the period ends before it starts.
+    """
+    if first_day and last_day and last_day < first_day:
+        raise ValueError("range ends before it starts")
+    key = REPORT_KEY.format(current_version(VERSION_KEY), first_day, last_day)
+    report = cache.get(key)
+    if report is None:
+        report = _build(first_day, last_day)
+        cache.set(key, report, CACHE_TIMEOUT)
+    return report
@@ -0,0 +1,135 @@
+"""
+Async variants of the I/O-bound endpoints, routed instead of their sync
+counterparts in ``views`` when the app runs under ASGI (``settings.ASGI_MODE``).
+
+Each returns the same payload, status codes and caching headers as the sync
+view it replaces. Work that only has a sync API (the cache-backed calendar
+feed, the in-process availability index, the payment gateway) runs through
+``sync_to_async``; the dashboard query uses the async ORM. Streaming exports
+keep their sync views and get their body pulled through ``async_chunks``, so
+the event loop stays free while a large file is generated.
+"""
+import json
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponseNotAllowed, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from . import views
+from .availability import availability_index, slot_params
+from .calendar import CalendarFeed, calendar_window
+from .occupancy import occupancy_map, search_params
+from .stats import adashboard_summary, month_range
+from .streaming import async_chunks
+
+# DRF's JSONRenderer output, so both variants send the same bytes
+JSON_PARAMS = {'separators': (',', ':'), 'ensure_ascii': False}
+
+
+def allow_methods(*methods):
+    """``require_http_methods`` for async views (Django's own is sync-only before 5.0)."""
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return HttpResponseNotAllowed(methods)
+            return await view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, safe=False, json_dumps_params=JSON_PARAMS)
+
+
+def error(message, status=400):
+    return json_response({"error": message}, status=status)
+
+
+@allow_methods('GET')
+async def booking_dates(request):
+    """Async ``views.booking_dates``; the feed's cache lookups run in a thread."""
+    try:
+        start_day, end_day = calendar_window(request.GET.get('start'), request.GET.get('end'))
+    except ValueError:
+        return error(views.CALENDAR_PARAMS_ERROR)
+
+    feed = await sync_to_async(CalendarFeed)(start_day, end_day)
+    not_modified = get_conditional_response(request, etag=feed.etag, last_modified=feed.last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    response = json_response(await sync_to_async(feed.events)())
+    response['ETag'] = feed.etag
+    response['Last-Modified'] = http_date(feed.last_modified)
+    patch_cache_control(response, public=True, no_cache=True)
+    return response
+
+
+@allow_methods('GET')
+async def availability_check(request):
+    """Async ``views.availability_check``; the index may reload from the DB, so it runs in a thread."""
+    try:
+        from_date, to_date, start_time, end_time = slot_params(request.GET)
+    except ValueError:
+        return error(views.AVAILABILITY_PARAMS_ERROR)
+    if to_date < from_date:
+        return error("to_date cannot be before from_date.")
+
+    available = await sync_to_async(availability_index.is_free)(from_date, to_date, start_time, end_time)
+    return json_response({"available": available})
+
+
+@allow_methods('GET')
+async def availability_search(request):
+    """Async ``views.availability_search``; the map may reload from the DB, so it runs in a thread."""
+    try:
+        params = search_params(request.GET)
+    except ValueError:
+        return error(views.SEARCH_PARAMS_ERROR)
+    return json_response(await sync_to_async(occupancy_map.search)(*params))
+
+
+@allow_methods('GET')
+async def dashboard_stats(request):
+    """Async ``views.dashboard_stats`` on the async ORM."""
+    try:
+        first_day, last_day = month_range(
+            request.GET.get('year'), request.GET.get('from'), request.GET.get('to')
+        )
+    except ValueError:
+        return error(views.STATS_PARAMS_ERROR)
+    return json_response(await adashboard_summary(first_day, last_day))
+
+
+@allow_methods('POST')
+async def create_payment_intent(request):
+    """Async ``views.create_payment_intent``; the booking lookup and gateway call run in a thread."""
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return error("Request body must be JSON.")
+    payload, status = await sync_to_async(views.payment_intent_response)(data, request.headers)
+    return json_response(payload, status=status)
+
+
+# Same exemption @api_view gives the sync view (it has no session auth to protect)
+create_payment_intent.csrf_exempt = True
+
+
+def streamed(view):
+    """Run a sync streaming view in a thread and stream its body without buffering it."""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        response = await sync_to_async(view)(request, *args, **kwargs)
+        if response.streaming and not response.is_async:
+            response.streaming_content = async_chunks(response.streaming_content)
+        return response
+    return wrapper
+
+
+export_bookings_csv = streamed(views.export_bookings_csv)
+export_expenses = streamed(views.export_expenses)
+bulk_receipts = streamed(views.bulk_receipts)
@@ -0,0 +1,151 @@
+"""
+Hall availability checks.
+
+A booking occupies a half-open ``[start, end)`` span: a single-day booking with a
+valid time window holds just that window, anything else holds whole days. Only
+approved bookings block the hall.
+"""
+import threading
+import time
+from bisect import bisect_left
+from collections import namedtuple
+from datetime import datetime, time as dtime, timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+
+from .models import Booking
+
+Span = namedtuple('Span', ['start', 'end', 'booking_id'])
+
+
+def is_timed(from_date, to_date, start_time, end_time):
+    """True when the booking holds only a time window on a single day."""
+    return bool(
+        from_date
+        and (to_date is None or to_date == from_date)
+        and start_time and end_time
+        and start_time < end_time
+    )
+
+
+def booking_span(from_date, to_date, start_time, end_time):
+    """Return the ``(start, end)`` datetimes a booking occupies, or None without a date."""
+    if from_date is None:
+        return None
+    if is_timed(from_date, to_date, start_time, end_time):
+        return datetime.combine(from_date, start_time), datetime.combine(from_date, end_time)
+    last_day = to_date or from_date
+    return datetime.combine(from_date, dtime.min), datetime.combine(last_day + timedelta(days=1), dtime.min)
+
+
+def slot_params(params):
+    """
+    Read ``from_date`` (required), ``to_date``, ``start_time`` and ``end_time``
+    from query params; raises ValueError when one is missing or malformed.
+    """
+    if not params.get('from_date'):
+        raise ValueError("from_date is required")
+    from_date = datetime.strptime(params['from_date'], '%Y-%m-%d').date()
+    to_date_str = params.get('to_date')
+    to_date = datetime.strptime(to_date_str, '%Y-%m-%d').date() if to_date_str else from_date
+    start_str, end_str = params.get('start_time'), params.get('end_time')
+    start_time = dtime.fromisoformat(start_str) if start_str else None
+    end_time = dtime.fromisoformat(end_str) if end_str else None
+    return from_date, to_date, start_time, end_time
+
+
+def overlap_filter(from_date, to_date, start_time, end_time):
+    """Q matching approved bookings whose span overlaps the given booking's span."""
+    to_date = to_date or from_date
+    query = (
+        Q(status='approved', from_date__lte=to_date)
+        & (Q(to_date__gte=from_date) | Q(to_date__isnull=True, from_date__gte=from_date))
+    )
+    if is_timed(from_date, to_date, start_time, end_time):
+        # Against another timed booking on the same day only the hours matter
+        query &= (
+            Q(from_date__lt=from_date)
+            | Q(to_date__gt=from_date)
+            | Q(start_time__isnull=True)
+            | Q(end_time__isnull=True)
+            | Q(start_time__gte=F('end_time'))
+            | Q(start_time__lt=end_time, end_time__gt=start_time)
+        )
+    return query
+
+
+def find_conflict(from_date, to_date, start_time, end_time, exclude_pk=None):
+    """Return the first approved booking clashing with the given slot, in one query."""
+    conflicts = Booking.objects.filter(overlap_filter(from_date, to_date, start_time, end_time))
+    if exclude_pk:
+        conflicts = conflicts.exclude(pk=exclude_pk)
+    return conflicts.only('id', 'event_type', 'from_date').order_by('from_date', 'id').first()
+
+
+class AvailabilityIndex:
+    """
+    In-process interval index over approved bookings.
+
+    Spans are kept sorted by start with a running maximum of end times, so an
+    overlap lookup is a binary search plus a short backwards walk. The index is
+    rebuilt lazily after ``invalidate()`` (booking save/delete signals) or once
+    it is older than ``AVAILABILITY_INDEX_TTL`` seconds, which bounds how stale
+    it can get when another worker process changed a booking.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spans = None
+        self._starts = []
+        self._max_ends = []
+        self._built_at = 0.0
+
+    def invalidate(self):
+        with self._lock:
+            self._spans = None
+
+    def _build(self):
+        rows = Booking.objects.filter(status='approved', from_date__isnull=False).values_list(
+            'id', 'from_date', 'to_date', 'start_time', 'end_time'
+        )
+        spans = []
+        for booking_id, from_date, to_date, start_time, end_time in rows:
+            start, end = booking_span(from_date, to_date, start_time, end_time)
+            spans.append(Span(start, end, booking_id))
+        spans.sort()
+
+        max_ends, running = [], datetime.min
+        for span in spans:
+            running = max(running, span.end)
+            max_ends.append(running)
+
+        self._spans = spans
+        self._starts = [span.start for span in spans]
+        self._max_ends = max_ends
+        self._built_at = time.monotonic()
+
+    def _ensure_built(self):
+        ttl = getattr(settings, 'AVAILABILITY_INDEX_TTL', 60)
+        if self._spans is None or time.monotonic() - self._built_at > ttl:
+            self._build()
+
+    def conflicts(self, start, end, exclude_pk=None):
+        """Return the first indexed span overlapping ``[start, end)``, or None."""
+        with self._lock:
+            self._ensure_built()
+            spans, max_ends = self._spans, self._max_ends
+            i = bisect_left(self._starts, end) - 1
+            while i >= 0 and max_ends[i] > start:
+                span = spans[i]
+                if span.end > start and span.booking_id != exclude_pk:
+                    return span
+                i -= 1
+        return None
+
+    def is_free(self, from_date, to_date=None, start_time=None, end_time=None, exclude_pk=None):
+        span = booking_span(from_date, to_date, start_time, end_time)
+        return span is None or self.conflicts(*span, exclude_pk=exclude_pk) is None
+
+
+availability_index = AvailabilityIndex()
@@ -0,0 +1,133 @@
+"""Helpers shared by the ``bench_*`` management commands."""
+import shutil
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import date, time as dtime, timedelta
+from decimal import Decimal
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from rest_framework.test import APIClient
+
+from .availability import availability_index
+from .models import Booking, Expense
+from .occupancy import occupancy_map
+from .receipts import receipt_cache
+
+
+@contextmanager
+def isolated_database():
+    """Run the block against a throwaway test database, never the real one."""
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def seed_bookings(count, start_id=1, batch_size=1000):
+    """Bulk insert ``count`` one-day bookings with consecutive IDs."""
+    first_day = date(2020, 1, 1)
+    event_types = ['Wedding', 'Reception', 'Engagement', 'Birthday', 'Corporate']
+    statuses = ['approved', 'pending', 'rejected']
+    bookings = []
+    for offset in range(count):
+        day = first_day + timedelta(days=offset)
+        bookings.append(Booking(
+            id=start_id + offset,
+            name=f"Guest {offset}",
+            phone="9800000000",
+            event_type=event_types[offset % len(event_types)],
+            from_date=day,
+            to_date=day,
+            start_time=dtime(9, 0),
+            end_time=dtime(21, 0),
+            status=statuses[offset % len(statuses)],
+            estimated_guests=100 + offset % 400,
+        ))
+    Booking.objects.bulk_create(bookings, batch_size=batch_size)
+
+
+def seed_expenses(count, batch_size=1000):
+    """Bulk insert ``count`` expense rows, one per day from 2020-01-01."""
+    first_day = date(2020, 1, 1)
+    expenses = []
+    for offset in range(count):
+        amount = Decimal(500 + offset % 2000)
+        expenses.append(Expense(
+            function_date=first_day + timedelta(days=offset),
+            advance=amount * 10,
+            gens=amount,
+            light=amount / 2,
+            electrician=Decimal(300),
+            total=amount + amount / 2 + Decimal(300),
+        ))
+    Expense.objects.bulk_create(expenses, batch_size=batch_size)
+
+
+def api_client():
+    """An API client for the benchmark user, authenticated for every view."""
+    user, _ = get_user_model().objects.get_or_create(username='benchmark')
+    client = APIClient(HTTP_HOST='localhost')
+    client.force_authenticate(user)
+    return client
+
+
+def drain(response):
+    """Consume a streamed body, so the work done while streaming is included."""
+    if not response.streaming:
+        return
+    if response.is_async:
+        async_to_sync(_adrain)(response.streaming_content)
+    else:
+        for _ in response.streaming_content:
+            pass
+
+
+async def _adrain(chunks):
+    async for _ in chunks:
+        pass
+
+
+def clear_caches():
+    """Drop the cached read models and in-process indexes, so the next request runs cold."""
+    cache.clear()
+    availability_index.invalidate()
+    occupancy_map.invalidate()
+
+
+@contextmanager
+def scratch_receipt_cache():
+    """Point the receipt cache at a temporary directory for the duration of the block."""
+    original = receipt_cache.directory
+    receipt_cache.directory = tempfile.mkdtemp(prefix='receipts-')
+    try:
+        yield
+    finally:
+        shutil.rmtree(receipt_cache.directory, ignore_errors=True)
+        receipt_cache.directory = original
+
+
+def timed(func, repeat):
+    """Call ``func`` ``repeat`` times and return the latencies in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        'runs': len(ordered),
+        'mean_ms': round(statistics.fmean(ordered), 3),
+        'p50_ms': round(ordered[len(ordered) // 2], 3),
+        'p99_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))], 3),
+    }
@@ -0,0 +1,39 @@
+"""
+Version tokens for cached read models (calendar months, the expense summary,
+dashboard analytics).
+
+Cached entries are keyed by a random token that writers replace, so one
+``cache.set`` retires every entry built under the old token. With the
+default per-process cache a write only replaces the token in the process
+that made it, so tokens expire after ``CACHE_VERSION_TTL`` seconds and other
+workers (and the web process after a management command) catch up within
+that window, as the availability index does. With a shared cache
+(``REDIS_URL``) every worker sees the new token at once and tokens live long.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def current_versions(keys):
+    """Token for each of ``keys``, creating the missing ones."""
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    for key in missing:
+        candidate = uuid.uuid4().hex
+        # Another worker may have just set one; use whichever won
+        if cache.add(key, candidate, settings.CACHE_VERSION_TTL):
+            found[key] = candidate
+        else:
+            found[key] = cache.get(key, candidate)
+    return found
+
+
+def current_version(key):
+    return current_versions([key])[key]
+
+
+def bump_versions(*keys):
+    """Replace the tokens, retiring everything cached under the old ones."""
+    cache.set_many({key: uuid.uuid4().hex for key in keys}, settings.CACHE_VERSION_TTL)
@@ -0,0 +1,156 @@
+"""
+Cached availability calendar feed for ``bookings/dates/``.
+
+Events are cached per calendar month. Each month has a random version token
+that is replaced whenever a booking touching that month changes, so a change
+rebuilds only the affected months, and the ETag (derived from the tokens)
+lets browsers revalidate with a 304 without any events being built. Tokens
+expire after ``CACHE_VERSION_TTL`` (see ``cache_versions``), which bounds how
+long a worker that did not see a change keeps serving the old months.
+"""
+import hashlib
+import time
+from datetime import date, datetime, time as dtime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+from .cache_versions import bump_versions, current_versions
+from .models import Booking
+
+# Statuses shown as occupied on the public calendar
+FEED_STATUSES = ('pending', 'approved')
+
+DEFAULT_PAST_DAYS = 365
+DEFAULT_FUTURE_DAYS = 3 * 365
+MAX_WINDOW_DAYS = 6 * 366
+
+CACHE_TIMEOUT = 24 * 60 * 60
+VERSION_KEY = 'booking_dates:version:{}'
+EVENTS_KEY = 'booking_dates:events:{}:{}'
+MODIFIED_KEY = 'booking_dates:modified'
+
+
+def _parse_day(value):
+    # Calendar widgets send full ISO datetimes; only the date part matters here
+    return datetime.strptime(value[:10], '%Y-%m-%d').date()
+
+
+def calendar_window(start=None, end=None):
+    """Resolve the ``start``/``end`` query params into an inclusive date window."""
+    today = date.today()
+    start_day = _parse_day(start) if start else today - timedelta(days=DEFAULT_PAST_DAYS)
+    end_day = _parse_day(end) if end else today + timedelta(days=DEFAULT_FUTURE_DAYS)
+    if end_day < start_day:
+        raise ValueError("end cannot be before start")
+    return start_day, min(end_day, start_day + timedelta(days=MAX_WINDOW_DAYS))
+
+
+def months_between(start_day, end_day):
+    """Yield ``(year, month)`` for every month touching the window."""
+    year, month = start_day.year, start_day.month
+    while (year, month) <= (end_day.year, end_day.month):
+        yield year, month
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def _month_bounds(year, month):
+    first = date(year, month, 1)
+    next_first = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return first, next_first - timedelta(days=1)
+
+
+def _month_key(year, month):
+    return f"{year:04d}-{month:02d}"
+
+
+def build_event(event_type, from_date, to_date, start_time, end_time):
+    to_date = to_date or from_date
+    start_dt = datetime.combine(from_date, start_time or dtime.min)
+    end_dt = datetime.combine(to_date, end_time or dtime.max.replace(microsecond=0))
+    if end_dt <= start_dt:
+        end_dt = start_dt + timedelta(hours=1)
+    return {
+        "title": event_type or "Booking",
+        "start": start_dt.isoformat(),
+        "end": end_dt.isoformat(),
+    }
+
+
+def invalidate_months(*date_ranges):
+    """Bump the version of every month touched by the given ``(from_date, to_date)`` ranges."""
+    months = set()
+    for from_date, to_date in date_ranges:
+        if from_date:
+            months.update(months_between(from_date, to_date or from_date))
+    if not months:
+        return
+    bump_versions(*(VERSION_KEY.format(_month_key(*m)) for m in months))
+    cache.set(MODIFIED_KEY, int(time.time()), settings.CACHE_VERSION_TTL)
+
+
+class CalendarFeed:
+    """Events for one date window, assembled from per-month cache buckets."""
+
+    def __init__(self, start_day, end_day):
+        self.start_day = start_day
+        self.end_day = end_day
+        self.months = list(months_between(start_day, end_day))
+        self.versions = self._versions()
+
+        digest = hashlib.md5(f"{start_day}:{end_day}".encode())
+        for month in self.months:
+            digest.update(self.versions[month].encode())
+        self.etag = f'"{digest.hexdigest()}"'
+
+        modified = cache.get(MODIFIED_KEY)
+        if modified is None:
+            modified = int(time.time())
+            cache.add(MODIFIED_KEY, modified, settings.CACHE_VERSION_TTL)
+        self.last_modified = modified
+
+    def _versions(self):
+        keys = {VERSION_KEY.format(_month_key(*m)): m for m in self.months}
+        found = current_versions(list(keys))
+        return {month: found[key] for key, month in keys.items()}
+
+    def _event_key(self, month):
+        return EVENTS_KEY.format(_month_key(*month), self.versions[month])
+
+    def _build_months(self, months):
+        """Load every missing month with one query and cache each bucket."""
+        first_day = _month_bounds(*months[0])[0]
+        last_day = _month_bounds(*months[-1])[1]
+        rows = Booking.objects.filter(
+            Q(status__in=FEED_STATUSES, from_date__lte=last_day)
+            & (Q(to_date__gte=first_day) | Q(to_date__isnull=True, from_date__gte=first_day))
+        ).values_list('id', 'event_type', 'from_date', 'to_date', 'start_time', 'end_time')
+
+        buckets = {month: [] for month in months}
+        for booking_id, event_type, from_date, to_date, start_time, end_time in rows:
+            event = build_event(event_type, from_date, to_date, start_time, end_time)
+            for month in months_between(max(from_date, first_day), min(to_date or from_date, last_day)):
+                if month in buckets:
+                    buckets[month].append((booking_id, from_date, to_date or from_date, event))
+
+        cache.set_many({self._event_key(m): events for m, events in buckets.items()}, CACHE_TIMEOUT)
+        return buckets
+
+    def events(self):
+        keys = {self._event_key(m): m for m in self.months}
+        cached = cache.get_many(keys)
+        buckets = {keys[key]: events for key, events in cached.items()}
+
+        missing = [m for m in self.months if m not in buckets]
+        if missing:
+            buckets.update(self._build_months(missing))
+
+        seen, events = set(), []
+        for month in self.months:
+            for booking_id, from_date, to_date, event in buckets[month]:
+                if booking_id in seen or to_date < self.start_day or from_date > self.end_day:
+                    continue
+                seen.add(booking_id)
+                events.append(event)
+        return events
@@ -0,0 +1,93 @@
+"""
+Expense roll-ups for ``expenses/summary/``.
+
+One GROUP BY month over the ``function_date`` index sums every money column;
+category and overall totals are folded from those monthly rows in Python.
+Results are cached under a version token that any expense write replaces,
+so a write invalidates every cached range at once without knowing which
+ranges were cached. The token expires after ``CACHE_VERSION_TTL`` (see
+``cache_versions``), so workers that did not see the write catch up.
+"""
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+from .cache_versions import bump_versions, current_version
+from .models import Expense
+
+CACHE_TIMEOUT = 24 * 60 * 60
+VERSION_KEY = 'expenses:summary:version'
+SUMMARY_KEY = 'expenses:summary:{}:{}:{}'
+
+MONEY_FIELDS = Expense.INCOME_FIELDS + Expense.COST_FIELDS
+ZERO = Decimal('0.00')
+
+
+def _money(value):
+    return f"{(value or ZERO):.2f}"
+
+
+def invalidate_summary():
+    bump_versions(VERSION_KEY)
+
+
+def _monthly_rows(first_day, last_day):
+    expenses = Expense.objects.all()
+    if first_day:
+        expenses = expenses.filter(function_date__gte=first_day)
+    if last_day:
+        expenses = expenses.filter(function_date__lte=last_day)
+    return (
+        expenses.annotate(month=TruncMonth('function_date'))
+        .values('month')
+        .annotate(records=Count('id'), **{name: Sum(name) for name in MONEY_FIELDS})
+        .order_by('month')
+    )
+
+
+def _build(first_day, last_day):
+    months = []
+    categories = dict.fromkeys(MONEY_FIELDS, ZERO)
+    records = 0
+    for row in _monthly_rows(first_day, last_day):
+        income = sum((row[name] or ZERO for name in Expense.INCOME_FIELDS), ZERO)
+        costs = sum((row[name] or ZERO for name in Expense.COST_FIELDS), ZERO)
+        months.append({
+            "year": row['month'].year,
+            "month": row['month'].month,
+            "records": row['records'],
+            "income": _money(income),
+            "costs": _money(costs),
+            "net": _money(income - costs),
+            "categories": {name: _money(row[name]) for name in MONEY_FIELDS},
+        })
+        for name in MONEY_FIELDS:
+            categories[name] += row[name] or ZERO
+        records += row['records']
+
+    income = sum((categories[name] for name in Expense.INCOME_FIELDS), ZERO)
+    costs = sum((categories[name] for name in Expense.COST_FIELDS), ZERO)
+    return {
+        "months": months,
+        "categories": {name: _money(value) for name, value in categories.items()},
+        "records": records,
+        "income": _money(income),
+        "costs": _money(costs),
+        "net": _money(income - costs),
+    }
+
+
+def expense_summary(first_day=None, last_day=None):
+    """
+    Monthly profit and loss within the optional bounds: income
+    (``Expense.INCOME_FIELDS``), costs (``Expense.COST_FIELDS``, which make up
+    each row's ``total``), net, and per-category sums as decimal strings.
+    """
+    key = SUMMARY_KEY.format(current_version(VERSION_KEY), first_day, last_day)
+    summary = cache.get(key)
+    if summary is None:
+        summary = _build(first_day, last_day)
+        cache.set(key, summary, CACHE_TIMEOUT)
+    return summary
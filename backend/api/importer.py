@@ -0,0 +1,250 @@
+"""
+Bulk booking import from CSV, XLSX or JSON.
+
+Rows are validated field by field, then every approved row is checked for
+clashes by sweeping the batch and the stored approved bookings in start
+order, with one query for the stored side. Valid rows go in with ``bulk_create`` one chunk per transaction; the
+caches and counters that the per-booking signals would normally maintain are
+updated once for the whole import. A chunk the database's overlap guard
+rejects (a booking approved after the sweep) is retried row by row, so only
+the clashing rows are reported and every other row still goes in.
+"""
+import csv
+import heapq
+import io
+import json
+from collections import Counter
+from datetime import date, datetime, time as dtime
+from zipfile import BadZipFile
+
+from django.db import IntegrityError, transaction
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+from rest_framework.exceptions import ValidationError
+
+from .availability import availability_index, booking_span, overlap_filter
+from .analytics import invalidate_analytics
+from .calendar import invalidate_months
+from .models import ID_ALLOCATION_ATTEMPTS, Booking, FreeBookingId
+from .occupancy import booking_slot, occupancy_map
+from .overlap import OVERLAP_MESSAGE, is_overlap_error
+from .serializers import BookingImportSerializer
+from .stats import apply_delta, stat_key
+
+IMPORT_FORMATS = ('csv', 'xlsx', 'json')
+IMPORT_CHUNK_SIZE = 500
+CONFLICT_MESSAGE = OVERLAP_MESSAGE
+
+# Sweep event kinds; stored bookings sort ahead of batch rows that start at the same moment
+STORED, ROW = 0, 1
+
+
+class ImportFormatError(ValueError):
+    """The uploaded file could not be read as the requested format."""
+
+
+def detect_format(filename):
+    extension = (filename or '').rsplit('.', 1)[-1].lower()
+    if extension not in IMPORT_FORMATS:
+        raise ImportFormatError(f"Unsupported file type '.{extension}'. Use one of: {', '.join(IMPORT_FORMATS)}.")
+    return extension
+
+
+def _column(header):
+    """Map export headers ("From Date") and field names ("from_date") to the same key."""
+    return str(header or '').strip().lower().replace(' ', '_')
+
+
+def _cell(value):
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    if isinstance(value, datetime):
+        return value.date().isoformat() if value.time() == dtime.min else value.isoformat()
+    if isinstance(value, (date, dtime)):
+        return value.isoformat()
+    return value
+
+
+def _clean_row(row):
+    # Blank cells mean "not given", so serializer defaults apply; IDs are always allocated here
+    cleaned = {_column(key): _cell(value) for key, value in row.items()}
+    return {key: value for key, value in cleaned.items() if value is not None and key not in ('', 'id')}
+
+
+def read_rows(fileobj, fmt):
+    """Return the file's bookings as a list of plain dicts."""
+    if fmt not in IMPORT_FORMATS:
+        raise ImportFormatError(f"Unsupported format '{fmt}'.")
+    try:
+        if fmt == 'csv':
+            text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+            rows = list(csv.DictReader(text))
+        elif fmt == 'xlsx':
+            sheet = load_workbook(fileobj, read_only=True, data_only=True).active
+            values = sheet.iter_rows(values_only=True)
+            headers = next(values, ())
+            rows = [dict(zip(headers, record)) for record in values if any(cell is not None for cell in record)]
+        else:
+            rows = json.load(fileobj)
+    except (ValueError, csv.Error, OSError, BadZipFile, InvalidFileException) as e:
+        raise ImportFormatError(f"Could not read {fmt.upper()} file: {e}")
+    return normalize_rows(rows)
+
+
+def normalize_rows(records):
+    """Accept a list of booking dicts (or Django fixture records) and tidy their keys and cells."""
+    if isinstance(records, dict):
+        records = records.get('bookings')
+    if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+        raise ImportFormatError("Expected a list of booking objects.")
+    # Django fixtures wrap each record as {"model": ..., "pk": ..., "fields": {...}}
+    return [_clean_row(record.get('fields', record)) for record in records]
+
+
+def validate_rows(rows):
+    """Field-validate every row; returns ``(valid, errors)`` keyed by 1-based row number."""
+    serializer = BookingImportSerializer()
+    valid, errors = {}, {}
+    for number, row in enumerate(rows, start=1):
+        try:
+            valid[number] = serializer.run_validation(row)
+        except ValidationError as e:
+            errors[number] = e.detail
+    return valid, errors
+
+
+def sweep_conflicts(valid):
+    """
+    Find approved rows that clash with a stored approved booking or with
+    another approved row of the batch. Returns ``{row_number: message}``.
+
+    All spans are sorted by start once. The first pass walks stored and batch
+    spans together, so stored bookings always win; the second walks the
+    surviving rows, keeping the one that starts first (then the lower row
+    number) of any overlapping pair.
+    """
+    events = []
+    for number, data in valid.items():
+        if data.get('status') != 'approved':
+            continue
+        span = booking_span(data.get('from_date'), data.get('to_date'), data.get('start_time'), data.get('end_time'))
+        if span:
+            events.append((span[0], ROW, number, span[1]))
+    if not events:
+        return {}
+
+    first_day = min(start for start, *_ in events).date()
+    last_day = max(end for *_, end in events).date()
+    stored = Booking.objects.filter(overlap_filter(first_day, last_day, None, None)).values_list(
+        'id', 'from_date', 'to_date', 'start_time', 'end_time'
+    )
+    for booking_id, *dates in stored:
+        start, end = booking_span(*dates)
+        events.append((start, STORED, booking_id, end))
+    events.sort()
+
+    conflicts = {}
+    stored_reach, stored_id = datetime.min, None
+    open_rows = []  # heap of (end, row_number) for rows whose span has not ended yet
+    for start, kind, key, end in events:
+        while open_rows and open_rows[0][0] <= start:
+            heapq.heappop(open_rows)
+        if kind == STORED:
+            for _, number in open_rows:
+                conflicts[number] = f"{CONFLICT_MESSAGE} (booking {key})"
+            open_rows = []
+            if end > stored_reach:
+                stored_reach, stored_id = end, key
+        elif stored_reach > start:
+            conflicts[key] = f"{CONFLICT_MESSAGE} (booking {stored_id})"
+        else:
+            heapq.heappush(open_rows, (end, key))
+
+    kept_reach, kept_row = datetime.min, None
+    for start, kind, key, end in events:
+        if kind == STORED or key in conflicts:
+            continue
+        if kept_reach > start:
+            conflicts[key] = f"{CONFLICT_MESSAGE} (row {kept_row})"
+        else:
+            kept_reach, kept_row = end, key
+    return conflicts
+
+
+def _insert_rows(items):
+    for attempt in range(1, ID_ALLOCATION_ATTEMPTS + 1):
+        try:
+            with transaction.atomic():
+                ids = Booking._allocate_ids(len(items))
+                bookings = [Booking(id=booking_id, **data) for booking_id, (_, data) in zip(ids, items)]
+                Booking.objects.bulk_create(bookings)
+                record_import(bookings)
+            return bookings
+        except IntegrityError as e:
+            if is_overlap_error(e):
+                raise
+            # A concurrent insert took one of the IDs; drop any stale free IDs and retry
+            FreeBookingId.objects.filter(id__in=Booking.objects.filter(id__in=ids).values('id')).delete()
+            if attempt == ID_ALLOCATION_ATTEMPTS:
+                raise
+
+
+def _insert_chunk(items):
+    """Insert ``(row_number, data)`` items; returns ``(bookings, {row_number: message})``."""
+    try:
+        return _insert_rows(items), {}
+    except IntegrityError as e:
+        if not is_overlap_error(e):
+            raise
+    # A booking approved since the sweep clashes with some row of this chunk; find which
+    created, conflicts = [], {}
+    for item in items:
+        try:
+            created.extend(_insert_rows([item]))
+        except IntegrityError as e:
+            if not is_overlap_error(e):
+                raise
+            conflicts[item[0]] = CONFLICT_MESSAGE
+    return created, conflicts
+
+
+def record_import(bookings):
+    """What the post_save receivers would have done, once for the whole chunk."""
+    for key, count in Counter(stat_key(b.from_date, b.event_type, b.status) for b in bookings).items():
+        apply_delta(key, count)
+    transaction.on_commit(availability_index.invalidate)
+    transaction.on_commit(invalidate_analytics)
+    changes = [(b.id, booking_slot(b)) for b in bookings]
+    transaction.on_commit(lambda: occupancy_map.apply(changes))
+    transaction.on_commit(lambda: invalidate_months(*((b.from_date, b.to_date) for b in bookings)))
+
+
+def import_bookings(rows, dry_run=False):
+    """
+    Validate and insert ``rows``. Invalid rows are skipped and reported, the
+    rest are created. Returns ``{"received", "created", "ids", "errors"}`` where
+    ``errors`` lists ``{"row": n, "errors": {...}}`` in row order.
+    """
+    valid, errors = validate_rows(rows)
+    for number, message in sweep_conflicts(valid).items():
+        errors[number] = {'non_field_errors': [message]}
+        del valid[number]
+
+    created = []
+    if not dry_run:
+        items = sorted(valid.items())
+        for offset in range(0, len(items), IMPORT_CHUNK_SIZE):
+            bookings, conflicts = _insert_chunk(items[offset:offset + IMPORT_CHUNK_SIZE])
+            created.extend(bookings)
+            for number, message in conflicts.items():
+                errors[number] = {'non_field_errors': [message]}
+                del valid[number]
+
+    return {
+        'received': len(rows),
+        'created': len(created),
+        'valid': len(valid),
+        'ids': [booking.id for booking in created],
+        'errors': [{'row': number, 'errors': errors[number]} for number in sorted(errors)],
+    }
@@ -0,0 +1,101 @@
+"""
+Booking payments: the append-only ``Payment`` ledger and the
+``BookingBalance`` row that carries each booking's running totals.
+
+``record_payment`` is one INSERT into the ledger plus one ``F()`` UPDATE of
+the balance row in a single transaction — no read-modify-write, so
+concurrent payments for the same booking queue on the balance row's lock
+instead of losing each other's amounts. Booking reads join the balance row
+through ``BALANCE_COLUMNS`` rather than summing payments per booking.
+"""
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, CharField, DecimalField, F, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import BookingBalance, Payment
+
+# Largest amount a DecimalField(max_digits=12, decimal_places=2) column holds
+MAX_AMOUNT = Decimal('9999999999.99')
+
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+ZERO = Value(Decimal('0.00'), output_field=MONEY)
+
+_total = Coalesce(F('balance__total_amount'), ZERO, output_field=MONEY)
+_paid = Coalesce(F('balance__paid_amount'), ZERO, output_field=MONEY)
+
+# Booking annotations named like the BookingSerializer fields, for values() reads
+BALANCE_COLUMNS = {
+    'total_amount': _total,
+    'paid_amount': _paid,
+    'balance_due': _total - _paid,
+    # Same rule as BookingBalance.payment_status
+    'payment_status': Case(
+        When(balance__total_amount__gt=0, balance__paid_amount__gte=F('balance__total_amount'),
+             then=Value("Paid")),
+        When(balance__paid_amount__gt=0, then=Value("Advance Paid")),
+        default=Value("Pending"),
+        output_field=CharField(),
+    ),
+}
+
+
+def with_balance(queryset, columns):
+    """Annotate the booking ``queryset`` with whichever ``BALANCE_COLUMNS`` appear in ``columns``."""
+    wanted = {name: BALANCE_COLUMNS[name] for name in columns if name in BALANCE_COLUMNS}
+    return queryset.annotate(**wanted) if wanted else queryset
+
+
+def _upsert_balance(booking_id, changes, initial):
+    """Apply ``changes`` to the booking's balance row, or create it from ``initial`` on its first write."""
+    if BookingBalance.objects.filter(booking_id=booking_id).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            BookingBalance.objects.create(booking_id=booking_id, **initial)
+    except IntegrityError:
+        # A concurrent first write created it; apply ours on top
+        BookingBalance.objects.filter(booking_id=booking_id).update(**changes)
+
+
+def record_payment(booking_id, amount, reference=''):
+    """
+    Append a payment and add it to the booking's balance atomically.
+
+    Returns ``(payment, balance, created)``. A ``reference`` already in the
+    ledger for this booking (a retried webhook or client call) records
+    nothing and returns the original payment with ``created=False``.
+    """
+    if amount > MAX_AMOUNT:
+        raise ValueError("amount is too large")
+    with transaction.atomic():
+        try:
+            # The savepoint keeps the transaction usable when the reference is a repeat
+            with transaction.atomic(savepoint=bool(reference)):
+                payment = Payment.objects.create(booking_id=booking_id, amount=amount, reference=reference)
+        except IntegrityError:
+            if not reference:
+                raise
+            payment = Payment.objects.get(booking_id=booking_id, reference=reference)
+            return payment, BookingBalance.objects.get(booking_id=booking_id), False
+
+        _upsert_balance(
+            booking_id,
+            changes={
+                'paid_amount': F('paid_amount') + amount,
+                'payment_count': F('payment_count') + 1,
+                'updated_at': payment.created_at,
+            },
+            initial={'paid_amount': amount, 'payment_count': 1, 'updated_at': payment.created_at},
+        )
+        balance = BookingBalance.objects.get(booking_id=booking_id)
+    return payment, balance, True
+
+
+def set_total(booking_id, total_amount):
+    """Set the agreed price without touching the paid total a concurrent payment may be updating."""
+    with transaction.atomic():
+        changes = {'total_amount': total_amount, 'updated_at': timezone.now()}
+        _upsert_balance(booking_id, changes=changes, initial=changes)
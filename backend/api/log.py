@@ -0,0 +1,79 @@
+"""
+Logging pieces wired up in ``settings.LOGGING``.
+
+Records get the current request's correlation ID, are handed to a queue on
+the request thread, and are formatted as JSON and written by a background
+listener thread, so a slow stdout never blocks a request.
+"""
+import atexit
+import json
+import logging
+import queue
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+# Set per request by api.middleware.RequestIdMiddleware
+request_id = ContextVar('request_id', default='-')
+
+# Attributes every LogRecord has; anything else came in through ``extra=``
+RESERVED_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'request_id'}
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = request_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; ``extra=`` fields are included as top-level keys."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'request_id': getattr(record, 'request_id', '-'),
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in RESERVED_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class QueueStreamHandler(QueueHandler):
+    """
+    ``QueueHandler`` with its own listener thread writing to a stream.
+
+    Only the message interpolation happens on the calling thread (arguments
+    may change after the call returns); JSON encoding and the write happen on
+    the listener. A formatter set on this handler is used by the listener.
+    """
+
+    def __init__(self, stream=None):
+        super().__init__(queue.SimpleQueue())
+        self.target = logging.StreamHandler(stream)
+        self.listener = QueueListener(self.queue, self.target)
+        self.listener.start()
+        atexit.register(self._stop_listener)
+
+    def setFormatter(self, fmt):
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def _stop_listener(self):
+        if self.listener._thread is not None:
+            self.listener.stop()  # drains whatever is still queued
+
+    def close(self):
+        self._stop_listener()
+        self.target.close()
+        super().close()
@@ -0,0 +1,53 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from api.benchmarking import isolated_database, seed_bookings, summarize, timed
+from api.models import Booking, FreeBookingId
+
+
+def legacy_next_id():
+    """The previous allocator: load every ID and walk up from 1."""
+    existing_ids = set(Booking.objects.values_list('id', flat=True))
+    next_id = 1
+    while next_id in existing_ids:
+        next_id += 1
+    return next_id
+
+
+class Command(BaseCommand):
+    help = "Benchmark booking ID allocation and insert latency against table size."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000,100000',
+                            help="Comma-separated table sizes to measure.")
+        parser.add_argument('--inserts', type=int, default=50,
+                            help="Bookings inserted per table size.")
+
+    def handle(self, *args, **options):
+        sizes = [int(s) for s in options['sizes'].split(',')]
+        inserts = options['inserts']
+
+        with isolated_database():
+            self.stdout.write(f"{'rows':>8} {'legacy alloc p50':>18} {'alloc p50':>10} {'insert p50':>11} {'insert p99':>11}")
+            seeded = 0
+            for size in sizes:
+                seed_bookings(size - seeded, start_id=seeded + 1)
+                seeded = size
+
+                legacy = summarize(timed(legacy_next_id, 5))
+                alloc = summarize(timed(Booking._get_next_available_id, inserts))
+
+                def insert():
+                    Booking(name="Bench", phone="1", event_type="Wedding",
+                            from_date=date(1999, 1, 1), to_date=date(1999, 1, 1)).save()
+
+                created = timed(insert, inserts)
+                Booking.objects.filter(id__gt=size).delete()
+                FreeBookingId.objects.all().delete()  # the next round seeds over these IDs
+                insert_stats = summarize(created)
+
+                self.stdout.write(
+                    f"{size:>8} {legacy['p50_ms']:>16}ms {alloc['p50_ms']:>8}ms "
+                    f"{insert_stats['p50_ms']:>9}ms {insert_stats['p99_ms']:>9}ms"
+                )
@@ -0,0 +1,57 @@
+from datetime import date, datetime, time as dtime
+
+from django.core.management.base import BaseCommand
+from reportlab import rl_config
+
+from api.benchmarking import summarize, timed
+from api.receipts import render_receipt, status_badge_styles, watermark_image
+
+SAMPLE_CONTEXT = {
+    'booking': {
+        'id': 1, 'name': "Benchmark Guest", 'phone': "9800000000", 'email': "guest@example.com",
+        'address_line': "Kanchipuram", 'event_type': "Wedding",
+        'from_date': date(2025, 5, 1), 'to_date': date(2025, 5, 2),
+        'start_time': dtime(9, 0), 'end_time': dtime(21, 0),
+        'estimated_guests': 500, 'food_preference': "Veg",
+        'message': "Stage decoration and parking for 50 cars.", 'status': 'approved',
+    },
+    'receipt_number': "SVM-0001",
+    'issue_date': datetime(2025, 4, 1),
+    'admin_remarks': "Advance received.",
+}
+
+
+class Command(BaseCommand):
+    help = "Time receipt rendering with per-receipt asset loading versus the shared asset cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=30)
+
+    def handle(self, *args, **options):
+        runs = options['runs']
+
+        def cold_render():
+            # What every receipt used to pay: decode + fade the watermark, rebuild badge styles
+            watermark_image.cache_clear()
+            status_badge_styles.cache_clear()
+            render_receipt(SAMPLE_CONTEXT)
+
+        render_receipt(SAMPLE_CONTEXT)  # warm imports and fonts
+
+        # Previous behaviour also ASCII85-encoded every image stream
+        rl_config.useA85 = 1
+        try:
+            legacy = summarize(timed(cold_render, runs))
+        finally:
+            rl_config.useA85 = 0
+        cold = summarize(timed(cold_render, runs))
+
+        render_receipt(SAMPLE_CONTEXT)
+        warm = summarize(timed(lambda: render_receipt(SAMPLE_CONTEXT), runs))
+
+        self.stdout.write(f"{'':<22}{'mean':>10}{'p50':>10}{'p99':>10}")
+        rows = (("before (A85 + reload)", legacy), ("per-receipt assets", cold), ("cached assets", warm))
+        for label, result in rows:
+            self.stdout.write(
+                f"{label:<22}{result['mean_ms']:>8}ms{result['p50_ms']:>8}ms{result['p99_ms']:>8}ms"
+            )
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from api.benchmarking import isolated_database, seed_bookings, summarize, timed
+from api.models import Booking
+from api.serializers import BookingRowSerializer, BookingSerializer
+
+
+class Command(BaseCommand):
+    help = "Compare BookingSerializer against the values()-based read serializer for growing result sets."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000,100000',
+                            help="Comma-separated row counts to serialize.")
+        parser.add_argument('--runs', type=int, default=3)
+
+    def handle(self, *args, **options):
+        sizes = [int(s) for s in options['sizes'].split(',')]
+        runs = options['runs']
+
+        with isolated_database():
+            self.stdout.write(f"{'rows':>8} {'model p50':>12} {'rows p50':>12} {'speedup':>8} {'rows/s':>10}")
+            seeded = 0
+            for size in sizes:
+                seed_bookings(size - seeded, start_id=seeded + 1)
+                seeded = size
+                queryset = Booking.objects.order_by('-from_date', 'id')
+
+                def model_path():
+                    return BookingSerializer(list(queryset), many=True).data
+
+                def row_path():
+                    serializer = BookingRowSerializer()
+                    return serializer.many(queryset.values(*serializer.columns))
+
+                model = summarize(timed(model_path, runs))
+                rows = summarize(timed(row_path, runs))
+                self.stdout.write(
+                    f"{size:>8} {model['p50_ms']:>10}ms {rows['p50_ms']:>10}ms "
+                    f"{model['p50_ms'] / rows['p50_ms']:>7.1f}x {size / rows['p50_ms'] * 1000:>10.0f}"
+                )
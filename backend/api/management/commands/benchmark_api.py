@@ -0,0 +1,143 @@
+import json
+import platform
+import time
+from datetime import date, timedelta
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from api.benchmarking import (
+    api_client, drain, isolated_database, scratch_receipt_cache, seed_bookings, seed_expenses, summarize,
+)
+from api.stats import rebuild
+
+
+def endpoints(client, bookings):
+    """``(name, callable)`` pairs; each callable makes one request and returns the response."""
+    created = iter(range(10 ** 6))
+    first_free_day = date(2020, 1, 1) + timedelta(days=bookings + 1)
+
+    def create():
+        offset = next(created)
+        day = (first_free_day + timedelta(days=offset)).isoformat()
+        return client.post('/api/bookings/', {
+            'name': f"Bench {offset}", 'phone': "9800000000", 'event_type': "Wedding",
+            'from_date': day, 'to_date': day,
+        }, format='json')
+
+    def streamed(path):
+        # Streaming responses only do their work while the body is consumed
+        def request():
+            response = client.get(path)
+            drain(response)
+            return response
+        return request
+
+    receipt_id = max(1, bookings // 2)
+    rendered = iter(range(10 ** 6))
+    return [
+        ('bookings_list', lambda: client.get('/api/bookings/')),
+        ('bookings_list_page', lambda: client.get('/api/bookings/?page_size=50')),
+        ('bookings_create', create),
+        ('bookings_dates', lambda: client.get('/api/bookings/dates/')),
+        ('availability_search', lambda: client.get('/api/availability/search/?duration_days=3&limit=100')),
+        ('dashboard_stats', lambda: client.get('/api/dashboard-stats/')),
+        ('bookings_export_csv', streamed('/api/bookings/export/')),
+        ('booking_receipt_cached', streamed(f'/api/bookings/{receipt_id}/receipt/')),
+        ('booking_receipt_render', lambda: streamed(
+            f'/api/bookings/{receipt_id}/receipt/?receipt_number=BENCH-{next(rendered)}'
+        )()),
+        ('expenses_export_csv', streamed('/api/expenses/export/')),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway database and report latency percentiles and throughput for the main "
+        "API endpoints as JSON. Uses whatever database DATABASE_URL points at (SQLite or Postgres)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bookings', type=int, default=2000)
+        parser.add_argument('--expenses', type=int, default=1000)
+        parser.add_argument('--runs', type=int, default=30, help="Timed requests per endpoint.")
+        parser.add_argument('--warmup', type=int, default=2, help="Untimed requests per endpoint.")
+        parser.add_argument('--only', help="Comma-separated endpoint names to run.")
+        parser.add_argument('--output', help="Write the JSON report to this file instead of stdout.")
+        parser.add_argument('--baseline', help="Earlier JSON report to compare p50 latencies against.")
+        parser.add_argument('--tolerance', type=float, default=1.25,
+                            help="Fail when an endpoint's p50 exceeds the baseline by this factor.")
+
+    def handle(self, *args, **options):
+        with isolated_database(), scratch_receipt_cache():
+            seed_bookings(options['bookings'])
+            seed_expenses(options['expenses'])
+            rebuild()
+            client = api_client()
+
+            selected = endpoints(client, options['bookings'])
+            if options['only']:
+                wanted = set(options['only'].split(','))
+                unknown = wanted - {name for name, _ in selected}
+                if unknown:
+                    raise CommandError(f"Unknown endpoint(s): {', '.join(sorted(unknown))}")
+                selected = [(name, request) for name, request in selected if name in wanted]
+
+            results = {}
+            for name, request in selected:
+                results[name] = self.measure(name, request, options['runs'], options['warmup'])
+
+            report = {
+                'generated_at': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'bookings': options['bookings'],
+                'expenses': options['expenses'],
+                'runs': options['runs'],
+                'results': results,
+            }
+
+        text = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(text + '\n')
+            self.stderr.write(f"Wrote {options['output']}")
+        else:
+            self.stdout.write(text)
+
+        if options['baseline']:
+            self.compare(results, options['baseline'], options['tolerance'])
+
+    def compare(self, results, baseline_path, tolerance):
+        with open(baseline_path) as fh:
+            baseline = json.load(fh)['results']
+        regressions = []
+        for name, result in results.items():
+            if name not in baseline:
+                continue
+            ratio = result['p50_ms'] / max(baseline[name]['p50_ms'], 0.001)
+            self.stderr.write(f"{name:<24} {ratio:>5.2f}x baseline p50")
+            if ratio > tolerance:
+                regressions.append(name)
+        if regressions:
+            raise CommandError(f"p50 regressed beyond {tolerance}x: {', '.join(regressions)}")
+
+    def measure(self, name, request, runs, warmup):
+        for _ in range(warmup):
+            request()
+        samples = []
+        started = time.perf_counter()
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            response = request()
+            samples.append((time.perf_counter() - t0) * 1000)
+            if response.status_code >= 400:
+                raise CommandError(f"{name} returned HTTP {response.status_code}")
+        elapsed = time.perf_counter() - started
+        result = summarize(samples)
+        result['throughput_rps'] = round(runs / elapsed, 1)
+        self.stderr.write(f"{name:<24} p50 {result['p50_ms']:>9}ms  p99 {result['p99_ms']:>9}ms")
+        return result
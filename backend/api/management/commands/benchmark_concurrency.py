@@ -0,0 +1,189 @@
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.benchmarking import seed_bookings, seed_expenses, summarize
+from api.stats import rebuild
+
+# name → (method, path, JSON body)
+ENDPOINTS = {
+    'payment_intent': ('POST', '/api/create-payment-intent/', {'amount': 500}),
+    'bookings_dates': ('GET', '/api/bookings/dates/?start=2020-01-01&end=2020-12-31', None),
+    'dashboard_stats': ('GET', '/api/dashboard-stats/', None),
+    'availability_check': ('GET', '/api/availability/check/?from_date=2030-06-01', None),
+    'bookings_export': ('GET', '/api/bookings/export/', None),
+}
+
+READY_PATH = '/api/availability/check/?from_date=2030-01-01'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def server_command(kind, port, workers):
+    bind = f'127.0.0.1:{port}'
+    if kind == 'wsgi':
+        # Same worker class as the Procfile: one request per process at a time
+        return [sys.executable, '-m', 'gunicorn', 'project.wsgi',
+                '--bind', bind, '--workers', str(workers), '--log-level', 'warning']
+    return [sys.executable, '-m', 'uvicorn', 'project.asgi:application',
+            '--host', '127.0.0.1', '--port', str(port), '--workers', str(workers),
+            '--log-level', 'warning', '--no-access-log']
+
+
+def send(base_url, method, path, body):
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(base_url + path, data=data, method=method)
+    if data is not None:
+        request.add_header('Content-Type', 'application/json')
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            response.read()
+            status_code = response.status
+    except urllib.error.HTTPError as exc:
+        status_code = exc.code
+    except OSError:
+        status_code = 0
+    return (time.perf_counter() - started) * 1000, status_code
+
+
+class Command(BaseCommand):
+    help = (
+        "Start the app under gunicorn (WSGI) and uvicorn (ASGI) with the same number of "
+        "worker processes, fire concurrent requests at each, and report throughput and "
+        "latency per endpoint as JSON. Runs against a seeded SQLite file unless "
+        "--database-url is given; payments go to the stub gateway with --upstream-latency."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help="Worker processes per server.")
+        parser.add_argument('--concurrency', type=int, default=32, help="Requests in flight at once.")
+        parser.add_argument('--requests', type=int, default=300, help="Timed requests per endpoint and server.")
+        parser.add_argument('--upstream-latency', type=float, default=200,
+                            help="Milliseconds each stub payment gateway call takes.")
+        parser.add_argument('--bookings', type=int, default=2000)
+        parser.add_argument('--expenses', type=int, default=1000)
+        parser.add_argument('--database-url', help="Run against this database as is instead of seeding one.")
+        parser.add_argument('--only', help="Comma-separated endpoint names to run.")
+        parser.add_argument('--output', help="Write the JSON report to this file instead of stdout.")
+        # Internal: migrate and seed the database the servers will use
+        parser.add_argument('--prepare', action='store_true', help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['prepare']:
+            call_command('migrate', verbosity=0)
+            seed_bookings(options['bookings'])
+            seed_expenses(options['expenses'])
+            rebuild()
+            return
+
+        selected = list(ENDPOINTS)
+        if options['only']:
+            selected = options['only'].split(',')
+            unknown = set(selected) - set(ENDPOINTS)
+            if unknown:
+                raise CommandError(f"Unknown endpoint(s): {', '.join(sorted(unknown))}")
+
+        with tempfile.TemporaryDirectory() as scratch:
+            env = {
+                **os.environ,
+                'DATABASE_URL': options['database_url'] or f'sqlite:///{scratch}/benchmark.sqlite3',
+                'DEBUG': 'False',
+                'PAYMENT_GATEWAY': 'api.payments.StubGateway',
+                'PAYMENT_STUB_LATENCY': str(options['upstream_latency'] / 1000),
+            }
+            if not options['database_url']:
+                subprocess.run(
+                    [sys.executable, 'manage.py', 'benchmark_concurrency', '--prepare',
+                     '--bookings', str(options['bookings']), '--expenses', str(options['expenses'])],
+                    cwd=settings.BASE_DIR, env=env, check=True, stdout=subprocess.DEVNULL,
+                )
+
+            results = {name: {} for name in selected}
+            for kind in ('wsgi', 'asgi'):
+                with self.server(kind, options['workers'], env) as base_url:
+                    for name in selected:
+                        results[name][kind] = self.measure(
+                            base_url, kind, name, options['requests'], options['concurrency'],
+                        )
+
+        for name, pair in results.items():
+            pair['asgi_speedup'] = round(pair['asgi']['throughput_rps'] / max(pair['wsgi']['throughput_rps'], 0.001), 2)
+
+        report = {
+            'generated_at': timezone.now().isoformat(),
+            'python': sys.version.split()[0],
+            'workers': options['workers'],
+            'concurrency': options['concurrency'],
+            'requests': options['requests'],
+            'upstream_latency_ms': options['upstream_latency'],
+            'results': results,
+        }
+        text = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(text + '\n')
+            self.stderr.write(f"Wrote {options['output']}")
+        else:
+            self.stdout.write(text)
+
+    @contextmanager
+    def server(self, kind, workers, env):
+        """Run one server until the block exits; yields its base URL once it answers."""
+        port = free_port()
+        command = server_command(kind, port, workers)
+        process = subprocess.Popen(
+            command, cwd=settings.BASE_DIR, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        base_url = f'http://127.0.0.1:{port}'
+        try:
+            deadline = time.monotonic() + 30
+            while send(base_url, 'GET', READY_PATH, None)[1] != 200:
+                if process.poll() is not None or time.monotonic() > deadline:
+                    raise CommandError(f"{kind} server did not start: {' '.join(command)}")
+                time.sleep(0.2)
+            yield base_url
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    def measure(self, base_url, kind, name, requests, concurrency):
+        method, path, body = ENDPOINTS[name]
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            # Warm each worker's caches and connections before timing
+            list(pool.map(lambda _: send(base_url, method, path, body), range(concurrency)))
+            started = time.perf_counter()
+            outcomes = list(pool.map(lambda _: send(base_url, method, path, body), range(requests)))
+            elapsed = time.perf_counter() - started
+
+        errors = sum(1 for _, status_code in outcomes if not 200 <= status_code < 400)
+        result = summarize([duration for duration, _ in outcomes])
+        result['throughput_rps'] = round(requests / elapsed, 1)
+        result['errors'] = errors
+        self.stderr.write(
+            f"{kind:<5}{name:<20} {result['throughput_rps']:>8} req/s  "
+            f"p50 {result['p50_ms']:>9}ms  p99 {result['p99_ms']:>9}ms  errors {errors}"
+        )
+        return result
@@ -0,0 +1,218 @@
+import tracemalloc
+from collections import namedtuple
+from contextlib import contextmanager
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLResolver, reverse
+
+from api import urls as api_urls
+from api.benchmarking import (
+    api_client, clear_caches, drain, isolated_database, scratch_receipt_cache, seed_bookings, seed_expenses,
+)
+from api.payments import get_gateway
+from api.stats import rebuild
+
+SEEDED_BOOKINGS = 500
+SEEDED_EXPENSES = 200
+
+# One request against the seeded data, with the most queries and KiB it may use.
+# GET probes run twice: first with every cache cleared, against max_cold_queries
+# (max_queries when not given), so an N+1 behind a cache still shows; then warm,
+# against max_queries and max_kib.
+Probe = namedtuple(
+    'Probe', ['method', 'kwargs', 'query', 'data', 'max_queries', 'max_kib', 'max_cold_queries'],
+    defaults=(None,),
+)
+Result = namedtuple('Result', ['name', 'label', 'status_code', 'cold', 'queries', 'kib', 'probe'])
+
+BOOKING = {'pk': 10}
+NEW_BOOKING = {
+    'name': "Budget Guest", 'phone': "9800000000", 'event_type': "Wedding",
+    'from_date': '2030-01-01', 'to_date': '2030-01-01',
+}
+EXPENSE = {
+    'function_date': '2030-01-01', 'advance': '1000.00', 'gens': '200.00', 'light': '50.00',
+}
+
+# Every named route in api/urls.py needs an entry here (or in SKIPPED), so new
+# endpoints get a budget the day they are added
+BUDGETS = {
+    'api-root': [Probe('GET', {}, '', None, 0, 128)],
+    'booking-list': [
+        Probe('GET', {}, '', None, 1, 3072),
+        Probe('GET', {}, 'page_size=50&fields=id,name,from_date', None, 1, 256),
+        Probe('POST', {}, '', NEW_BOOKING, 12, 192),
+    ],
+    'booking-detail': [
+        Probe('GET', BOOKING, '', None, 1, 128),
+        # Includes reloading the availability index, which the cold GET probes clear
+        Probe('PATCH', BOOKING, '', {'name': "Renamed"}, 7, 192),
+    ],
+    'booking-receipt': [Probe('GET', BOOKING, '', None, 1, 128)],
+    'bulk-receipts': [Probe('GET', {}, 'ids=10,11,12', None, 1, 1536)],
+    'bulk-import-bookings': [Probe('POST', {}, 'dry_run=1', [NEW_BOOKING] * 20, 1, 192)],
+    'booking-dates': [Probe('GET', {}, '', None, 0, 128, 1)],
+    'export-bookings-csv': [Probe('GET', {}, '', None, 1, 2560)],
+    'booking-status': [Probe('PATCH', {'pk': 11}, '', {'status': 'pending'}, 6, 128)],
+    'update-payment': [
+        # First payment: the balance UPDATE misses, so the row is created under a savepoint
+        Probe('PATCH', {'pk': 12}, '', {'amount_paid': 500}, 9, 64),
+        Probe('PATCH', {'pk': 12}, '', {'amount_paid': '250.50', 'reference': 'pi_budget'}, 8, 64),
+    ],
+    'availability-check': [Probe('GET', {}, 'from_date=2030-06-01', None, 0, 64, 1)],
+    'availability-search': [
+        Probe('GET', {}, 'duration_days=3&limit=100', None, 0, 64, 1),
+        Probe('GET', {}, 'min_hours=6&limit=100', None, 0, 160, 1),
+    ],
+    # The grouped stats rows plus a bookings COUNT that catches a stale table
+    'dashboard-stats': [Probe('GET', {}, '', None, 2, 384)],
+    # Analytics reports are cached per period, so the warm call reads the cache
+    # only; a cold one reads bookings and expenses with one query each
+    'dashboard-occupancy': [
+        Probe('GET', {}, '', None, 0, 256, 2),
+        Probe('GET', {}, 'year=2020', None, 0, 256, 2),
+    ],
+    'dashboard-lead-time': [Probe('GET', {}, '', None, 0, 128, 2)],
+    'dashboard-guests': [Probe('GET', {}, '', None, 0, 128, 2)],
+    'dashboard-expense-trends': [Probe('GET', {}, '', None, 0, 128, 2)],
+    'expenses-list': [
+        Probe('GET', {}, '', None, 1, 1536),
+        Probe('POST', {}, '', EXPENSE, 1, 128),
+    ],
+    'expense-detail': [
+        Probe('PUT', {'pk': 5}, '', EXPENSE, 2, 128),
+        # BEGIN/COMMIT around the DELETE: the summary's post_delete receiver rules out a fast delete
+        Probe('DELETE', {'pk': 6}, '', None, 4, 96),
+    ],
+    'expenses-summary': [
+        Probe('GET', {}, '', None, 0, 64, 1),
+        Probe('GET', {}, 'year=2020', None, 0, 64, 1),
+    ],
+    'export-expenses': [Probe('GET', {}, '', None, 1, 384)],
+    'create-payment-intent': [
+        Probe('POST', {}, '', {'amount': 500, 'booking_id': 10}, 1, 64),
+        Probe('POST', {}, '', {'amount': '750.50'}, 0, 64),
+    ],
+    'metrics': [Probe('GET', {}, '', None, 1, 512)],
+}
+
+# Route name → why it cannot be probed offline
+SKIPPED = {}
+
+
+def route_names(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from route_names(pattern.url_patterns)
+        elif pattern.name:
+            yield pattern.name
+
+
+def missing_budgets():
+    """Named api/urls.py routes with neither a budget nor a reason to skip them."""
+    return sorted(set(route_names(api_urls.urlpatterns)) - set(BUDGETS) - set(SKIPPED))
+
+
+def seed_data():
+    seed_bookings(SEEDED_BOOKINGS)
+    seed_expenses(SEEDED_EXPENSES)
+    rebuild()
+
+
+@contextmanager
+def probe_environment():
+    """
+    Receipts in a scratch directory and payment probes on the stub gateway,
+    never Stripe. DEBUG is on so the metrics probe needs no token (the test
+    runner turns DEBUG off).
+    """
+    get_gateway.cache_clear()
+    try:
+        with scratch_receipt_cache(), override_settings(DEBUG=True, PAYMENT_GATEWAY='api.payments.StubGateway'):
+            yield
+    finally:
+        get_gateway.cache_clear()
+
+
+def run_probes(client):
+    """Run every probe in ``BUDGETS`` order (later probes see earlier writes); returns ``Result`` rows."""
+    return [run_probe(client, name, probe) for name, probes in BUDGETS.items() for probe in probes]
+
+
+def run_probe(client, name, probe):
+    path = reverse(name, kwargs=probe.kwargs)
+    if probe.query:
+        path = f"{path}?{probe.query}"
+    send = getattr(client, probe.method.lower())
+
+    def request():
+        response = send(path, probe.data, format='json') if probe.data is not None else send(path)
+        drain(response)
+        return response
+
+    cold = None
+    if probe.method == 'GET':
+        clear_caches()
+        with CaptureQueriesContext(connection) as cold_queries:
+            request()
+        cold = len(cold_queries)
+
+    tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as queries:
+            response = request()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return Result(name, f"{probe.method} {path}"[:43], response.status_code, cold, len(queries), peak // 1024, probe)
+
+
+def over_budget(result):
+    """What ``result`` exceeded, as readable strings (empty when within budget)."""
+    probe = result.probe
+    over = []
+    cold_budget = probe.max_queries if probe.max_cold_queries is None else probe.max_cold_queries
+    if result.cold is not None and result.cold > cold_budget:
+        over.append(f"{result.cold} cold queries > {cold_budget}")
+    if result.queries > probe.max_queries:
+        over.append(f"{result.queries} queries > {probe.max_queries}")
+    if result.kib > probe.max_kib:
+        over.append(f"{result.kib} KiB > {probe.max_kib}")
+    if result.status_code >= 400:
+        over.append(f"HTTP {result.status_code}")
+    return over
+
+
+class Command(BaseCommand):
+    help = (
+        "Request every api/urls.py route against seeded data, report DB queries and peak "
+        "traced memory, and exit non-zero when a route exceeds its budget."
+    )
+
+    def handle(self, *args, **options):
+        missing = missing_budgets()
+        if missing:
+            raise CommandError(f"No query budget for: {', '.join(missing)}")
+
+        with isolated_database(), probe_environment():
+            seed_data()
+            rows = run_probes(api_client())
+
+        self.stdout.write(f"{'route':<26}{'request':<44}{'status':>7}{'cold':>6}{'queries':>9}{'peak KiB':>10}")
+        failures = []
+        for row in rows:
+            over = over_budget(row)
+            cold = '-' if row.cold is None else row.cold
+            line = f"{row.name:<26}{row.label:<44}{row.status_code:>7}{cold:>6}{row.queries:>9}{row.kib:>10}"
+            if over:
+                failures.append(f"{row.name} {row.label}: {'; '.join(over)}")
+                line = self.style.ERROR(f"{line}  ✗ {'; '.join(over)}")
+            self.stdout.write(line)
+        for name, reason in SKIPPED.items():
+            self.stdout.write(f"{name:<26}skipped: {reason}")
+
+        if failures:
+            raise CommandError("Budget exceeded:\n  " + "\n  ".join(failures))
+        self.stdout.write(self.style.SUCCESS(f"All {len(rows)} requests within budget."))
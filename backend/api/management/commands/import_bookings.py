@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.importer import IMPORT_FORMATS, ImportFormatError, detect_format, import_bookings, read_rows
+
+
+class Command(BaseCommand):
+    help = "Bulk import bookings from a CSV, XLSX or JSON file, reporting rows that were rejected."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=IMPORT_FORMATS,
+                            help="File format; defaults to the file extension.")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Validate every row without inserting anything.")
+
+    def handle(self, *args, **options):
+        try:
+            fmt = options['format'] or detect_format(options['path'])
+            with open(options['path'], 'rb') as fileobj:
+                rows = read_rows(fileobj, fmt)
+        except (ImportFormatError, OSError) as e:
+            raise CommandError(str(e))
+
+        report = import_bookings(rows, dry_run=options['dry_run'])
+        for error in report['errors']:
+            self.stderr.write(f"row {error['row']}: {error['errors']}")
+
+        summary = f"{report['received']} rows, {report['valid']} valid, {len(report['errors'])} rejected"
+        if options['dry_run']:
+            self.stdout.write(f"Dry run: {summary}.")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Imported {report['created']} bookings ({summary})."))
@@ -0,0 +1,39 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.outbox import MAX_ATTEMPTS, deliver_batch, outbox_stats
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Deliver queued emails from the outbox in batches over one SMTP connection."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--max-attempts', type=int, default=MAX_ATTEMPTS)
+        parser.add_argument('--loop', action='store_true',
+                            help="Keep polling instead of exiting once the queue is empty.")
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help="Seconds to sleep between polls when the queue is empty.")
+
+    def handle(self, *args, **options):
+        while True:
+            result = deliver_batch(options['batch_size'], options['max_attempts'])
+            if result['claimed']:
+                stats = outbox_stats()
+                logger.info(
+                    "outbox: sent=%s failed=%s latency_ms=%s depth=%s oldest_age_s=%s",
+                    result['sent'], result['failed'], result['latency_ms'],
+                    stats['depth'], stats['oldest_age_seconds'],
+                )
+                self.stdout.write(
+                    f"Sent {result['sent']}, failed {result['failed']}, "
+                    f"mean latency {result['latency_ms']} ms, queue depth {stats['depth']}"
+                )
+                continue  # drain without sleeping while there is work
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
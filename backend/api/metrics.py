@@ -0,0 +1,132 @@
+"""
+In-process request metrics rendered in the Prometheus text format.
+
+Each worker process keeps its own counters, so point Prometheus at every
+worker (or run one) to get the full picture. Values are recorded by
+``api.middleware.RequestMetricsMiddleware``.
+"""
+import threading
+from bisect import bisect_left
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(f'{name}="{_escape(value)}"' for name, value in labels)
+    return '{' + pairs + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Cumulative-bucket histogram, one series per label set."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series = {}
+
+    def observe(self, labels, value):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def samples(self):
+        for labels, (counts, total, count) in sorted(self._series.items()):
+            pairs = list(zip(self.labelnames, labels))
+            running = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                running += bucket_count
+                yield f'{self.name}_bucket', pairs + [('le', _number(bound))], running
+            yield f'{self.name}_bucket', pairs + [('le', '+Inf')], count
+            yield f'{self.name}_sum', pairs, total
+            yield f'{self.name}_count', pairs, count
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labelnames):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self._series = {}
+
+    def inc(self, labels, amount=1):
+        self._series[labels] = self._series.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in sorted(self._series.items()):
+            yield self.name, list(zip(self.labelnames, labels)), value
+
+
+class RequestMetrics:
+    """The per-view series the middleware records, guarded by one lock."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = Counter(
+            'api_requests_total', "Requests handled, by view, method and status code.",
+            ('view', 'method', 'status'),
+        )
+        self.duration = Histogram(
+            'api_request_duration_seconds', "Wall time per request, including any streamed body.",
+            ('view', 'method'), DURATION_BUCKETS,
+        )
+        self.db_queries = Histogram(
+            'api_request_db_queries', "Database queries per request.",
+            ('view', 'method'), QUERY_BUCKETS,
+        )
+        self.db_duration = Histogram(
+            'api_request_db_duration_seconds', "Time spent in database queries per request.",
+            ('view', 'method'), DURATION_BUCKETS,
+        )
+        self.response_size = Histogram(
+            'api_response_size_bytes', "Response body size.",
+            ('view', 'method'), SIZE_BUCKETS,
+        )
+        self.families = (self.requests, self.duration, self.db_queries, self.db_duration, self.response_size)
+
+    def record(self, view, method, status, duration, queries, db_duration, size):
+        labels = (view, method)
+        with self._lock:
+            self.requests.inc((view, method, str(status)))
+            self.duration.observe(labels, duration)
+            self.db_queries.observe(labels, queries)
+            self.db_duration.observe(labels, db_duration)
+            self.response_size.observe(labels, size)
+
+    def render(self, gauges=()):
+        """Prometheus exposition text; ``gauges`` adds ``(name, help, value)`` snapshots."""
+        lines = []
+        with self._lock:
+            for family in self.families:
+                lines.append(f'# HELP {family.name} {family.help_text}')
+                lines.append(f'# TYPE {family.name} {family.kind}')
+                for name, labels, value in family.samples():
+                    lines.append(f'{name}{_format_labels(labels)} {_number(value)}')
+        for name, help_text, value in gauges:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} gauge')
+            lines.append(f'{name} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+request_metrics = RequestMetrics()
@@ -0,0 +1,162 @@
+import re
+import time
+import uuid
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from .log import request_id
+from .metrics import request_metrics
+
+# Accept a caller's X-Request-ID only if it looks like an ID, not arbitrary text for the logs
+REQUEST_ID_PATTERN = re.compile(r'[A-Za-z0-9._-]{1,64}')
+
+
+class RequestIdMiddleware:
+    """Tag the request's log records with a correlation ID and echo it as ``X-Request-ID``."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        current = self.assign(request)
+        response = self.get_response(request)
+        response['X-Request-ID'] = current
+        return response
+
+    async def __acall__(self, request):
+        current = self.assign(request)
+        response = await self.get_response(request)
+        response['X-Request-ID'] = current
+        return response
+
+    @staticmethod
+    def assign(request):
+        incoming = request.headers.get('X-Request-ID', '')
+        current = incoming if REQUEST_ID_PATTERN.fullmatch(incoming) else uuid.uuid4().hex
+        # Not reset afterwards: Django logs 4xx/5xx responses once the middleware
+        # chain has returned, and the next request on this thread sets its own ID.
+        # Under ASGI each request runs in its own context, and sync_to_async
+        # copies it into the worker thread.
+        request_id.set(current)
+        return current
+
+
+class QueryTimer:
+    """``connection.execute_wrapper`` hook counting queries and the time spent in them."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+def attach_timer(timer):
+    connection.execute_wrappers.append(timer)
+
+
+def detach_timer(timer):
+    connection.execute_wrappers.remove(timer)
+
+
+class RequestMetricsMiddleware:
+    """
+    Record wall time, DB query count/time and response size per view, and
+    report them to the client in a ``Server-Timing`` header.
+
+    Removed from the stack entirely unless ``API_METRICS_ENABLED`` is on.
+    Streamed bodies are recorded once fully sent, so their numbers include
+    the queries run while streaming; their ``Server-Timing`` header can only
+    cover the time to the first byte.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'API_METRICS_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timer = QueryTimer()
+        started = time.perf_counter()
+        with connection.execute_wrapper(timer):
+            response = self.get_response(request)
+        return self.finish(request, response, timer, started)
+
+    async def __acall__(self, request):
+        # Sync views and the ORM's async methods all run on this request's
+        # thread-sensitive executor thread, so the wrapper goes on that
+        # thread's connection rather than the event loop's
+        timer = QueryTimer()
+        started = time.perf_counter()
+        await sync_to_async(attach_timer)(timer)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(detach_timer)(timer)
+        return self.finish(request, response, timer, started)
+
+    def finish(self, request, response, timer, started):
+        duration = time.perf_counter() - started
+        match = request.resolver_match
+        labels = (match.view_name if match else 'unmatched', request.method, response.status_code)
+        if response.streaming and not response.has_header('Content-Length'):
+            # Exports run their queries while the body streams, so finish the numbers there
+            stream = self._astream if response.is_async else self._stream
+            response.streaming_content = stream(response.streaming_content, labels, timer, started)
+        else:
+            size = int(response['Content-Length']) if response.has_header('Content-Length') else len(response.content)
+            request_metrics.record(*labels, duration, timer.count, timer.duration, size)
+
+        response['Server-Timing'] = (
+            f'app;dur={duration * 1000:.1f}, '
+            f'db;dur={timer.duration * 1000:.1f};desc="{timer.count} queries"'
+        )
+        origin = request.headers.get('Origin')
+        if origin and (settings.CORS_ALLOW_ALL_ORIGINS or origin in settings.CORS_ALLOWED_ORIGINS):
+            # Without this, browsers hide Server-Timing from cross-origin pages
+            response['Timing-Allow-Origin'] = origin
+        return response
+
+    @staticmethod
+    def _stream(chunks, labels, timer, started):
+        size = 0
+        with connection.execute_wrapper(timer):
+            for chunk in chunks:
+                size += len(chunk)
+                yield chunk
+        request_metrics.record(*labels, time.perf_counter() - started, timer.count, timer.duration, size)
+
+    @staticmethod
+    async def _astream(chunks, labels, timer, started):
+        size = 0
+        await sync_to_async(attach_timer)(timer)
+        try:
+            async for chunk in chunks:
+                size += len(chunk)
+                yield chunk
+        finally:
+            await sync_to_async(detach_timer)(timer)
+        request_metrics.record(*labels, time.perf_counter() - started, timer.count, timer.duration, size)
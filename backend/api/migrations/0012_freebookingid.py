@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:48
+
+from django.db import migrations, models
+
+
+def seed_free_ids(apps, schema_editor):
+    """Record the gaps already left by deleted bookings."""
+    Booking = apps.get_model('api', 'Booking')
+    FreeBookingId = apps.get_model('api', 'FreeBookingId')
+
+    free, expected = [], 1
+    for booking_id in Booking.objects.order_by('id').values_list('id', flat=True).iterator():
+        free.extend(FreeBookingId(id=i) for i in range(expected, booking_id))
+        expected = booking_id + 1
+    FreeBookingId.objects.bulk_create(free, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_alter_booking_email_alter_booking_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FreeBookingId',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+            ],
+        ),
+        migrations.RunPython(seed_free_ids, migrations.RunPython.noop),
+    ]
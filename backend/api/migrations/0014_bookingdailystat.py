@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:52
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_stats(apps, schema_editor):
+    Booking = apps.get_model('api', 'Booking')
+    BookingDailyStat = apps.get_model('api', 'BookingDailyStat')
+    grouped = (
+        Booking.objects.values('from_date', 'event_type', 'status')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    BookingDailyStat.objects.bulk_create(
+        [
+            BookingDailyStat(day=g['from_date'], event_type=g['event_type'], status=g['status'], count=g['total'])
+            for g in grouped.iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_booking_availability_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(blank=True, db_index=True, null=True)),
+                ('event_type', models.CharField(max_length=100)),
+                ('status', models.CharField(max_length=20)),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
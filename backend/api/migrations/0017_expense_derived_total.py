@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:24
+
+from functools import reduce
+from operator import add
+
+from django.db import migrations, models
+from django.db.models import F
+
+COST_FIELDS = ('gens', 'ladies', 'flag', 'waste_room_cleaning', 'electrician', 'radio', 'light')
+
+
+def recompute_totals(apps, schema_editor):
+    """Replace client-supplied totals with the sum of the cost columns, in one UPDATE."""
+    Expense = apps.get_model('api', 'Expense')
+    Expense.objects.update(total=reduce(add, (F(name) for name in COST_FIELDS)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_booking_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='expense',
+            name='total',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['function_date'], name='expense_function_date_idx'),
+        ),
+        migrations.RunPython(recompute_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,104 @@
+from django.db import migrations
+
+# A frozen copy of the guard as first installed; api/overlap.py may change
+# later without altering what this migration does.
+CONSTRAINT = 'booking_no_overlap'
+
+
+def sqlite_span(row):
+    timed = (
+        f"{row}.start_time IS NOT NULL AND {row}.end_time IS NOT NULL AND {row}.start_time < {row}.end_time"
+        f" AND ({row}.to_date IS NULL OR {row}.to_date = {row}.from_date)"
+    )
+    last_day = f"max({row}.from_date, coalesce({row}.to_date, {row}.from_date))"
+    start = f"(CASE WHEN {timed} THEN {row}.from_date || ' ' || {row}.start_time ELSE {row}.from_date || ' 00:00:00' END)"
+    end = f"(CASE WHEN {timed} THEN {row}.from_date || ' ' || {row}.end_time ELSE date({last_day}, '+1 day') || ' 00:00:00' END)"
+    return start, end
+
+
+def sqlite_trigger(event):
+    new_start, new_end = sqlite_span('NEW')
+    old_start, old_end = sqlite_span('b')
+    return f"""
+        CREATE TRIGGER {CONSTRAINT}_{event.split()[0].lower()}
+        BEFORE {event} ON api_booking
+        WHEN NEW.status = 'approved' AND NEW.from_date IS NOT NULL
+        BEGIN
+            SELECT RAISE(ABORT, '{CONSTRAINT}') WHERE EXISTS (
+                SELECT 1 FROM api_booking b
+                WHERE b.status = 'approved' AND b.from_date IS NOT NULL AND b.id != NEW.id
+                  AND b.from_date <= max(NEW.from_date, coalesce(NEW.to_date, NEW.from_date))
+                  AND {old_start} < {new_end} AND {new_start} < {old_end}
+            );
+        END
+    """
+
+
+POSTGRES_SPAN = (
+    "(CASE WHEN start_time IS NOT NULL AND end_time IS NOT NULL AND start_time < end_time"
+    " AND (to_date IS NULL OR to_date = from_date)"
+    " THEN tsrange(from_date + start_time, from_date + end_time, '[)')"
+    " ELSE tsrange(from_date::timestamp,"
+    " (GREATEST(from_date, COALESCE(to_date, from_date)) + 1)::timestamp, '[)') END)"
+)
+
+
+def existing_overlaps(cursor, vendor):
+    if vendor == 'postgresql':
+        cursor.execute(f"""
+            SELECT a.id, b.id FROM
+                (SELECT id, {POSTGRES_SPAN} AS span FROM api_booking WHERE status = 'approved' AND from_date IS NOT NULL) a
+                JOIN (SELECT id, {POSTGRES_SPAN} AS span FROM api_booking WHERE status = 'approved' AND from_date IS NOT NULL) b
+                ON a.id < b.id AND a.span && b.span
+        """)
+    else:
+        a_start, a_end = sqlite_span('a')
+        b_start, b_end = sqlite_span('b')
+        cursor.execute(f"""
+            SELECT a.id, b.id FROM api_booking a JOIN api_booking b ON a.id < b.id
+            WHERE a.status = 'approved' AND b.status = 'approved'
+              AND a.from_date IS NOT NULL AND b.from_date IS NOT NULL
+              AND {a_start} < {b_end} AND {b_start} < {a_end}
+        """)
+    return cursor.fetchall()
+
+
+def add_constraint(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor not in ('postgresql', 'sqlite'):
+        return  # only the application-level check applies elsewhere
+    with schema_editor.connection.cursor() as cursor:
+        clashes = existing_overlaps(cursor, vendor)
+    if clashes:
+        pairs = ', '.join(f"{a}/{b}" for a, b in clashes[:20])
+        raise RuntimeError(f"Approved bookings overlap; un-approve one of each pair and migrate again: {pairs}")
+
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            f"ALTER TABLE api_booking ADD CONSTRAINT {CONSTRAINT} "
+            f"EXCLUDE USING gist ({POSTGRES_SPAN} WITH &&) "
+            "WHERE (status = 'approved' AND from_date IS NOT NULL)"
+        )
+    else:
+        schema_editor.execute(sqlite_trigger('INSERT'))
+        schema_editor.execute(sqlite_trigger('UPDATE OF status, from_date, to_date, start_time, end_time'))
+
+
+def drop_constraint(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(f"ALTER TABLE api_booking DROP CONSTRAINT IF EXISTS {CONSTRAINT}")
+    elif vendor == 'sqlite':
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {CONSTRAINT}_insert")
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {CONSTRAINT}_update")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_payment_ledger'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_constraint, drop_constraint),
+    ]
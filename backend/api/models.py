@@ -1,7 +1,26 @@
 # backend/api/models.py
-from django.db import models
-from django.db.models import Q
+from decimal import Decimal
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Max
 from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+# How many times save() re-allocates an ID when a concurrent insert wins the race
+ID_ALLOCATION_ATTEMPTS = 5
+
+
+class BookingVersionConflict(Exception):
+    """The booking was changed by someone else after this copy was read."""
+
+
+class FreeBookingId(models.Model):
+    """IDs released by deleted bookings, handed out again before fresh ones."""
+    id = models.IntegerField(primary_key=True)
+
+    def __str__(self):
+        return f"Free booking ID {self.id}"
+
 
 class Booking(models.Model):
     STATUS_CHOICES = [
@@ -29,95 +48,228 @@ class Booking(models.Model):
     estimated_guests = models.IntegerField(null=True, blank=True, default=0)
     food_preference = models.CharField(max_length=50, blank=True, null=True)
     alternate_phone = models.CharField(max_length=25, blank=True, null=True)
+    # Bumped on every save; edits are conditional on the version they were read at
+    version = models.PositiveIntegerField(default=1, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'from_date', 'to_date'], name='booking_status_dates_idx'),
+            models.Index(fields=['from_date', 'start_time', 'end_time'], name='booking_day_times_idx'),
+        ]
 
     # ✅ CHANGE 2: Find the lowest available ID (fills gaps left by deleted bookings)
+    # Gaps live in FreeBookingId (filled by the post_delete signal), so this is an
+    # indexed pop or a MAX(id) lookup instead of a scan over every booking.
     @classmethod
     def _get_next_available_id(cls):
-        existing_ids = set(cls.objects.values_list('id', flat=True))
-        next_id = 1
-        while next_id in existing_ids:
-            next_id += 1
-        return next_id
+        freed = (
+            FreeBookingId.objects.select_for_update(skip_locked=True)
+            .order_by('id')
+            .first()
+        )
+        if freed is not None:
+            freed_id = freed.id
+            freed.delete()
+            return freed_id
+        last_id = cls.objects.aggregate(last=Max('id'))['last']
+        return (last_id or 0) + 1
+
+    @classmethod
+    def _allocate_ids(cls, count):
+        """Reserve ``count`` IDs for a bulk insert, freed gaps first. Call inside a transaction."""
+        freed = list(
+            FreeBookingId.objects.select_for_update(skip_locked=True)
+            .order_by('id')
+            .values_list('id', flat=True)[:count]
+        )
+        FreeBookingId.objects.filter(id__in=freed).delete()
+        # A freed ID can sit above MAX(id) when the newest booking was the one deleted
+        last_id = max([cls.objects.aggregate(last=Max('id'))['last'] or 0, *freed])
+        return freed + list(range(last_id + 1, last_id + 1 + count - len(freed)))
 
     # ✅ CHANGE 3: Override save() to assign the gap-filling ID on creation only
     def save(self, *args, **kwargs):
-        if not self.pk:  # Only assign a new ID when creating (not editing)
-            self.pk = self._get_next_available_id()
-        super().save(*args, **kwargs)
+        if self.pk:  # Editing keeps the existing ID
+            return self._save_versioned(*args, **kwargs)
+
+        kwargs['force_insert'] = True
+        for attempt in range(1, ID_ALLOCATION_ATTEMPTS + 1):
+            try:
+                with transaction.atomic():
+                    self.pk = self._get_next_available_id()
+                    super().save(*args, **kwargs)
+                # A new booking has no balance row yet; spare readers of .account the lookup
+                Booking.balance.related.set_cached_value(self, None)
+                return
+            except IntegrityError:
+                # Another worker took the same ID first — retry with a fresh one
+                taken = Booking.objects.filter(pk=self.pk).exists()
+                if taken:
+                    FreeBookingId.objects.filter(id=self.pk).delete()
+                self.pk = None
+                if not taken or attempt == ID_ALLOCATION_ATTEMPTS:
+                    raise
+
+    def _save_versioned(self, *args, **kwargs):
+        """
+        Claim the row with ``UPDATE ... WHERE version = <read version>`` and
+        write the fields in the same transaction, so a concurrent edit makes
+        this save fail instead of being silently overwritten.
+        """
+        with transaction.atomic():
+            claimed = Booking.objects.filter(pk=self.pk, version=self.version).update(version=F('version') + 1)
+            if not claimed:
+                if Booking.objects.filter(pk=self.pk).exists():
+                    raise BookingVersionConflict(f"Booking {self.pk} changed since version {self.version}.")
+                return super().save(*args, **kwargs)  # explicit ID for a row that does not exist yet
+            self.version += 1
+            super().save(*args, **kwargs)
+
+    @property
+    def account(self):
+        """The booking's ``BookingBalance``, or an unsaved all-zero one before its first payment."""
+        try:
+            return self.balance
+        except BookingBalance.DoesNotExist:
+            return BookingBalance(booking_id=self.pk)
 
     @property
     def payment_status(self):
-        if self.balance == 0:
-            return "Paid"
-        if self.paid_amount > 0:
-            return "Advance Paid"
-        return "Pending"
-    
+        return self.account.payment_status
+
     def __str__(self):
         return f"{self.name} - {self.event_type} from {self.from_date} to {self.to_date}"
     
     def clean(self):
         if self.from_date and self.to_date and self.to_date < self.from_date:
-            raise ValidationError("End date cannot be earlier than start date.")
-        
-        start = self.from_date
-        end = self.to_date or self.from_date
-
-        conflicting = Booking.objects.filter(
-            Q(from_date__lte=end) & Q(to_date__gte=start)
-        )
-
-        # exclude self when editing
-        if self.pk:
-            conflicting = conflicting.exclude(pk=self.pk)
-
-        if conflicting.exists():
-            raise ValidationError("Hall is already booked for selected dates.")
-        
-        if self.from_date == self.to_date:
-            conflicting_time = Booking.objects.filter(
-                from_date=self.from_date,
-                start_time__lt=self.end_time,
-                end_time__gt=self.start_time
-            )
-
-            if self.pk:
-                conflicting_time = conflicting_time.exclude(pk=self.pk)
-
-            if conflicting_time.exists():
-                raise ValidationError("Time slot is already booked.")
-                """Validate booking data"""
-        print(f"🔍 Running model clean() for booking pk={self.pk}")
-        
-        # Check date range
-        if self.to_date < self.from_date:
             raise ValidationError({
-                'to_date': 'End date must be after start date.'
+                'to_date': 'End date must be after or equal to start date.'
             })
-        
-        # Check for overlapping bookings
-        conflicting = Booking.objects.filter(
-            from_date__lte=self.to_date,
-            to_date__gte=self.from_date,
-        )
-        
-        # ✅ CRITICAL: Exclude current booking when editing
-        if self.pk:
-            conflicting = conflicting.exclude(pk=self.pk)
-        
-        # Only check approved bookings
-        conflicting = conflicting.filter(status='approved')
-        
-        if conflicting.exists():
-            conflict = conflicting.first()
+
+        if not self.from_date:
+            return
+
+        # One query covers date-range and same-day time overlaps with approved bookings
+        from .availability import find_conflict
+        from .overlap import OVERLAP_MESSAGE
+        if find_conflict(self.from_date, self.to_date, self.start_time, self.end_time, exclude_pk=self.pk):
             raise ValidationError({
-                'non_field_errors': [
-                    f'This date range conflicts with booking #{conflict.id} '
-                    f'({conflict.event_type} on {conflict.from_date})'
-                ]
+                'non_field_errors': [OVERLAP_MESSAGE]
             })
-        
-        print("✅ Model clean() passed")
+
+
+class BookingDailyStat(models.Model):
+    """
+    Booking counts per event day, event type and status, kept current by
+    signals so the dashboard never groups the bookings table. Rows are additive:
+    readers SUM ``count`` over any grouping. Writes that skip signals need a
+    ``rebuild_booking_stats`` afterwards.
+    """
+    day = models.DateField(null=True, blank=True, db_index=True)
+    event_type = models.CharField(max_length=100)
+    status = models.CharField(max_length=20)
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.day} {self.event_type} ({self.status}): {self.count}"
+
+
+class Payment(models.Model):
+    """
+    One payment received for a booking. The ledger is append-only: a
+    correction is a new row, never an edit, and ``BookingBalance`` holds the
+    running totals so nothing has to sum this table to show a balance.
+    """
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='payments')
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    # Provider reference (e.g. the Stripe payment intent); a repeated one is recorded once
+    reference = models.CharField(max_length=100, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['booking', 'created_at'], name='payment_booking_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['booking', 'reference'], condition=~models.Q(reference=''),
+                name='payment_unique_reference',
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Payments are append-only; record a correcting payment instead.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Payments are append-only; record a correcting payment instead.")
+
+    def __str__(self):
+        return f"Payment of {self.amount} for booking {self.booking_id}"
+
+
+class BookingBalance(models.Model):
+    """
+    Running payment totals for one booking, updated in the same transaction
+    as each ``Payment`` insert with ``F()`` expressions, so concurrent
+    payments never overwrite each other. List views read it with a join.
+    """
+    booking = models.OneToOneField(Booking, primary_key=True, on_delete=models.CASCADE, related_name='balance')
+    # Agreed price for the booking, set by staff
+    total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    paid_amount = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    payment_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    @property
+    def due(self):
+        return self.total_amount - self.paid_amount
+
+    @property
+    def payment_status(self):
+        # Mirrored in SQL by ledger.BALANCE_COLUMNS['payment_status']
+        if self.total_amount > 0 and self.paid_amount >= self.total_amount:
+            return "Paid"
+        if self.paid_amount > 0:
+            return "Advance Paid"
+        return "Pending"
+
+    def __str__(self):
+        return f"Booking {self.booking_id}: {self.paid_amount} of {self.total_amount} paid"
+
+
+class OutboundEmail(models.Model):
+    """Email outbox drained by the ``send_queued_emails`` worker."""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    booking = models.ForeignKey(
+        Booking, null=True, blank=True, on_delete=models.SET_NULL, related_name='emails'
+    )
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    to = models.TextField(help_text="Comma-separated recipients")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    # When the worker may (re)try; also the lease expiry while a row is 'sending'
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} → {self.to} ({self.status})"
 
 
 class Expense(models.Model):
@@ -137,7 +289,24 @@ class Expense(models.Model):
     radio = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     light = models.DecimalField(max_digits=10, decimal_places=2, default=0)
 
-    total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    # Sum of COST_FIELDS, recomputed on every save; clients cannot set it
+    total = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False)
+
+    # Money collected for the function, and money spent on it
+    INCOME_FIELDS = ('advance', 'balance', 'damage_recovery')
+    COST_FIELDS = ('gens', 'ladies', 'flag', 'waste_room_cleaning', 'electrician', 'radio', 'light')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['function_date'], name='expense_function_date_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.total = sum((Decimal(str(getattr(self, name) or 0)) for name in self.COST_FIELDS), Decimal(0))
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) & set(self.COST_FIELDS):
+            kwargs['update_fields'] = {*update_fields, 'total'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Expense — {self.function_date}"
\ No newline at end of file
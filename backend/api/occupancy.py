@@ -0,0 +1,216 @@
+"""
+Free-slot search over a per-day occupancy map of approved bookings.
+
+The map is a ``bytearray`` with one byte per day from today out to
+``OCCUPANCY_HORIZON_DAYS``: ``FREE``, ``PARTIAL`` (only timed bookings that
+day) or ``FULL``. Finding runs of free days is a compiled regular expression
+scanning that buffer, so a multi-year search runs at C speed with no
+queries. Timed bookings are kept per day for the hour-level search.
+
+Booking signals apply each committed change to the map in place; like the
+availability index, it is also rebuilt after ``AVAILABILITY_INDEX_TTL``
+seconds so changes made by other worker processes show up.
+"""
+import re
+import threading
+import time
+from datetime import date, datetime, time as dtime, timedelta
+from functools import lru_cache
+
+from django.conf import settings
+
+from .availability import is_timed, overlap_filter
+from .models import Booking
+
+FREE, PARTIAL, FULL = 0, 1, 2
+
+DEFAULT_WINDOW_DAYS = 365
+MAX_RESULTS = 100
+MAX_DURATION_DAYS = 366
+
+ANY_HOURS_FREE = re.compile(b'[\x00\x01]')
+
+
+@lru_cache(maxsize=32)
+def _free_run(days):
+    """Pattern matching ``days`` or more consecutive free days."""
+    return re.compile(b'\x00{%d,}' % days)
+
+
+def booking_slot(booking):
+    """What a booking occupies on the map: its dates and times when approved, else None."""
+    if booking.status != 'approved' or booking.from_date is None:
+        return None
+    return booking.from_date, booking.to_date, booking.start_time, booking.end_time
+
+
+def search_params(params):
+    """
+    Read ``from``/``to`` (YYYY-MM-DD), ``duration_days``, ``min_hours`` and
+    ``limit`` from query params; raises ValueError when one is malformed.
+    """
+    first_day = datetime.strptime(params['from'], '%Y-%m-%d').date() if params.get('from') else date.today()
+    last_day = (
+        datetime.strptime(params['to'], '%Y-%m-%d').date() if params.get('to')
+        else first_day + timedelta(days=DEFAULT_WINDOW_DAYS)
+    )
+    duration_days = int(params.get('duration_days') or 1)
+    min_hours = float(params['min_hours']) if params.get('min_hours') else None
+    limit = int(params.get('limit') or 10)
+    if last_day < first_day:
+        raise ValueError("to cannot be before from")
+    if not 1 <= duration_days <= MAX_DURATION_DAYS:
+        raise ValueError("duration_days out of range")
+    if min_hours is not None and (not 0 < min_hours <= 24 or duration_days != 1):
+        raise ValueError("min_hours must be within (0, 24] and only with duration_days=1")
+    if not 1 <= limit <= MAX_RESULTS:
+        raise ValueError("limit out of range")
+    return first_day, last_day, duration_days, min_hours, limit
+
+
+class OccupancyMap:
+    """Per-day occupancy of approved bookings; see the module docstring."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._days = None
+        self._origin = None
+        self._timed = {}     # day index → {booking_id: (start_time, end_time)}
+        self._bookings = {}  # booking_id → (first index, last index, timed)
+        self._built_at = 0.0
+
+    def invalidate(self):
+        with self._lock:
+            self._days = None
+
+    def apply(self, changes):
+        """Apply committed ``(booking_id, booking_slot or None)`` changes in place."""
+        with self._lock:
+            if self._days is None:
+                return  # the next search rebuilds from the database anyway
+            for booking_id, slot in changes:
+                self._remove(booking_id)
+                if slot is not None:
+                    self._place(booking_id, *slot)
+
+    def _build(self):
+        self._origin = date.today()
+        horizon = settings.OCCUPANCY_HORIZON_DAYS
+        self._days = bytearray(horizon)
+        self._timed, self._bookings = {}, {}
+        last_day = self._origin + timedelta(days=horizon - 1)
+        rows = Booking.objects.filter(overlap_filter(self._origin, last_day, None, None)).values_list(
+            'id', 'from_date', 'to_date', 'start_time', 'end_time'
+        )
+        for booking_id, *slot in rows:
+            self._place(booking_id, *slot)
+        self._built_at = time.monotonic()
+
+    def _ensure_built(self):
+        if self._days is None or time.monotonic() - self._built_at > settings.AVAILABILITY_INDEX_TTL:
+            self._build()
+
+    def _place(self, booking_id, from_date, to_date, start_time, end_time):
+        days = self._days
+        first = (from_date - self._origin).days
+        if is_timed(from_date, to_date, start_time, end_time):
+            if 0 <= first < len(days):
+                self._timed.setdefault(first, {})[booking_id] = (start_time, end_time)
+                if days[first] == FREE:
+                    days[first] = PARTIAL
+                self._bookings[booking_id] = (first, first, True)
+            return
+        last = min((max(to_date or from_date, from_date) - self._origin).days, len(days) - 1)
+        first = max(first, 0)
+        if first <= last:
+            days[first:last + 1] = bytes([FULL]) * (last + 1 - first)
+            self._bookings[booking_id] = (first, last, False)
+
+    def _remove(self, booking_id):
+        placed = self._bookings.pop(booking_id, None)
+        if placed is None:
+            return
+        first, last, timed = placed
+        if timed:
+            spans = self._timed[first]
+            del spans[booking_id]
+            if not spans:
+                del self._timed[first]
+                self._days[first] = FREE
+            return
+        self._days[first:last + 1] = bytes(last + 1 - first)
+        # Only another booking's timed window can remain on those days
+        for index in range(first, last + 1):
+            if index in self._timed:
+                self._days[index] = PARTIAL
+
+    def search(self, first_day, last_day, duration_days=1, min_hours=None, limit=10):
+        """
+        The first ``limit`` free stretches between ``first_day`` and
+        ``last_day``, clipped to the mapped window: runs of at least
+        ``duration_days`` whole free days, or with ``min_hours``, time slots
+        of at least that many hours (whole free days count as 24).
+        """
+        with self._lock:
+            self._ensure_built()
+            origin = self._origin
+            lo = max((first_day - origin).days, 0)
+            hi = min((last_day - origin).days, len(self._days) - 1)
+            if min_hours is None:
+                found = self._free_ranges(lo, hi, duration_days, limit)
+            else:
+                found = self._free_slots(lo, hi, timedelta(hours=min_hours), limit)
+
+        result = {
+            "from": (origin + timedelta(days=lo)).isoformat(),
+            "to": (origin + timedelta(days=hi)).isoformat() if hi >= lo else None,
+        }
+        if min_hours is None:
+            result["ranges"] = [
+                {"from_date": start.isoformat(), "to_date": end.isoformat(), "days": (end - start).days + 1}
+                for start, end in found
+            ]
+        else:
+            result["slots"] = [
+                {"start": start.isoformat(), "end": end.isoformat(),
+                 "hours": round((end - start).total_seconds() / 3600, 2)}
+                for start, end in found
+            ]
+        return result
+
+    def _free_ranges(self, lo, hi, duration_days, limit):
+        ranges = []
+        if hi < lo:
+            return ranges
+        for match in _free_run(duration_days).finditer(self._days, lo, hi + 1):
+            ranges.append((
+                self._origin + timedelta(days=match.start()),
+                self._origin + timedelta(days=match.end() - 1),
+            ))
+            if len(ranges) == limit:
+                break
+        return ranges
+
+    def _free_slots(self, lo, hi, min_length, limit):
+        slots = []
+        if hi < lo:
+            return slots
+        for match in ANY_HOURS_FREE.finditer(self._days, lo, hi + 1):
+            index = match.start()
+            day_start = datetime.combine(self._origin + timedelta(days=index), dtime.min)
+            day_end = day_start + timedelta(days=1)
+            taken = sorted(self._timed.get(index, {}).values())
+            cursor = day_start
+            for start_time, end_time in taken:
+                start = datetime.combine(day_start.date(), start_time)
+                if start - cursor >= min_length:
+                    slots.append((cursor, start))
+                cursor = max(cursor, datetime.combine(day_start.date(), end_time))
+            if day_end - cursor >= min_length:
+                slots.append((cursor, day_end))
+            if len(slots) >= limit:
+                return slots[:limit]
+        return slots
+
+
+occupancy_map = OccupancyMap()
@@ -0,0 +1,153 @@
+"""
+Durable email outbox.
+
+Requests only INSERT an ``OutboundEmail`` row (in the same transaction as the
+booking), so nothing is lost when a worker process recycles. The
+``send_queued_emails`` command claims due rows in batches and delivers them
+over a single SMTP connection, retrying failures with exponential backoff.
+Claiming a row counts as an attempt, so a message whose delivery never
+finishes (the worker dies on it) still runs out of attempts and fails.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 60 * 60
+# How long a claimed row stays invisible to other workers before it is retried
+LEASE_SECONDS = 5 * 60
+
+
+def enqueue(subject, body, to, booking=None, from_email=None):
+    recipients = [to] if isinstance(to, str) else list(to)
+    return OutboundEmail.objects.create(
+        booking=booking,
+        subject=subject,
+        body=body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to=",".join(recipients),
+    )
+
+
+def backoff(attempts):
+    """Seconds to wait before retry number ``attempts``."""
+    return min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS)
+
+
+def _due():
+    # 'sending' rows are due again once their lease has run out (worker died mid-batch)
+    return OutboundEmail.objects.filter(
+        Q(status='pending') | Q(status='sending'),
+        next_attempt_at__lte=timezone.now(),
+    )
+
+
+def claim_batch(batch_size, max_attempts=MAX_ATTEMPTS):
+    """
+    Lease up to ``batch_size`` due emails and count the attempt; SKIP LOCKED
+    keeps parallel workers apart.
+    """
+    with transaction.atomic():
+        # A lease that ran out on the last attempt: the worker never finished it
+        OutboundEmail.objects.filter(
+            status='sending', next_attempt_at__lte=timezone.now(), attempts__gte=max_attempts,
+        ).update(status='failed', last_error='Delivery did not finish before the lease expired.')
+        batch = list(
+            _due().select_for_update(skip_locked=True)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        if batch:
+            OutboundEmail.objects.filter(pk__in=[email.pk for email in batch]).update(
+                status='sending',
+                attempts=F('attempts') + 1,
+                next_attempt_at=timezone.now() + timedelta(seconds=LEASE_SECONDS),
+            )
+            for email in batch:
+                email.attempts += 1
+    return batch
+
+
+def deliver_batch(batch_size=50, max_attempts=MAX_ATTEMPTS):
+    """
+    Send one batch over one connection, reopened after a failed send.
+    Returns a dict with ``claimed``, ``sent``, ``failed`` and ``latency_ms``
+    (mean per message).
+    """
+    batch = claim_batch(batch_size, max_attempts)
+    result = {'claimed': len(batch), 'sent': 0, 'failed': 0, 'latency_ms': 0.0}
+    if not batch:
+        return result
+
+    latencies = []
+    connection = get_connection()
+    try:
+        connection.open()
+        for email in batch:
+            message = EmailMessage(
+                email.subject, email.body, email.from_email, email.to.split(","),
+                connection=connection,
+            )
+            started = time.perf_counter()
+            try:
+                connection.send_messages([message])
+            except Exception as e:
+                attempts = email.attempts
+                gave_up = attempts >= max_attempts
+                OutboundEmail.objects.filter(pk=email.pk).update(
+                    status='failed' if gave_up else 'pending',
+                    attempts=attempts,
+                    last_error=str(e)[:2000],
+                    next_attempt_at=timezone.now() + timedelta(seconds=backoff(attempts)),
+                )
+                result['failed'] += 1
+                logger.warning("Email %s to %s failed (attempt %s): %s", email.pk, email.to, attempts, e)
+                # The failure may have dropped the connection; don't fail the rest against it
+                connection.close()
+                connection.open()
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+            OutboundEmail.objects.filter(pk=email.pk).update(
+                status='sent', sent_at=timezone.now(), last_error='',
+            )
+            result['sent'] += 1
+    except Exception as e:
+        # Could not (re)connect: hand the untouched rows back, not counting this attempt
+        logger.error("Email connection failed: %s", e)
+        OutboundEmail.objects.filter(pk__in=[email.pk for email in batch], status='sending').update(
+            status='pending',
+            attempts=F('attempts') - 1,
+            next_attempt_at=timezone.now() + timedelta(seconds=BACKOFF_BASE_SECONDS),
+        )
+    finally:
+        connection.close()
+
+    if latencies:
+        result['latency_ms'] = round(sum(latencies) / len(latencies), 2)
+    return result
+
+
+def outbox_stats():
+    """Queue depth and age of the oldest pending email, in one query."""
+    pending = Q(status__in=('pending', 'sending'))
+    stats = OutboundEmail.objects.aggregate(
+        depth=Count('id', filter=pending),
+        failed=Count('id', filter=Q(status='failed')),
+        oldest=Min('created_at', filter=pending),
+    )
+    oldest = stats['oldest']
+    return {
+        'depth': stats['depth'],
+        'failed': stats['failed'],
+        'oldest_age_seconds': round((timezone.now() - oldest).total_seconds(), 1) if oldest else 0.0,
+    }
@@ -0,0 +1,144 @@
+"""
+Database-side guard against double bookings: no two approved bookings may
+hold overlapping ``[start, end)`` spans (``availability.booking_span``).
+
+PostgreSQL enforces it with an exclusion constraint over a ``tsrange`` of
+each approved booking's span. SQLite has no exclusion constraints, so
+BEFORE INSERT/UPDATE triggers run the overlap check inside the writing
+statement; SQLite admits one writer at a time, so the check and the write
+cannot interleave with another worker's. Either way a clash raises
+``IntegrityError``, which callers turn into ``OVERLAP_MESSAGE`` via
+``is_overlap_error``.
+
+Migration 0019 installs a frozen copy of this SQL; the functions here
+reinstall the SQLite triggers after later migrations drop them.
+"""
+from django.db.migrations.recorder import MigrationRecorder
+
+CONSTRAINT = 'booking_no_overlap'
+OVERLAP_MESSAGE = "Hall is already booked for selected dates."
+SUPPORTED_VENDORS = ('postgresql', 'sqlite')
+# The migration that first installs the guard
+MIGRATION = '0019_booking_no_overlap'
+
+
+def is_overlap_error(exc):
+    """True when an ``IntegrityError`` came from the overlap guard."""
+    return CONSTRAINT in str(exc)
+
+
+def _sqlite_span(row):
+    """``(start, end)`` SQL for ``row``'s span as 'YYYY-MM-DD HH:MM:SS' text, which sorts chronologically."""
+    timed = (
+        f"{row}.start_time IS NOT NULL AND {row}.end_time IS NOT NULL AND {row}.start_time < {row}.end_time"
+        f" AND ({row}.to_date IS NULL OR {row}.to_date = {row}.from_date)"
+    )
+    last_day = f"max({row}.from_date, coalesce({row}.to_date, {row}.from_date))"
+    start = f"(CASE WHEN {timed} THEN {row}.from_date || ' ' || {row}.start_time ELSE {row}.from_date || ' 00:00:00' END)"
+    end = f"(CASE WHEN {timed} THEN {row}.from_date || ' ' || {row}.end_time ELSE date({last_day}, '+1 day') || ' 00:00:00' END)"
+    return start, end
+
+
+def _sqlite_trigger(event):
+    new_start, new_end = _sqlite_span('NEW')
+    old_start, old_end = _sqlite_span('b')
+    return f"""
+        CREATE TRIGGER {CONSTRAINT}_{event.split()[0].lower()}
+        BEFORE {event} ON api_booking
+        WHEN NEW.status = 'approved' AND NEW.from_date IS NOT NULL
+        BEGIN
+            SELECT RAISE(ABORT, '{CONSTRAINT}') WHERE EXISTS (
+                SELECT 1 FROM api_booking b
+                WHERE b.status = 'approved' AND b.from_date IS NOT NULL AND b.id != NEW.id
+                  AND b.from_date <= max(NEW.from_date, coalesce(NEW.to_date, NEW.from_date))
+                  AND {old_start} < {new_end} AND {new_start} < {old_end}
+            );
+        END
+    """
+
+
+def _postgres_span():
+    timed = (
+        "start_time IS NOT NULL AND end_time IS NOT NULL AND start_time < end_time"
+        " AND (to_date IS NULL OR to_date = from_date)"
+    )
+    return (
+        f"(CASE WHEN {timed} THEN tsrange(from_date + start_time, from_date + end_time, '[)')"
+        " ELSE tsrange(from_date::timestamp,"
+        " (GREATEST(from_date, COALESCE(to_date, from_date)) + 1)::timestamp, '[)') END)"
+    )
+
+
+def _existing_overlaps(cursor, vendor):
+    if vendor == 'postgresql':
+        span = _postgres_span()
+        cursor.execute(f"""
+            SELECT a.id, b.id FROM
+                (SELECT id, {span} AS span FROM api_booking WHERE status = 'approved' AND from_date IS NOT NULL) a
+                JOIN (SELECT id, {span} AS span FROM api_booking WHERE status = 'approved' AND from_date IS NOT NULL) b
+                ON a.id < b.id AND a.span && b.span
+        """)
+    else:
+        a_start, a_end = _sqlite_span('a')
+        b_start, b_end = _sqlite_span('b')
+        cursor.execute(f"""
+            SELECT a.id, b.id FROM api_booking a JOIN api_booking b ON a.id < b.id
+            WHERE a.status = 'approved' AND b.status = 'approved'
+              AND a.from_date IS NOT NULL AND b.from_date IS NOT NULL
+              AND {a_start} < {b_end} AND {b_start} < {a_end}
+        """)
+    return cursor.fetchall()
+
+
+def install(schema_editor):
+    """Add the guard, refusing when approved bookings already overlap."""
+    vendor = schema_editor.connection.vendor
+    if vendor not in SUPPORTED_VENDORS:
+        return  # only the application-level check applies elsewhere
+    with schema_editor.connection.cursor() as cursor:
+        clashes = _existing_overlaps(cursor, vendor)
+    if clashes:
+        pairs = ', '.join(f"{a}/{b}" for a, b in clashes[:20])
+        raise RuntimeError(f"Approved bookings overlap; un-approve one of each pair and migrate again: {pairs}")
+
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            f"ALTER TABLE api_booking ADD CONSTRAINT {CONSTRAINT} "
+            f"EXCLUDE USING gist ({_postgres_span()} WITH &&) "
+            "WHERE (status = 'approved' AND from_date IS NOT NULL)"
+        )
+    else:
+        schema_editor.execute(_sqlite_trigger('INSERT'))
+        schema_editor.execute(_sqlite_trigger('UPDATE OF status, from_date, to_date, start_time, end_time'))
+
+
+def remove(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(f"ALTER TABLE api_booking DROP CONSTRAINT IF EXISTS {CONSTRAINT}")
+    elif vendor == 'sqlite':
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {CONSTRAINT}_insert")
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {CONSTRAINT}_update")
+
+
+def ensure_sqlite_triggers(connection):
+    """
+    Recreate the SQLite triggers if missing. Django rebuilds a SQLite table
+    for many schema changes, which drops its triggers; this runs after
+    every ``migrate``.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    if ('api', MIGRATION) not in MigrationRecorder(connection).applied_migrations():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+            [f'{CONSTRAINT}_%'],
+        )
+        if cursor.fetchone()[0] == 2:
+            return
+    with connection.schema_editor() as schema_editor:
+        remove(schema_editor)
+        install(schema_editor)
+
@@ -0,0 +1,101 @@
+from datetime import date
+
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+
+# Newest event first, undated bookings last, ties broken by id
+ORDERING = (F('from_date').desc(nulls_last=True), 'id')
+REVERSE_ORDERING = (F('from_date').asc(nulls_first=True), '-id')
+
+
+def _position(item):
+    """``(from_date, id)`` of a model instance or a ``values()`` row."""
+    if isinstance(item, dict):
+        return item['from_date'], item['id']
+    return item.from_date, item.pk
+
+
+def _after(from_date, pk):
+    """Rows that come after ``(from_date, pk)`` in ``ORDERING``."""
+    if from_date is None:
+        return Q(from_date__isnull=True, id__gt=pk)
+    return Q(from_date__lt=from_date) | Q(from_date=from_date, id__gt=pk) | Q(from_date__isnull=True)
+
+
+def _before(from_date, pk):
+    """Rows that come before ``(from_date, pk)`` in ``ORDERING``."""
+    if from_date is None:
+        return Q(from_date__isnull=False) | Q(from_date__isnull=True, id__lt=pk)
+    return Q(from_date__gt=from_date) | Q(from_date=from_date, id__lt=pk)
+
+
+class BookingCursorPagination(CursorPagination):
+    """
+    Cursor pagination for the bookings list, newest event first.
+
+    A keyset on ``(from_date, id)``: the cursor carries both columns of the
+    row at the page edge, so bookings sharing a date are neither skipped nor
+    repeated and bookings without a date (sorted last) are still reachable.
+    DRF's own CursorPagination keys on the first ordering column alone.
+
+    Opt-in: the list stays a plain array unless the client sends ``cursor``
+    or ``page_size``, so existing callers keep working.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        reverse = bool(self.cursor and self.cursor.reverse)
+        position = self._decode_position(self.cursor.position if self.cursor else None)
+
+        queryset = queryset.order_by(*(REVERSE_ORDERING if reverse else ORDERING))
+        if position is not None:
+            queryset = queryset.filter((_before if reverse else _after)(*position))
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def _decode_position(self, position):
+        if not position:
+            return None
+        day, _, pk = position.partition('|')
+        try:
+            return (date.fromisoformat(day) if day else None), int(pk)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+
+    def _encode_position(self, item):
+        from_date, pk = _position(item)
+        return f"{from_date.isoformat() if from_date else ''}|{pk}"
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        # An empty page reached backwards means everything follows it: start over
+        position = self._encode_position(self.page[-1]) if self.page else None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        # An empty page reached forwards means everything precedes it: the last page
+        position = self._encode_position(self.page[0]) if self.page else None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
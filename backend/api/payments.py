@@ -0,0 +1,172 @@
+"""
+Payment intents behind a small gateway interface.
+
+``get_gateway()`` builds the class named by ``settings.PAYMENT_GATEWAY``
+once per process: ``StripeGateway`` in production, ``StubGateway`` for tests,
+local development and load tests. ``create_intent`` adds what every caller
+needs on top: amounts parsed as exact decimals, idempotency keys derived
+from the booking and amount (a retried request gets the intent the first
+one created), and the open intent per booking kept in the cache so repeat
+checkout attempts skip the Stripe round trip.
+"""
+import hashlib
+import itertools
+import logging
+import re
+import threading
+import time
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+
+import stripe
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+Intent = namedtuple('Intent', ['id', 'client_secret', 'amount', 'currency'])
+
+# Stripe forgets idempotency keys after 24 hours; expire the cached intent before that
+INTENT_CACHE_TIMEOUT = 23 * 60 * 60
+INTENT_KEY = 'payments:intent:{}'
+
+# Digits with an optional fraction; no exponents, NaN/Infinity or non-ASCII digits
+PLAIN_DECIMAL = re.compile(r'[+-]?(\d+(\.\d*)?|\.\d+)', re.ASCII)
+
+UNAVAILABLE = "The payment provider is unavailable; please try again."
+
+logger = logging.getLogger(__name__)
+
+
+class PaymentGatewayError(Exception):
+    """The payment provider failed or could not be reached."""
+
+
+def parse_rupees(amount):
+    """Rupees (plain decimal number or string, at most 2 decimals, above zero) → ``Decimal``."""
+    text = str(amount).strip()
+    if isinstance(amount, bool) or not PLAIN_DECIMAL.fullmatch(text):
+        raise ValueError("amount must be a number")
+    value = Decimal(text)
+    if value <= 0:
+        raise ValueError("amount must be greater than zero")
+    try:
+        rupees = value.quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise ValueError("amount is too large")
+    if rupees != value:
+        raise ValueError("amount cannot have more than 2 decimal places")
+    return rupees
+
+
+def to_paise(amount):
+    """Rupees (as accepted by ``parse_rupees``) → integer paise."""
+    return int(parse_rupees(amount) * 100)
+
+
+def idempotency_key(scope, amount, currency):
+    """Same scope, amount and currency → same key, and so the same intent."""
+    digest = hashlib.sha256(f"{scope}:{amount}:{currency}".encode()).hexdigest()
+    return f"intent-{digest[:48]}"
+
+
+class StripeGateway:
+    """
+    Stripe through its own client rather than the module globals.
+
+    ``RequestsClient`` keeps one keep-alive session per thread, so
+    connections to Stripe are reused across requests. Connect and read
+    timeouts bound how long a request can wait on Stripe, and retries are
+    safe because every create carries an idempotency key.
+    """
+
+    def __init__(self):
+        if not settings.STRIPE_SECRET_KEY:
+            logger.error("PAYMENT_GATEWAY is StripeGateway but STRIPE_SECRET_KEY is not set")
+            raise PaymentGatewayError(UNAVAILABLE)
+        self.client = stripe.StripeClient(
+            settings.STRIPE_SECRET_KEY,
+            http_client=stripe.RequestsClient(
+                timeout=(settings.STRIPE_CONNECT_TIMEOUT, settings.STRIPE_READ_TIMEOUT)
+            ),
+            max_network_retries=settings.STRIPE_MAX_RETRIES,
+        )
+
+    def create_intent(self, amount, currency, idempotency_key=None, metadata=None):
+        params = {
+            'amount': amount,
+            'currency': currency,
+            'automatic_payment_methods': {'enabled': True},
+        }
+        if metadata:
+            params['metadata'] = metadata
+        options = {'idempotency_key': idempotency_key} if idempotency_key else {}
+        try:
+            intent = self.client.v1.payment_intents.create(params, options)
+        except stripe.StripeError as e:
+            # Other errors can name hosts and request IDs; only card errors are written for customers
+            logger.warning("Stripe create_intent failed: %s", e, extra={'stripe_code': e.code})
+            if isinstance(e, stripe.CardError) and e.user_message:
+                raise PaymentGatewayError(e.user_message) from e
+            raise PaymentGatewayError(UNAVAILABLE) from e
+        return Intent(intent.id, intent.client_secret, intent.amount, intent.currency)
+
+
+class StubGateway:
+    """
+    In-process stand-in for Stripe: no network, deterministic IDs, and
+    Stripe's idempotency behaviour. ``PAYMENT_STUB_LATENCY`` (seconds) makes
+    each create wait like a real round trip, for load tests.
+    """
+
+    def __init__(self):
+        self.latency = settings.PAYMENT_STUB_LATENCY
+        self.intents = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def create_intent(self, amount, currency, idempotency_key=None, metadata=None):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            if idempotency_key in self.intents:
+                return self.intents[idempotency_key]
+            intent_id = f"pi_stub_{next(self._ids)}"
+            intent = Intent(intent_id, f"{intent_id}_secret_stub", amount, currency)
+            if idempotency_key:
+                self.intents[idempotency_key] = intent
+        return intent
+
+
+@lru_cache(maxsize=None)
+def get_gateway():
+    return import_string(settings.PAYMENT_GATEWAY)()
+
+
+def create_intent(amount, booking=None, client_key=None, currency='inr'):
+    """
+    Payment intent for ``amount`` rupees.
+
+    For a ``booking`` the key covers its version, which every save bumps, and
+    its ledger's payment count, so retries reuse the open intent while a paid
+    or edited booking gets a fresh one. ``client_key`` (the caller's
+    ``Idempotency-Key`` header) makes retries without a booking safe.
+    """
+    paise = to_paise(amount)
+    if booking is not None:
+        state = (booking.version, booking.account.payment_count)
+        scope = f"booking:{booking.pk}:{state[0]}:{state[1]}"
+        cached = cache.get(INTENT_KEY.format(booking.pk))
+        if cached is not None and cached[0] == (state, paise, currency):
+            return cached[1]
+    else:
+        scope = f"client:{client_key}" if client_key else None
+
+    intent = get_gateway().create_intent(
+        paise, currency,
+        idempotency_key=idempotency_key(scope, paise, currency) if scope else None,
+        metadata={'booking_id': str(booking.pk)} if booking is not None else None,
+    )
+    if booking is not None:
+        cache.set(INTENT_KEY.format(booking.pk), ((state, paise, currency), intent), INTENT_CACHE_TIMEOUT)
+    return intent
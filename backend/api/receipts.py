@@ -0,0 +1,706 @@
+"""
+Booking receipt PDFs.
+
+``receipt_context`` snapshots everything a receipt shows into a plain dict,
+``render_receipt`` turns that dict into PDF bytes, and ``ReceiptCache`` keeps
+rendered files on disk keyed by a hash of the dict — an unchanged booking with
+the same query params is served from disk instead of being rendered again.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+from io import BytesIO
+
+from django.conf import settings
+
+from .streaming import StreamBuffer
+from PIL import Image
+from reportlab import rl_config
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+
+logger = logging.getLogger(__name__)
+
+# Fields of Booking that appear on the receipt
+RECEIPT_FIELDS = (
+    'id', 'name', 'phone', 'email', 'address_line', 'event_type',
+    'from_date', 'to_date', 'start_time', 'end_time',
+    'estimated_guests', 'food_preference', 'message', 'status',
+)
+
+
+# ------------------------------------------------
+# Assets shared by every receipt, built once at import
+# ------------------------------------------------
+WATERMARK_PATH = os.path.join(settings.BASE_DIR, "static", "images", "2025-09-16-converted.png")
+
+HEADER_BANNER_COLOR = colors.HexColor("#1a237e")
+HEADER_SUBTITLE_COLOR = colors.HexColor("#b3e5fc")
+ACCENT_COLOR = colors.HexColor("#00bcd4")
+
+styles = getSampleStyleSheet()
+
+# Custom Styles
+label_style = ParagraphStyle(
+    'Label',
+    parent=styles['Normal'],
+    fontSize=10,
+    textColor=colors.HexColor("#555555"),
+    alignment=TA_LEFT,
+    fontName='Helvetica-Bold',
+    leading=13
+)
+
+value_style = ParagraphStyle(
+    'Value',
+    parent=styles['Normal'],
+    fontSize=11,
+    textColor=colors.HexColor("#212121"),
+    alignment=TA_LEFT,
+    fontName='Helvetica',
+    leading=14
+)
+
+section_style = ParagraphStyle(
+    'SectionHeader',
+    parent=styles['Heading2'],
+    fontSize=12,
+    textColor=colors.HexColor("#1a237e"),
+    spaceAfter=3,
+    spaceBefore=5,
+    alignment=TA_LEFT,
+    fontName='Helvetica-Bold',
+    leftIndent=10
+)
+
+footer_style = ParagraphStyle(
+    'Footer',
+    parent=styles['Normal'],
+    fontSize=9,
+    textColor=colors.HexColor("#616161"),
+    alignment=TA_CENTER,
+    leading=11
+)
+
+# Add a right-aligned style just for the booking date cell
+receipt_right_style = ParagraphStyle(
+    'ReceiptRight',
+    parent=value_style,
+    alignment=TA_RIGHT,
+)
+
+thank_you_style = ParagraphStyle(
+    'ThankYou', parent=styles['Normal'], fontSize=11,
+    textColor=colors.HexColor("#1a237e"), alignment=TA_CENTER,
+    fontName='Helvetica-Bold', spaceAfter=4
+)
+
+STATUS_BADGE_COLORS = {
+    'pending': (colors.HexColor("#fff3cd"), colors.HexColor("#856404")),
+    'approved': (colors.HexColor("#d4edda"), colors.HexColor("#155724")),
+    'rejected': (colors.HexColor("#f8d7da"), colors.HexColor("#721c24"))
+}
+DEFAULT_BADGE_COLORS = (colors.HexColor("#e0e0e0"), colors.black)
+
+
+@lru_cache(maxsize=None)
+def status_badge_styles(status):
+    """Paragraph and table style for the status badge, built once per status."""
+    bg_color, text_color = STATUS_BADGE_COLORS.get(status.lower(), DEFAULT_BADGE_COLORS)
+    status_para = ParagraphStyle(
+        'StatusBadge',
+        parent=styles['Normal'],
+        fontSize=13,
+        textColor=text_color,
+        alignment=TA_CENTER,
+        fontName='Helvetica-Bold'
+    )
+    table_style = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, -1), bg_color),
+        ('BOX', (0, 0), (-1, -1), 2, text_color),
+        ('TOPPADDING', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
+    ])
+    return status_para, table_style
+
+
+
+def receipt_context(booking, receipt_number=None, issue_date_str=None, admin_remarks=''):
+    """Snapshot a booking plus the receipt query params into a picklable dict."""
+    issue_date = booking.created_at
+    if issue_date_str:
+        try:
+            issue_date = datetime.strptime(issue_date_str, '%Y-%m-%d')
+        except ValueError:
+            pass
+
+    return {
+        'booking': {field: getattr(booking, field) for field in RECEIPT_FIELDS},
+        'receipt_number': receipt_number or f"SVM-{str(booking.id).zfill(4)}",
+        'issue_date': issue_date,
+        'admin_remarks': admin_remarks or '',
+    }
+
+
+def receipt_digest(context):
+    """Content hash of everything that ends up on the PDF."""
+    payload = json.dumps(context, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def receipt_filename(context):
+    return f'Receipt_{context["receipt_number"].replace("/", "_")}.pdf'
+
+
+def draw_modern_header(c, doc):
+    """Draw modern header with gradient background"""
+    width, height = A4
+    
+    # Top gradient banner - compact
+    c.setFillColor(HEADER_BANNER_COLOR)
+    c.rect(0, height - 75, width, 75, fill=1, stroke=0)
+    
+    # Accent stripe
+    c.setFillColor(ACCENT_COLOR)
+    c.rect(0, height - 82, width, 7, fill=1, stroke=0)
+    
+    # Bottom accent line
+    c.setStrokeColor(ACCENT_COLOR)
+    c.setLineWidth(2)
+    c.line(40, height - 88, width - 40, height - 88)
+
+
+@lru_cache(maxsize=1)
+def watermark_image():
+    """
+    Decode and fade the watermark once per process; every receipt reuses the
+    resulting ImageReader. Returns None when the image cannot be loaded.
+    """
+    try:
+        img = Image.open(WATERMARK_PATH).convert("RGBA")
+        r, g, b, a = img.split()
+        a = a.point(lambda i: int(i * 0.35))
+        img.putalpha(a)
+
+        png_buffer = BytesIO()
+        img.save(png_buffer, format="PNG")
+        png_buffer.seek(0)
+        return ImageReader(png_buffer)
+    except Exception as e:
+        logger.warning("Receipt watermark skipped: %s", e)
+        return None
+
+
+def first_page(c, doc):
+    width, height = A4
+
+    # Watermark
+    watermark = watermark_image()
+    if watermark is not None:
+        c.saveState()
+        c.drawImage(
+            watermark,
+            0, 0,
+            width=width,
+            height=height,
+            mask='auto',
+            preserveAspectRatio=False
+        )
+        c.restoreState()
+
+    # Header
+    c.saveState()
+    draw_modern_header(c, doc)
+    c.setFont('Helvetica-Bold', 20)
+    c.setFillColor(colors.white)
+    c.drawCentredString(width / 2, height - 35, "Sri Vari Thirumana Mandapam A/C")
+    c.setFont('Helvetica', 9)
+    c.setFillColor(HEADER_SUBTITLE_COLOR)
+    c.drawCentredString(width / 2, height - 50, "Grand Marriage & Party Hall")
+    c.drawCentredString(width / 2, height - 62, "Booking Confirmation Receipt")
+    c.restoreState()
+
+
+# Process-wide: see binary_streams
+_a85_lock = threading.Lock()
+_a85_renders = 0
+_a85_saved = None
+
+
+@contextmanager
+def binary_streams():
+    """
+    Write Flate-only (not ASCII85) streams while receipts are being built.
+    Without the optional C accelerator ReportLab's ASCII85 encoder is pure
+    Python; skipping it makes a receipt about four times faster to render and
+    a fifth smaller.
+
+    ReportLab has no per-document switch, only the global
+    ``rl_config.useA85``, so this does change process-wide state: anything
+    else building a PDF in this process while a receipt renders also gets
+    Flate-only streams. Those are still valid PDFs, just not 7-bit clean.
+    A refcount restores the previous value once the last concurrent render
+    finishes, so outside receipt rendering ReportLab behaves as configured.
+    """
+    global _a85_renders, _a85_saved
+    with _a85_lock:
+        if not _a85_renders:
+            _a85_saved, rl_config.useA85 = rl_config.useA85, 0
+        _a85_renders += 1
+    try:
+        yield
+    finally:
+        with _a85_lock:
+            _a85_renders -= 1
+            if not _a85_renders:
+                rl_config.useA85 = _a85_saved
+
+
+def render_receipt(context):
+    """Build the receipt PDF for ``context`` and return its bytes."""
+    booking = context['booking']
+    issue_date = context['issue_date']
+    admin_remarks = context['admin_remarks']
+    receipt_number = context['receipt_number']
+
+    output = BytesIO()
+
+    # Create PDF with optimized margins
+    doc = SimpleDocTemplate(
+        output,
+        pagesize=A4,
+        rightMargin=38,
+        leftMargin=38,
+        topMargin=98,
+        bottomMargin=32
+    )
+
+    story = []
+
+    # Receipt Info Bar
+    story.append(Spacer(1, 5))
+
+    # Format issue date
+    if hasattr(issue_date, 'strftime'):
+        formatted_issue_date = issue_date.strftime('%d %b %Y')
+    else:
+        formatted_issue_date = str(issue_date)
+
+    receipt_data = [
+        [
+            Paragraph(f"<b>Receipt:</b> {receipt_number}", value_style),
+            Paragraph(f"<b>Booking Date:</b> {formatted_issue_date}", receipt_right_style),
+        ]
+    ]
+
+    status_colors = {
+        'pending': colors.HexColor("#fff9e6"),
+        'approved': colors.HexColor("#e8f5e9"),
+        'rejected': colors.HexColor("#ffebee")
+    }
+
+    receipt_table = Table(receipt_data, colWidths=[270, 270])
+    receipt_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, -1), status_colors.get(booking['status'].lower(), colors.HexColor("#f5f5f5"))),
+        ('BOX', (0, 0), (-1, -1), 1.5, colors.HexColor("#00bcd4")),
+        ('ALIGN', (0, 0), (0, 0), 'LEFT'),
+        ('VALIGN', (1, 0), (1, 0), 'RIGHT'),
+        ('TOPPADDING', (0, 0), (-1, -1), 9),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 9),
+        ('LEFTPADDING', (0, 0), (-1, -1), 12),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 12),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ]))
+
+    story.append(receipt_table)
+    story.append(Spacer(1, 10))
+
+    # Customer Information
+    story.append(Paragraph("CUSTOMER INFORMATION", section_style))
+    story.append(Spacer(1, 2))
+
+    customer_data = [
+        [Paragraph("Full Name", label_style), Paragraph(booking['name'], value_style)],
+        [Paragraph("Contact", label_style), Paragraph(booking['phone'] or "NA", value_style)],
+        [Paragraph("Email", label_style), Paragraph(booking['email'] or "NA", value_style)],
+        [Paragraph("Address", label_style), Paragraph(booking['address_line'] or "NA", value_style)],
+    ]
+
+    customer_table = Table(customer_data, colWidths=[130, 410])
+    customer_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor("#e3f2fd")),
+        ('LINEBELOW', (0, 0), (-1, -2), 0.5, colors.HexColor("#90caf9")),
+        ('LINEBELOW', (0, -1), (-1, -1), 0, colors.white),
+        ('TOPPADDING', (0, 0), (-1, -1), 5),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
+        ('LEFTPADDING', (0, 0), (-1, -1), 12),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 12),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ]))
+
+    story.append(customer_table)
+    story.append(Spacer(1, 10))
+
+    # Event Details
+    story.append(Paragraph("EVENT DETAILS", section_style))
+    story.append(Spacer(1, 2))
+
+    same_day = booking['from_date'] == booking['to_date']
+    if not booking['from_date']:
+        event_date_str = "N/A"
+    elif same_day or not booking['to_date']:
+        event_date_str = booking['from_date'].strftime('%d %B %Y')
+    else:
+        event_date_str = f"{booking['from_date'].strftime('%d %b')} - {booking['to_date'].strftime('%d %b %Y')}"
+
+    event_data = [
+        [Paragraph("Event Type", label_style), Paragraph(booking['event_type'], value_style)],
+        [Paragraph("Event Date", label_style), Paragraph(event_date_str, value_style)],
+        [Paragraph("Event Time", label_style), Paragraph(
+            f"{booking['start_time'].strftime('%I:%M %p') if booking['start_time'] else 'N/A'} - "
+            f"{booking['end_time'].strftime('%I:%M %p') if booking['end_time'] else 'N/A'}",
+            value_style
+        )],
+        [Paragraph("Expected Guests", label_style), Paragraph(f"{booking['estimated_guests']} Guests", value_style)],
+        [Paragraph("Food Preference", label_style), Paragraph(booking['food_preference'] or "To be decided", value_style)],
+    ]
+
+    event_table = Table(event_data, colWidths=[130, 410])
+    event_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor("#e3f2fd")),
+        ('LINEBELOW', (0, 0), (-1, -2), 0.5, colors.HexColor("#90caf9")),
+        ('LINEBELOW', (0, -1), (-1, -1), 0, colors.white),
+        ('TOPPADDING', (0, 0), (-1, -1), 5),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
+        ('LEFTPADDING', (0, 0), (-1, -1), 12),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 12),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ]))
+
+    story.append(event_table)
+
+    # Special Requests
+    if booking['message']:
+        story.append(Spacer(1, 10))
+        story.append(Paragraph("ADDITIONAL INQUERIES", section_style))
+        story.append(Spacer(1, 2))
+        message_data = [[Paragraph(booking['message'], value_style)]]
+        message_table = Table(message_data, colWidths=[540])
+        message_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor("#fff3e0")),
+            ('BOX', (0, 0), (-1, -1), 1, colors.HexColor("#ffb74d")),
+            ('TOPPADDING', (0, 0), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+            ('LEFTPADDING', (0, 0), (-1, -1), 12),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 12),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ]))
+
+        story.append(message_table)
+
+    # Admin Remarks
+    if admin_remarks and admin_remarks.strip():
+        story.append(Spacer(1, 10))
+        story.append(Paragraph("FURTHER DETAILS", section_style))
+        story.append(Spacer(1, 2))
+
+        from html import escape
+        safe_remarks = escape(admin_remarks)
+        remarks_data = [[Paragraph(safe_remarks, value_style)]]
+        remarks_table = Table(remarks_data, colWidths=[540])
+        remarks_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor("#fffbe6")),
+            ('BOX', (0, 0), (-1, -1), 1.5, colors.HexColor("#ffc107")),
+            ('TOPPADDING', (0, 0), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+            ('LEFTPADDING', (0, 0), (-1, -1), 12),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 12),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ]))
+
+        story.append(remarks_table)
+
+    # Status Badge
+    story.append(Spacer(1, 12))
+
+    status_para, status_table_style = status_badge_styles(booking['status'])
+    status_data = [[Paragraph(f"BOOKING STATUS: {booking['status'].upper()}", status_para)]]
+    status_table = Table(status_data, colWidths=[540])
+    status_table.setStyle(status_table_style)
+
+    story.append(status_table)
+    story.append(Spacer(1, 10))
+
+    # Footer
+    divider = Table([['']], colWidths=[540])
+    divider.setStyle(TableStyle([
+        ('LINEABOVE', (0, 0), (-1, -1), 1.5, colors.HexColor("#00bcd4")),
+    ]))
+    story.append(divider)
+    story.append(Spacer(1, 6))
+
+    story.append(Paragraph(
+        "<b>Thank You for Choosing Sri Vari Thirumana Mandapam A/C</b>",
+        thank_you_style
+    ))
+
+    story.append(Paragraph(
+        "<b>We look forward to making your celebration truly memorable.</b>",
+        footer_style
+    ))
+    story.append(Spacer(1, 5))
+
+    contact_data = [
+        [Paragraph("<b>Phone: +91 98431 86231 | +91 88702 01981</b>", footer_style)],
+        [Paragraph("<b>Email: srivarimahal2025kpm@gmail.com</b>", footer_style)],
+        [Paragraph("<b>Sri Vari Thirumana Mandapam A/C - Grand Marriage & Party Hall, Kannadasan Street, Abirami Nagar, Baluchetty Chatram, Sirunaiperugal, Kanchipuram - 631551</b>", footer_style)]
+    ]
+
+    contact_table = Table(contact_data, colWidths=[540])
+    contact_table.setStyle(TableStyle([
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('TOPPADDING', (0, 0), (-1, -1), 2),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+    ]))
+
+    story.append(contact_table)
+    story.append(Spacer(1, 5))
+
+    with binary_streams():
+        doc.build(story, onFirstPage=first_page)
+    return output.getvalue()
+
+
+class ReceiptCache:
+    """
+    Rendered receipts on disk under ``MEDIA_ROOT/receipts``.
+
+    Files are named ``<booking id>-<digest>.pdf`` so a booking's receipts can be
+    dropped when the booking changes. Each hit refreshes the file's mtime and
+    the least recently used files are evicted once the directory grows past
+    ``RECEIPT_CACHE_MAX_BYTES``. The directory is scanned for eviction at most
+    once per ``EVICT_INTERVAL_SECONDS``, or sooner once a tenth of the limit
+    has been written since the last scan.
+    """
+    EVICT_INTERVAL_SECONDS = 60
+
+    def __init__(self, directory=None, max_bytes=None):
+        self.directory = directory or os.path.join(settings.MEDIA_ROOT, 'receipts')
+        self.max_bytes = max_bytes or getattr(settings, 'RECEIPT_CACHE_MAX_BYTES', 100 * 1024 * 1024)
+        self._evict_lock = threading.Lock()
+        self._evicted_at = None
+        self._written = 0
+
+    def path_for(self, booking_id, digest):
+        return os.path.join(self.directory, f"{booking_id}-{digest}.pdf")
+
+    def get(self, booking_id, digest):
+        """
+        Open the cached receipt for reading, or return None on a miss. The
+        caller gets a file rather than a path because eviction may remove the
+        path at any moment; an open file stays readable.
+        """
+        path = self.path_for(booking_id, digest)
+        try:
+            fh = open(path, 'rb')
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass  # evicted since it was opened
+        return fh
+
+    def put(self, booking_id, digest, pdf_bytes):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path_for(booking_id, digest)
+        # Write then rename so a concurrent reader never sees a partial file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as fh:
+            fh.write(pdf_bytes)
+        os.replace(tmp_path, path)
+        self._maybe_evict(len(pdf_bytes))
+        return path
+
+    def _maybe_evict(self, size):
+        now = time.monotonic()
+        with self._evict_lock:
+            self._written += size
+            due = (
+                self._evicted_at is None
+                or now - self._evicted_at >= self.EVICT_INTERVAL_SECONDS
+                or self._written * 10 >= self.max_bytes
+            )
+            if not due:
+                return
+            self._evicted_at, self._written = now, 0
+        self.evict()
+
+    def get_or_render(self, context, digest=None):
+        """Return an open binary file of the receipt for ``context``, rendering it on a miss."""
+        digest = digest or receipt_digest(context)
+        booking_id = context['booking']['id']
+        cached = self.get(booking_id, digest)
+        if cached:
+            return cached
+        pdf_bytes = render_receipt(context)
+        self.put(booking_id, digest, pdf_bytes)
+        return BytesIO(pdf_bytes)
+
+    def invalidate(self, booking_id):
+        prefix = f"{booking_id}-"
+        try:
+            entries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            if entry.name.startswith(prefix) and entry.name.endswith('.pdf'):
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+
+    def evict(self):
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.pdf'):
+                try:
+                    info = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((info.st_mtime, info.st_size, entry.path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+receipt_cache = ReceiptCache()
+
+
+# ------------------------------------------------
+# Bulk rendering
+# ------------------------------------------------
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def render_pool():
+    """Process pool shared by bulk requests — ReportLab is CPU-bound and holds the GIL."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = getattr(settings, 'RECEIPT_RENDER_WORKERS', None) or min(4, os.cpu_count() or 1)
+            _pool = ProcessPoolExecutor(max_workers=workers)
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _render_safely(context):
+    try:
+        return render_receipt(context)
+    except Exception as e:
+        return e
+
+
+def _render_all(pending):
+    """
+    Yield ``(context, digest, pdf bytes or exception)`` for each pending
+    receipt as it finishes. The process pool does the work; if it breaks,
+    it is reset and whatever it had not returned is rendered here instead.
+    """
+    done, broken = set(), False
+    try:
+        pool = render_pool()
+        futures = {pool.submit(_render_safely, context): index for index, (context, _) in enumerate(pending)}
+    except BrokenProcessPool:
+        futures, broken = {}, True
+    try:
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except BrokenProcessPool:
+                broken = True
+                break
+            index = futures[future]
+            done.add(index)
+            yield (*pending[index], result)
+    finally:
+        for future in futures:
+            future.cancel()
+    if not broken:
+        return
+
+    # No usable pool — render here rather than fail the download
+    logger.warning("Receipt render pool broke; rendering %s receipt(s) in-process", len(pending) - len(done))
+    _reset_pool()
+    for index, (context, digest) in enumerate(pending):
+        if index not in done:
+            yield context, digest, _render_safely(context)
+
+
+def stream_receipts_zip(contexts, cache=None):
+    """
+    Yield a ZIP of receipts for ``contexts``. Cached PDFs go out first; the rest
+    are rendered in the process pool and written as each one finishes. Receipts
+    that fail to render are listed in an ``errors.txt`` entry instead.
+    """
+    cache = cache or receipt_cache
+    buffer = StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as archive:
+        pending = []
+        for context in contexts:
+            digest = receipt_digest(context)
+            cached = cache.get(context['booking']['id'], digest)
+            if cached:
+                with cached:
+                    archive.writestr(receipt_filename(context), cached.read())
+                yield buffer.drain()
+            else:
+                pending.append((context, digest))
+
+        if pending:
+            errors = []
+            results = _render_all(pending)
+            try:
+                for context, digest, result in results:
+                    if isinstance(result, Exception):
+                        errors.append(f"Booking #{context['booking']['id']}: {result}")
+                        continue
+                    cache.put(context['booking']['id'], digest, result)
+                    archive.writestr(receipt_filename(context), result)
+                    yield buffer.drain()
+            finally:
+                results.close()
+
+            if errors:
+                archive.writestr('errors.txt', "\n".join(errors) + "\n")
+
+    yield buffer.drain()
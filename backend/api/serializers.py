@@ -1,7 +1,18 @@
 # backend/api/serializers.py
-from rest_framework import serializers
-from django.core.exceptions import ValidationError as DjangoValidationError
+import logging
+from datetime import date, time
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+from .availability import availability_index
 from .models import Booking, Expense
+from .overlap import OVERLAP_MESSAGE, is_overlap_error
+
+logger = logging.getLogger(__name__)
 
 class ExpenseSerializer(serializers.ModelSerializer):
     class Meta:
@@ -9,28 +20,40 @@ class ExpenseSerializer(serializers.ModelSerializer):
         fields = "__all__"
         read_only_fields = ['id', 'created_at']
 
-class BookingSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """Accepts ``fields=[...]`` to serialize only those fields."""
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class BookingSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     email = serializers.EmailField(required=False, allow_blank=True, default='')
     alternate_phone = serializers.CharField(required=False, allow_blank=True, default='')
+    # Read from the BookingBalance row (ledger.BALANCE_COLUMNS on the values() path)
+    total_amount = serializers.DecimalField(max_digits=12, decimal_places=2, source='account.total_amount', read_only=True)
+    paid_amount = serializers.DecimalField(max_digits=12, decimal_places=2, source='account.paid_amount', read_only=True)
+    balance_due = serializers.DecimalField(max_digits=12, decimal_places=2, source='account.due', read_only=True)
+    payment_status = serializers.CharField(read_only=True)
 
     class Meta:
         model = Booking
         fields = '__all__'
-    class Meta:
-        model = Booking
-        fields = "__all__"
 
     # ============================
     #  🔍 VALIDATION RULES
     # ============================
     def validate(self, data):
         """
-        - Ensure advance payment must be paid before approval.
-        - paid_amount must be >= advance_amount.
-        - balance = total_amount - paid_amount.
+        - to_date cannot be before from_date.
+        - The slot must not clash with an approved booking (index pre-check).
+        Payments are validated by the ledger, not here.
         """
-        print("🔍 Running serializer validation...")
-        print(f"Data received: {data}")
+        logger.debug("Validating booking data: %s", data)
         
         # Get the instance if this is an update
         instance = self.instance
@@ -44,9 +67,6 @@ class BookingSerializer(serializers.ModelSerializer):
         # Check date logic
         from_date = merged_data.get('from_date')
         to_date = merged_data.get('to_date')
-
-        from_date = merged_data.get('from_date')
-        to_date = merged_data.get('to_date')
         
         if from_date and to_date:
             if to_date < from_date:
@@ -58,48 +78,89 @@ class BookingSerializer(serializers.ModelSerializer):
         temp_instance = instance if instance else Booking()
         for key, value in data.items():
             setattr(temp_instance, key, value)
-        
-        # Run model's clean() method
+
+        # Fast pre-check only: the availability index can be up to
+        # AVAILABILITY_INDEX_TTL seconds stale and differs between workers, so
+        # it may pass a clash it has not seen yet. The database's overlap guard
+        # is the authoritative check; save() turns its rejection into the same error.
+        slot = (temp_instance.from_date, temp_instance.to_date, temp_instance.start_time, temp_instance.end_time)
+        if slot[0] and not availability_index.is_free(*slot, exclude_pk=temp_instance.pk):
+            logger.debug("Booking %s clashes with an approved booking", temp_instance.pk)
+            raise serializers.ValidationError({'non_field_errors': [OVERLAP_MESSAGE]})
+
+        return data
+
+    def save(self, **kwargs):
+        # The database constraint (trigger on SQLite) is the real double-booking
+        # guard: validate() can pass a clash the index has not seen yet, so keep
+        # this mapping of its rejection to a 400.
         try:
-            temp_instance.clean()
-        except DjangoValidationError as e:
-            print(f"Model validation failed: {e.message_dict}")
-            raise serializers.ValidationError(e.message_dict)
-        
-        print("Validation passed")
+            return super().save(**kwargs)
+        except IntegrityError as e:
+            if not is_overlap_error(e):
+                raise
+            raise serializers.ValidationError({'non_field_errors': [OVERLAP_MESSAGE]})
+
+
+class BookingImportSerializer(BookingSerializer):
+    """Field-level checks only; the importer sweeps the whole batch for date conflicts."""
+
+    def validate(self, data):
+        from_date, to_date = data.get('from_date'), data.get('to_date')
+        if from_date and to_date and to_date < from_date:
+            raise serializers.ValidationError({
+                'to_date': 'End date must be after or equal to start date.'
+            })
         return data
-    
-        # total = data.get("total_amount", self.instance.total_amount if self.instance else 0)
-        # advance = data.get("advance_amount", self.instance.advance_amount if self.instance else 0)
-        # paid = data.get("paid_amount", self.instance.paid_amount if self.instance else 0)
-        # status_value = data.get("status", self.instance.status if self.instance else "pending")
-        instance = Booking(**data)
-        instance.clean()
-
-        # ⚠️ Rule 1 — paid_amount cannot exceed total
-        # if paid > total:
-        #     raise serializers.ValidationError({
-        #         "paid_amount": "Paid amount cannot be greater than total amount."
-        #     })
-
-        # ⚠️ Rule 2 — must pay at least advance amount before confirmation
-        # if status_value == "approved" and paid < advance:
-        #     raise serializers.ValidationError({
-        #         "paid_amount": "Advance amount must be fully paid before booking approval."
-        #     })
 
-    # ============================
-    #  💾 Update balance automatically
-    # ============================
-    # def update(self, instance, validated_data):
-    #     instance = super().update(instance, validated_data)
-    #     # Auto-calc balance
-    #     instance.balance = instance.total_amount - instance.paid_amount
-    #     instance.save()
-    #     return instance
-    
-    # def create(self, validated_data):
-    #     booking = super().create(validated_data)
-    #     booking.balance = booking.total_amount - booking.paid_amount
-    #     booking.save()
-    #     return booking
\ No newline at end of file
+
+# Fields whose to_representation() is a no-op for the values the database hands back
+PASSTHROUGH_FIELDS = (serializers.CharField, serializers.ChoiceField, serializers.IntegerField,
+                      serializers.BooleanField)
+
+
+def _row_converter(field, tz):
+    if isinstance(field, PASSTHROUGH_FIELDS):
+        return None
+    if isinstance(field, serializers.DateField) and getattr(field, 'format', api_settings.DATE_FORMAT) == ISO_8601:
+        return date.isoformat
+    if isinstance(field, serializers.TimeField) and getattr(field, 'format', api_settings.TIME_FORMAT) == ISO_8601:
+        return time.isoformat
+    if isinstance(field, serializers.DateTimeField) and tz is not None and not hasattr(field, 'timezone'):
+        # Pin the zone once instead of looking up the active one for every row
+        return serializers.DateTimeField(default_timezone=tz).to_representation
+    return field.to_representation
+
+
+@lru_cache(maxsize=64)
+def _row_plan(fields, tz):
+    serializer = BookingSerializer(fields=list(fields) if fields is not None else None)
+    return tuple((name, _row_converter(field, tz)) for name, field in serializer.fields.items())
+
+
+class BookingRowSerializer:
+    """
+    Read-only twin of ``BookingSerializer`` for safe methods.
+
+    Works on ``values()`` rows instead of model instances and runs one
+    precompiled converter per field, so list/retrieve skip validators and
+    DRF's per-field dispatch. The output matches ``BookingSerializer.data``.
+    """
+
+    def __init__(self, fields=None):
+        tz = timezone.get_current_timezone() if settings.USE_TZ else None
+        self.plan = _row_plan(tuple(fields) if fields is not None else None, tz)
+
+    @property
+    def columns(self):
+        return [name for name, _ in self.plan]
+
+    def to_representation(self, row):
+        data = {}
+        for name, convert in self.plan:
+            value = row[name]
+            data[name] = value if convert is None or value is None else convert(value)
+        return data
+
+    def many(self, rows):
+        return [self.to_representation(row) for row in rows]
@@ -0,0 +1,110 @@
+from django.db import connections, transaction
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_save
+from django.dispatch import receiver
+
+from .analytics import invalidate_analytics
+from .availability import availability_index
+from .calendar import invalidate_months
+from .expenses import invalidate_summary
+from .models import Booking, Expense, FreeBookingId
+from .occupancy import booking_slot, occupancy_map
+from .overlap import ensure_sqlite_triggers
+from .receipts import receipt_cache
+from .stats import record_change, stat_key
+
+# Booking columns other receivers need to compare against after an update
+TRACKED_FIELDS = ('from_date', 'to_date', 'event_type', 'status')
+
+
+@receiver(pre_save, sender=Booking)
+def remember_previous_booking(sender, instance, **kwargs):
+    """Keep the stored values so post_save receivers can undo their effect."""
+    instance._previous = None
+    if not instance._state.adding and instance.pk:
+        instance._previous = (
+            Booking.objects.filter(pk=instance.pk).values(*TRACKED_FIELDS).first()
+        )
+
+
+@receiver(post_delete, sender=Booking)
+def release_booking_id(sender, instance, **kwargs):
+    """Hand the deleted booking's ID back to the allocator."""
+    FreeBookingId.objects.get_or_create(id=instance.pk)
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def invalidate_availability(sender, instance, **kwargs):
+    # The index holds approved bookings only; pending requests leave it valid
+    previous = getattr(instance, '_previous', None) or {}
+    if 'approved' in (previous.get('status'), instance.status):
+        availability_index.invalidate()
+
+
+@receiver(post_save, sender=Booking)
+def update_occupancy(sender, instance, **kwargs):
+    # Applied after commit, so a rolled-back save never reaches the map
+    changes = [(instance.pk, booking_slot(instance))]
+    transaction.on_commit(lambda: occupancy_map.apply(changes))
+
+
+@receiver(post_delete, sender=Booking)
+def remove_from_occupancy(sender, instance, **kwargs):
+    changes = [(instance.pk, None)]
+    transaction.on_commit(lambda: occupancy_map.apply(changes))
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def invalidate_calendar(sender, instance, **kwargs):
+    # After commit, so a feed read in between cannot cache the old rows under the new token
+    previous = getattr(instance, '_previous', None) or {}
+    ranges = [
+        (previous.get('from_date'), previous.get('to_date')),
+        (instance.from_date, instance.to_date),
+    ]
+    transaction.on_commit(lambda: invalidate_months(*ranges))
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def invalidate_receipts(sender, instance, **kwargs):
+    # After commit, so a receipt rendered in between from the old row is dropped too
+    booking_id = instance.pk
+    transaction.on_commit(lambda: receipt_cache.invalidate(booking_id))
+
+
+@receiver(post_save, sender=Booking)
+def update_daily_stats(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous', None)
+    record_change(
+        stat_key(previous['from_date'], previous['event_type'], previous['status']) if previous else None,
+        stat_key(instance.from_date, instance.event_type, instance.status),
+    )
+
+
+@receiver(post_delete, sender=Booking)
+def remove_from_daily_stats(sender, instance, **kwargs):
+    record_change(stat_key(instance.from_date, instance.event_type, instance.status), None)
+
+
+@receiver(post_save, sender=Expense)
+@receiver(post_delete, sender=Expense)
+def invalidate_expense_summary(sender, instance, **kwargs):
+    # After commit, so a summary read in between cannot cache the old rows again
+    transaction.on_commit(invalidate_summary)
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+@receiver(post_save, sender=Expense)
+@receiver(post_delete, sender=Expense)
+def invalidate_dashboard_analytics(sender, instance, **kwargs):
+    transaction.on_commit(invalidate_analytics)
+
+
+@receiver(post_migrate)
+def restore_overlap_triggers(sender, using, **kwargs):
+    """SQLite table rebuilds drop triggers; put the double-booking guard back."""
+    if sender.name == 'api':
+        ensure_sqlite_triggers(connections[using])
@@ -0,0 +1,75 @@
+"""Building blocks for responses that are generated while they are sent."""
+import csv
+import zlib
+
+from asgiref.sync import sync_to_async
+
+
+class StreamBuffer:
+    """
+    Write-only file object that a generator drains between writes.
+
+    It has no ``seek``/``tell``, so ``zipfile`` treats it as unseekable and
+    writes entries with data descriptors — nothing has to be revisited once
+    it has been sent.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class Echo:
+    """Pseudo-buffer for ``csv.writer``: ``write`` just hands the line back."""
+
+    def write(self, value):
+        return value
+
+
+def csv_stream(header, rows, rows_per_chunk=500):
+    """Yield CSV text a chunk of rows at a time."""
+    writer = csv.writer(Echo())
+    chunk = [writer.writerow(header)]
+    for row in rows:
+        chunk.append(writer.writerow(row))
+        if len(chunk) >= rows_per_chunk:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+def gzip_stream(chunks, encoding='utf-8', level=6):
+    """Gzip a stream of text chunks on the fly."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31 → gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode(encoding))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+async def async_chunks(chunks):
+    """
+    Hand a sync generator to an async response one chunk at a time.
+
+    Under ASGI Django buffers a sync streaming body whole before sending it;
+    pulling each chunk through ``sync_to_async`` keeps it streaming. Chunks
+    run on the request's sync thread, where any open DB cursor lives.
+    """
+    iterator = iter(chunks)
+    done = object()
+    step = sync_to_async(next)
+    while (chunk := await step(iterator, done)) is not done:
+        yield chunk
@@ -0,0 +1,871 @@
+import json
+import os
+import tempfile
+import zipfile
+from datetime import date, time, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from reportlab import rl_config
+from rest_framework.test import APIClient
+
+from .availability import availability_index
+from . import importer, outbox, payments
+from .benchmarking import api_client, clear_caches, scratch_receipt_cache
+from .management.commands import check_query_budgets as budgets
+from .ledger import record_payment, set_total
+from .models import (
+    Booking, BookingBalance, BookingDailyStat, BookingVersionConflict, Expense, FreeBookingId, OutboundEmail,
+    Payment,
+)
+from .overlap import OVERLAP_MESSAGE, is_overlap_error
+from .receipts import binary_streams, receipt_cache, receipt_context, receipt_digest, stream_receipts_zip
+from .stats import rebuild
+
+
+def make_booking(day, status='pending', **fields):
+    fields.setdefault('name', "Test Guest")
+    fields.setdefault('phone', "9800000000")
+    fields.setdefault('event_type', "Wedding")
+    fields.setdefault('to_date', day)
+    return Booking.objects.create(from_date=day, status=status, **fields)
+
+
+class APITestBase(TestCase):
+    """Staff-authenticated client with the cached read models cleared."""
+
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create(username='staff'))
+
+
+class QueryBudgetTests(TransactionTestCase):
+    """The ``check_query_budgets`` probes, so a budget regression fails the test run."""
+
+    def test_every_route_has_a_budget(self):
+        self.assertEqual(budgets.missing_budgets(), [])
+
+    def test_every_probe_stays_within_budget(self):
+        # Outside a test transaction, so query counts match the command's
+        with budgets.probe_environment():
+            budgets.seed_data()
+            results = budgets.run_probes(api_client())
+        for result in results:
+            with self.subTest(route=result.name, request=result.label):
+                self.assertEqual(budgets.over_budget(result), [])
+
+
+class BookingIdTests(TestCase):
+    def test_ids_count_up_and_reuse_the_lowest_freed_one(self):
+        first, second, third = (make_booking(date(2030, 1, day)) for day in (1, 2, 3))
+        self.assertEqual([first.pk, second.pk, third.pk], [1, 2, 3])
+        second.delete()
+        first.delete()
+        self.assertEqual(make_booking(date(2030, 1, 4)).pk, 1)
+        self.assertEqual(make_booking(date(2030, 1, 5)).pk, 2)
+        self.assertEqual(make_booking(date(2030, 1, 6)).pk, 4)
+        self.assertFalse(FreeBookingId.objects.exists())
+
+    def test_deleting_the_newest_booking_frees_its_id(self):
+        make_booking(date(2030, 1, 1))
+        make_booking(date(2030, 1, 2)).delete()
+        self.assertEqual(make_booking(date(2030, 1, 3)).pk, 2)
+
+    def test_bulk_allocation_takes_freed_ids_first(self):
+        for day in range(1, 6):
+            make_booking(date(2030, 1, day))
+        Booking.objects.get(pk=2).delete()
+        Booking.objects.get(pk=5).delete()
+        self.assertEqual(Booking._allocate_ids(4), [2, 5, 6, 7])
+        self.assertFalse(FreeBookingId.objects.exists())
+
+    def test_a_stale_free_id_is_skipped(self):
+        existing = make_booking(date(2030, 1, 1))
+        FreeBookingId.objects.create(id=existing.pk)
+        self.assertEqual(make_booking(date(2030, 1, 2)).pk, 2)
+        self.assertFalse(FreeBookingId.objects.exists())
+
+
+class OverlapCheckTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        make_booking(date(2030, 5, 10), 'approved', to_date=date(2030, 5, 12))
+        make_booking(date(2030, 6, 1), 'approved', start_time=time(10), end_time=time(14))
+
+    def assertClashes(self, clashes, day, **fields):
+        booking = Booking(name="Other", phone="9800000001", event_type="Party", from_date=day, **fields)
+        if clashes:
+            with self.assertRaises(ValidationError):
+                booking.clean()
+        else:
+            booking.clean()
+        span = dict(fields, to_date=fields.get('to_date', day))
+        self.assertEqual(availability_index.is_free(day, **span), not clashes)
+
+    def test_date_ranges(self):
+        self.assertClashes(True, date(2030, 5, 12))
+        self.assertClashes(True, date(2030, 5, 8), to_date=date(2030, 5, 10))
+        self.assertClashes(False, date(2030, 5, 13))
+        self.assertClashes(False, date(2030, 5, 7), to_date=date(2030, 5, 9))
+
+    def test_time_windows_on_the_same_day(self):
+        self.assertClashes(True, date(2030, 6, 1), start_time=time(13), end_time=time(15))
+        self.assertClashes(True, date(2030, 6, 1))
+        self.assertClashes(False, date(2030, 6, 1), start_time=time(14), end_time=time(18))
+        self.assertClashes(False, date(2030, 6, 1), start_time=time(8), end_time=time(10))
+
+    def test_pending_bookings_do_not_block(self):
+        make_booking(date(2030, 7, 1))
+        self.assertClashes(False, date(2030, 7, 1))
+
+    def test_a_booking_does_not_clash_with_itself(self):
+        booking = Booking.objects.get(from_date=date(2030, 5, 10))
+        booking.clean()
+        self.assertTrue(availability_index.is_free(booking.from_date, booking.to_date, exclude_pk=booking.pk))
+
+    def test_index_sees_bookings_approved_after_it_was_built(self):
+        self.assertClashes(False, date(2030, 8, 1))
+        make_booking(date(2030, 8, 1), 'approved')
+        self.assertFalse(availability_index.is_free(date(2030, 8, 1)))
+
+    def test_check_endpoint(self):
+        url = '/api/availability/check/'
+        self.assertEqual(self.client.get(url, {'from_date': '2030-05-11'}).json(), {'available': False})
+        self.assertEqual(self.client.get(url, {'from_date': '2030-05-13'}).json(), {'available': True})
+        self.assertEqual(self.client.get(url, {
+            'from_date': '2030-06-01', 'start_time': '14:00', 'end_time': '16:00',
+        }).json(), {'available': True})
+        self.assertEqual(self.client.get(url).status_code, 400)
+        self.assertEqual(self.client.get(url, {'from_date': '2030-05-13', 'to_date': '2030-05-12'}).status_code, 400)
+
+
+class CalendarFeedTests(TestCase):
+    url = '/api/bookings/dates/'
+    window = {'start': '2030-03-01', 'end': '2030-04-30'}
+
+    def setUp(self):
+        clear_caches()
+
+    def titles(self):
+        return [event['title'] for event in self.client.get(self.url, self.window).json()]
+
+    def test_events_in_the_window(self):
+        make_booking(date(2030, 3, 31), event_type="Wedding", to_date=date(2030, 4, 2))
+        make_booking(date(2030, 4, 10), 'rejected', event_type="Party")
+        make_booking(date(2030, 5, 10), event_type="Meeting")
+        response = self.client.get(self.url, self.window)
+        self.assertEqual(response.json(), [
+            {'title': "Wedding", 'start': '2030-03-31T00:00:00', 'end': '2030-04-02T23:59:59'},
+        ])
+        self.assertEqual(self.client.get(self.url, {'start': '2030-05-01', 'end': '2030-04-01'}).status_code, 400)
+
+    def test_unchanged_months_answer_304(self):
+        etag = self.client.get(self.url, self.window)['ETag']
+        self.assertEqual(self.client.get(self.url, self.window, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_a_write_invalidates_its_months_after_commit(self):
+        booking = make_booking(date(2030, 3, 5), event_type="Wedding")
+        etag = self.client.get(self.url, self.window)['ETag']
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            booking.event_type = "Reception"
+            booking.save()
+            # Not yet committed: the cached months stay current
+            self.assertEqual(self.titles(), ["Wedding"])
+        for callback in callbacks:
+            callback()
+
+        response = self.client.get(self.url, self.window, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.titles(), ["Reception"])
+
+    def test_moving_a_booking_clears_both_months(self):
+        booking = make_booking(date(2030, 3, 5))
+        self.assertEqual(len(self.titles()), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.from_date = booking.to_date = date(2030, 6, 5)
+            booking.save()
+        self.assertEqual(self.titles(), [])
+
+
+class DashboardStatsTests(APITestBase):
+    url = '/api/dashboard-stats/'
+
+    def test_counts_come_from_the_stats_table(self):
+        make_booking(date(2030, 1, 5), event_type="Wedding")
+        make_booking(date(2030, 1, 9), 'approved', event_type="Party")
+        make_booking(date(2031, 2, 1), 'approved', event_type="Wedding")
+        self.assertEqual(BookingDailyStat.objects.aggregate(total=Sum('count'))['total'], 3)
+
+        data = self.client.get(self.url, {'year': 2030}).json()
+        self.assertEqual(data['total_bookings'], 2)
+        self.assertEqual(data['unread_inquiries'], 1)
+        self.assertEqual(data['bookings_per_month'], [{'year': 2030, 'month': 1, 'count': 2}])
+        self.assertEqual(
+            sorted(data['event_type_distribution'], key=lambda row: row['event_type']),
+            [{'event_type': "Party", 'count': 1}, {'event_type': "Wedding", 'count': 1}],
+        )
+        self.assertEqual(self.client.get(self.url, {'from': '2030-06', 'to': '2030-01'}).status_code, 400)
+
+    def test_status_changes_and_deletes_move_the_counts(self):
+        booking = make_booking(date(2030, 1, 5))
+        booking.status = 'approved'
+        booking.save()
+        self.assertEqual(self.client.get(self.url).json()['unread_inquiries'], 0)
+        booking.delete()
+        self.assertEqual(self.client.get(self.url).json()['total_bookings'], 0)
+
+    def test_a_stale_table_is_not_trusted(self):
+        make_booking(date(2030, 1, 1))
+        # bulk_create skips the signals that keep the table current
+        Booking.objects.bulk_create([
+            Booking(id=day + 1, name="Bulk", phone="9800000000", event_type="Wedding",
+                    from_date=date(2030, 1, day), to_date=date(2030, 1, day))
+            for day in range(1, 31)
+        ])
+        with self.assertLogs('api.stats', 'WARNING'):
+            self.assertEqual(self.client.get(self.url).json()['total_bookings'], 31)
+
+        rebuild()
+        with self.assertNoLogs('api.stats', 'WARNING'):
+            self.assertEqual(self.client.get(self.url).json()['total_bookings'], 31)
+
+
+class ReceiptCacheTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        self.enterContext(scratch_receipt_cache())
+        self.booking = make_booking(date(2030, 1, 5))
+        self.url = f'/api/bookings/{self.booking.pk}/receipt/'
+
+    def cached_files(self):
+        return sorted(os.listdir(receipt_cache.directory)) if os.path.isdir(receipt_cache.directory) else []
+
+    def download(self, **headers):
+        response = self.client.get(self.url, **headers)
+        body = b''.join(response.streaming_content) if response.status_code == 200 else b''
+        return response, body
+
+    def test_rendered_once_then_served_from_disk(self):
+        response, body = self.download()
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(body.startswith(b'%PDF'))
+        digest = response['ETag'].strip('"')
+        self.assertEqual(self.cached_files(), [f"{self.booking.pk}-{digest}.pdf"])
+
+        _, cached_body = self.download()
+        self.assertEqual(cached_body, body)
+        self.assertEqual(self.download(HTTP_IF_NONE_MATCH=response['ETag'])[0].status_code, 304)
+
+    def test_an_open_receipt_survives_eviction(self):
+        context = receipt_context(self.booking)
+        digest = receipt_digest(context)
+        receipt_cache.get_or_render(context, digest).close()
+
+        cached = receipt_cache.get(self.booking.pk, digest)
+        receipt_cache.invalidate(self.booking.pk)
+        with cached:
+            self.assertTrue(cached.read().startswith(b'%PDF'))
+        self.assertIsNone(receipt_cache.get(self.booking.pk, digest))
+
+    def test_zip_of_cached_receipts(self):
+        context = receipt_context(self.booking)
+        receipt_cache.get_or_render(context).close()
+        archive = zipfile.ZipFile(BytesIO(b''.join(stream_receipts_zip([context]))))
+        self.assertEqual(archive.namelist(), [f"Receipt_SVM-{self.booking.pk:04d}.pdf"])
+        self.assertTrue(archive.read(archive.namelist()[0]).startswith(b'%PDF'))
+
+    def test_a_booking_write_drops_its_receipts_after_commit(self):
+        self.download()
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.booking.name = "Renamed Guest"
+            self.booking.save()
+        self.assertEqual(len(self.cached_files()), 1)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.cached_files(), [])
+
+
+class ReceiptRenderTests(TestCase):
+    def test_a85_is_only_off_while_rendering(self):
+        configured = rl_config.useA85
+        with binary_streams():
+            with binary_streams():
+                self.assertEqual(rl_config.useA85, 0)
+            self.assertEqual(rl_config.useA85, 0)
+        self.assertEqual(rl_config.useA85, configured)
+
+
+class FakeConnection:
+    """Stands in for the SMTP connection: fails the given subjects, or refuses to connect."""
+
+    def __init__(self, failing=(), refuse=False):
+        self.failing, self.refuse = set(failing), refuse
+        self.opened, self.sent = 0, []
+
+    def open(self):
+        if self.refuse:
+            raise ConnectionRefusedError("Connection refused")
+        self.opened += 1
+
+    def close(self):
+        pass
+
+    def send_messages(self, messages):
+        if messages[0].subject in self.failing:
+            raise OSError("Mailbox unavailable")
+        self.sent.extend(message.subject for message in messages)
+
+
+class OutboxTests(TestCase):
+    def deliver(self, connection, **kwargs):
+        with mock.patch.object(outbox, 'get_connection', return_value=connection):
+            return outbox.deliver_batch(**kwargs)
+
+    def test_queued_email_is_sent(self):
+        email = outbox.enqueue("Booking confirmed", "See you soon", "guest@example.com")
+        result = outbox.deliver_batch()
+        self.assertEqual((result['claimed'], result['sent'], result['failed']), (1, 1, 0))
+        self.assertEqual([message.to for message in mail.outbox], [["guest@example.com"]])
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('sent', 1))
+        self.assertEqual(outbox.outbox_stats()['depth'], 0)
+
+    def test_claiming_counts_an_attempt_and_leases_the_row(self):
+        email = outbox.enqueue("Hello", "Body", "guest@example.com")
+        self.assertEqual([claimed.attempts for claimed in outbox.claim_batch(10)], [1])
+        self.assertEqual(outbox.claim_batch(10), [])
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('sending', 1))
+        self.assertEqual(outbox.outbox_stats()['depth'], 1)
+
+    def test_an_expired_lease_on_the_last_attempt_fails_the_email(self):
+        email = outbox.enqueue("Hello", "Body", "guest@example.com")
+        OutboundEmail.objects.filter(pk=email.pk).update(
+            status='sending', attempts=outbox.MAX_ATTEMPTS, next_attempt_at=timezone.now() - timedelta(seconds=1),
+        )
+        self.assertEqual(outbox.claim_batch(10), [])
+        email.refresh_from_db()
+        self.assertEqual(email.status, 'failed')
+        self.assertEqual(outbox.outbox_stats()['failed'], 1)
+
+    def test_a_failed_send_backs_off_and_reconnects_for_the_rest(self):
+        failing = outbox.enqueue("Bounces", "Body", "bad@example.com")
+        outbox.enqueue("Arrives", "Body", "guest@example.com")
+        connection = FakeConnection(failing=["Bounces"])
+
+        result = self.deliver(connection)
+        self.assertEqual((result['sent'], result['failed']), (1, 1))
+        self.assertEqual(connection.sent, ["Arrives"])
+        self.assertEqual(connection.opened, 2)
+        failing.refresh_from_db()
+        self.assertEqual((failing.status, failing.attempts), ('pending', 1))
+        self.assertIn("Mailbox unavailable", failing.last_error)
+        self.assertGreater(failing.next_attempt_at, timezone.now())
+
+    def test_the_last_failed_attempt_gives_up(self):
+        email = outbox.enqueue("Bounces", "Body", "bad@example.com")
+        OutboundEmail.objects.filter(pk=email.pk).update(attempts=outbox.MAX_ATTEMPTS - 1)
+        self.deliver(FakeConnection(failing=["Bounces"]))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('failed', outbox.MAX_ATTEMPTS))
+
+    def test_a_refused_connection_does_not_use_up_an_attempt(self):
+        email = outbox.enqueue("Hello", "Body", "guest@example.com")
+        with self.assertLogs('api.outbox', 'ERROR'):
+            result = self.deliver(FakeConnection(refuse=True))
+        self.assertEqual((result['claimed'], result['sent']), (1, 0))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('pending', 0))
+
+
+class CursorPaginationTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        for _ in range(3):
+            make_booking(None)
+        for _ in range(4):
+            make_booking(date(2030, 3, 1))
+        make_booking(date(2030, 4, 1), 'approved', event_type="Party")
+        make_booking(date(2029, 1, 1))
+
+    def walk(self, url, direction):
+        ids, pages = [], 0
+        while url:
+            body = self.client.get(url).json()
+            page = [row['id'] for row in body['results']]
+            ids = ids + page if direction == 'next' else page + ids
+            url = body[direction]
+            pages += 1
+        return ids, body, pages
+
+    def test_pages_cover_every_booking_once_in_list_order(self):
+        ids, last_page, pages = self.walk('/api/bookings/?page_size=2', 'next')
+        self.assertEqual(pages, 5)
+        self.assertEqual(sorted(ids), sorted(Booking.objects.values_list('id', flat=True)))
+        self.assertEqual(ids, [row['id'] for row in self.client.get('/api/bookings/').json()])
+
+        # Undated bookings come last and are reachable
+        undated = set(Booking.objects.filter(from_date__isnull=True).values_list('id', flat=True))
+        self.assertEqual(set(ids[-3:]), undated)
+
+        back, _, _ = self.walk(last_page['previous'], 'previous')
+        self.assertEqual(back + [row['id'] for row in last_page['results']], ids)
+
+    def test_list_stays_a_plain_array_without_pagination_params(self):
+        self.assertIsInstance(self.client.get('/api/bookings/').json(), list)
+
+    def test_malformed_cursor_is_not_found(self):
+        self.assertEqual(self.client.get('/api/bookings/?cursor=cD0yMDMwLTEzLTAxfDU=').status_code, 404)
+
+    def test_sparse_fields_and_filters(self):
+        rows = self.client.get('/api/bookings/', {'fields': 'name,from_date', 'status': 'approved'}).json()
+        self.assertEqual(rows, [{'id': 8, 'name': "Test Guest", 'from_date': '2030-04-01'}])
+        rows = self.client.get('/api/bookings/', {'event_type': 'party', 'from': '2030-01-01'}).json()
+        self.assertEqual([row['id'] for row in rows], [8])
+        self.assertEqual(self.client.get('/api/bookings/', {'fields': 'name,secret'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/bookings/', {'from': '2030-13-01'}).status_code, 400)
+
+
+class BookingVersionTests(APITestBase):
+    def test_stale_instance_cannot_overwrite_a_newer_save(self):
+        booking = make_booking(date(2030, 1, 1))
+        first, second = Booking.objects.get(pk=booking.pk), Booking.objects.get(pk=booking.pk)
+        first.name = "First"
+        first.save()
+        second.name = "Second"
+        with self.assertRaises(BookingVersionConflict):
+            second.save()
+        booking.refresh_from_db()
+        self.assertEqual((booking.name, booking.version), ("First", 2))
+
+    def test_if_match_with_an_old_etag_is_refused(self):
+        booking = make_booking(date(2030, 1, 1))
+        url = f'/api/bookings/{booking.pk}/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(etag, '"1"')
+
+        response = self.client.patch(url, {'name': "Renamed"}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], '"2"')
+
+        response = self.client.patch(url, {'name': "Lost update"}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(response['ETag'], '"2"')
+        booking.refresh_from_db()
+        self.assertEqual(booking.name, "Renamed")
+
+    def test_status_change_honours_if_match(self):
+        booking = make_booking(date(2030, 1, 1))
+        url = f'/api/bookings/{booking.pk}/status/'
+        response = self.client.patch(url, {'status': 'approved'}, format='json', HTTP_IF_MATCH='"7"')
+        self.assertEqual(response.status_code, 412)
+        response = self.client.patch(url, {'status': 'approved'}, format='json', HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, 200)
+
+
+def import_row(day, status='pending', **fields):
+    row = {'name': "Imported Guest", 'phone': "9800000000", 'event_type': "Wedding",
+           'from_date': day, 'status': status}
+    row.update(fields)
+    return row
+
+
+class BookingImportTests(APITestBase):
+    url = '/api/bookings/import/'
+
+    def setUp(self):
+        super().setUp()
+        self.stored = make_booking(date(2030, 9, 1), 'approved')
+
+    def test_valid_rows_go_in_and_bad_rows_are_reported(self):
+        rows = [
+            import_row('2030-09-10'),
+            import_row('2030-09-11', name=""),
+            import_row('2030-09-01', 'approved'),  # clashes with the stored booking
+            import_row('2030-09-20', 'approved', to_date='2030-09-21'),
+            import_row('2030-09-21', 'approved'),  # clashes with the row above
+            import_row('2030-09-01'),  # pending: does not block or clash
+        ]
+        response = self.client.post(self.url, rows, format='json')
+        self.assertEqual(response.status_code, 201)
+        report = response.json()
+        self.assertEqual((report['received'], report['created'], report['valid']), (6, 3, 3))
+        self.assertEqual([error['row'] for error in report['errors']], [2, 3, 5])
+        self.assertIn('name', report['errors'][0]['errors'])
+        self.assertEqual(report['ids'], [2, 3, 4])
+
+        # The signal-maintained read models saw the import
+        self.assertEqual(BookingDailyStat.objects.aggregate(total=Sum('count'))['total'], 4)
+        self.assertFalse(availability_index.is_free(date(2030, 9, 20)))
+
+    def test_dry_run_inserts_nothing(self):
+        response = self.client.post(f'{self.url}?dry_run=1', [import_row('2030-09-10')], format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['valid'], response.json()['created']), (1, 0))
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_csv_upload(self):
+        csv_file = SimpleUploadedFile(
+            'bookings.csv', b"Name,Phone,Event Type,From Date\nCSV Guest,9800000000,Party,2030-10-01\n",
+        )
+        response = self.client.post(self.url, {'file': csv_file}, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Booking.objects.get(pk=response.json()['ids'][0]).name, "CSV Guest")
+
+        text_file = SimpleUploadedFile('bookings.txt', b"nope")
+        self.assertEqual(self.client.post(self.url, {'file': text_file}, format='multipart').status_code, 400)
+
+    def test_nothing_imported_is_a_bad_request(self):
+        response = self.client.post(self.url, [import_row('2030-09-01', 'approved')], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['created'], 0)
+
+    def test_a_clash_the_sweep_missed_only_rejects_its_row(self):
+        rows = [import_row(f'2030-09-0{day}', 'approved') for day in (2, 1, 3)]
+        # As if the stored booking was approved after the sweep ran
+        with mock.patch.object(importer, 'sweep_conflicts', return_value={}), \
+                mock.patch.object(importer, 'IMPORT_CHUNK_SIZE', 2):
+            report = importer.import_bookings(rows)
+        self.assertEqual(report['created'], 2)
+        self.assertEqual(report['errors'], [{'row': 2, 'errors': {'non_field_errors': [importer.CONFLICT_MESSAGE]}}])
+        self.assertEqual(Booking.objects.filter(status='approved').count(), 3)
+
+    def test_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as fh:
+            json.dump([import_row('2030-09-10'), import_row('2030-09-11', phone="")], fh)
+        self.addCleanup(os.remove, fh.name)
+        out, err = StringIO(), StringIO()
+        call_command('import_bookings', fh.name, stdout=out, stderr=err)
+        self.assertIn("Imported 1 bookings (2 rows, 1 valid, 1 rejected)", out.getvalue())
+        self.assertIn("row 2:", err.getvalue())
+
+
+class ParseRupeesTests(TestCase):
+    def test_plain_amounts(self):
+        self.assertEqual(payments.parse_rupees('1200'), Decimal('1200.00'))
+        self.assertEqual(payments.parse_rupees(' 99.5 '), Decimal('99.50'))
+        self.assertEqual(payments.parse_rupees(250), Decimal('250.00'))
+        self.assertEqual(payments.to_paise('10.25'), 1025)
+
+    def test_rejected_amounts(self):
+        for amount in ('1e3', 'NaN', 'Infinity', '१२३', '0', '-5', '1.005', '', None, True, '12,000'):
+            with self.subTest(amount=amount), self.assertRaises(ValueError):
+                payments.parse_rupees(amount)
+
+
+@override_settings(PAYMENT_GATEWAY='api.payments.StubGateway')
+class PaymentIntentTests(APITestBase):
+    url = '/api/create-payment-intent/'
+
+    def setUp(self):
+        super().setUp()
+        payments.get_gateway.cache_clear()
+        self.addCleanup(payments.get_gateway.cache_clear)
+        self.booking = make_booking(date(2030, 8, 1))
+
+    def secret(self, data, **headers):
+        response = self.client.post(self.url, data, format='json', **headers)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()['clientSecret']
+
+    def test_a_booking_reuses_its_open_intent_until_it_changes(self):
+        first = self.secret({'amount': 5000, 'booking_id': self.booking.pk})
+        self.assertEqual(self.secret({'amount': '5000.00', 'booking_id': self.booking.pk}), first)
+        self.assertNotEqual(self.secret({'amount': 4000, 'booking_id': self.booking.pk}), first)
+
+        self.booking.name = "Renamed"
+        self.booking.save()
+        self.assertNotEqual(self.secret({'amount': 5000, 'booking_id': self.booking.pk}), first)
+
+    def test_idempotency_key_makes_retries_safe_without_a_booking(self):
+        first = self.secret({'amount': 100}, HTTP_IDEMPOTENCY_KEY='checkout-1')
+        self.assertEqual(self.secret({'amount': 100}, HTTP_IDEMPOTENCY_KEY='checkout-1'), first)
+        self.assertNotEqual(self.secret({'amount': 100}), self.secret({'amount': 100}))
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.post(self.url, {'amount': '1e3'}, format='json').status_code, 400)
+        self.assertEqual(self.client.post(self.url, [1], format='json').status_code, 400)
+        self.assertEqual(self.client.post(self.url, {'amount': 10, 'booking_id': 'x'}, format='json').status_code, 400)
+        self.assertEqual(self.client.post(self.url, {'amount': 10, 'booking_id': 999}, format='json').status_code, 404)
+
+    def test_gateway_failure_is_a_bad_gateway(self):
+        gateway = mock.Mock()
+        gateway.create_intent.side_effect = payments.PaymentGatewayError(payments.UNAVAILABLE)
+        with mock.patch.object(payments, 'get_gateway', return_value=gateway):
+            response = self.client.post(self.url, {'amount': 10}, format='json')
+        self.assertEqual(response.status_code, 502)
+        self.assertEqual(response.json(), {'error': payments.UNAVAILABLE})
+
+
+class ExpenseSummaryTests(APITestBase):
+    url = '/api/expenses/summary/'
+
+    def setUp(self):
+        super().setUp()
+        Expense.objects.create(function_date=date(2030, 1, 5), advance=Decimal('5000'), gens=Decimal('300'),
+                               light=Decimal('200.50'))
+        Expense.objects.create(function_date=date(2030, 1, 20), balance=Decimal('1000'), radio=Decimal('100'))
+        Expense.objects.create(function_date=date(2030, 2, 2), damage_recovery=Decimal('50'), ladies=Decimal('400'))
+
+    def test_total_is_derived_from_the_costs(self):
+        expense = Expense.objects.get(function_date=date(2030, 1, 5))
+        self.assertEqual(expense.total, Decimal('500.50'))
+        response = self.client.put(f'/api/expenses/{expense.pk}/', {
+            'function_date': '2030-01-05', 'gens': '100.00', 'total': '99999.00',
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        # light (200.50) is kept; the client's total is ignored
+        self.assertEqual(response.json()['total'], '300.50')
+
+    def test_monthly_and_overall_totals(self):
+        summary = self.client.get(self.url, {'year': 2030}).json()
+        self.assertEqual(
+            [(m['month'], m['records'], m['income'], m['costs'], m['net']) for m in summary['months']],
+            [(1, 2, '6000.00', '600.50', '5399.50'), (2, 1, '50.00', '400.00', '-350.00')],
+        )
+        self.assertEqual((summary['records'], summary['income'], summary['costs'], summary['net']),
+                         (3, '6050.00', '1000.50', '5049.50'))
+        self.assertEqual(summary['categories']['light'], '200.50')
+
+        february = self.client.get(self.url, {'from': '2030-02', 'to': '2030-02'}).json()
+        self.assertEqual(february['records'], 1)
+        self.assertEqual(self.client.get(self.url, {'from': '2030-03', 'to': '2030-02'}).status_code, 400)
+
+    def test_a_write_invalidates_the_cached_summary_after_commit(self):
+        self.assertEqual(self.client.get(self.url).json()['records'], 3)
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post('/api/expenses/', {'function_date': '2030-03-01', 'gens': '10'}, format='json')
+            self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.client.get(self.url).json()['records'], 3)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.client.get(self.url).json()['records'], 4)
+
+
+class LedgerBalanceTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        self.booking = make_booking(date(2030, 8, 1))
+
+    def test_payments_accumulate_into_the_balance(self):
+        set_total(self.booking.pk, Decimal('10000.00'))
+        record_payment(self.booking.pk, Decimal('2500.00'))
+        _, balance, created = record_payment(self.booking.pk, Decimal('1000.50'))
+        self.assertTrue(created)
+        self.assertEqual(balance.paid_amount, Decimal('3500.50'))
+        self.assertEqual(balance.payment_count, 2)
+        self.assertEqual(balance.due, Decimal('6499.50'))
+        self.assertEqual(balance.payment_status, 'Advance Paid')
+
+    def test_repeated_reference_is_recorded_once(self):
+        first, _, _ = record_payment(self.booking.pk, Decimal('500.00'), 'pi_1')
+        again, balance, created = record_payment(self.booking.pk, Decimal('500.00'), 'pi_1')
+        self.assertFalse(created)
+        self.assertEqual(again.pk, first.pk)
+        self.assertEqual((balance.paid_amount, balance.payment_count), (Decimal('500.00'), 1))
+
+    def test_setting_the_total_keeps_the_paid_amount(self):
+        record_payment(self.booking.pk, Decimal('800.00'))
+        set_total(self.booking.pk, Decimal('3000.00'))
+        balance = BookingBalance.objects.get(booking=self.booking)
+        self.assertEqual((balance.paid_amount, balance.total_amount), (Decimal('800.00'), Decimal('3000.00')))
+
+    def test_payments_are_append_only(self):
+        payment, _, _ = record_payment(self.booking.pk, Decimal('100.00'))
+        payment.amount = Decimal('1.00')
+        with self.assertRaises(ValueError):
+            payment.save()
+        with self.assertRaises(ValueError):
+            payment.delete()
+        self.assertEqual(Payment.objects.get(pk=payment.pk).amount, Decimal('100.00'))
+
+    def test_payment_endpoint_updates_the_booking_totals(self):
+        url = f'/api/bookings/{self.booking.pk}/payment/'
+        response = self.client.patch(url, {'amount_paid': '1200', 'reference': 'pi_9'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        response = self.client.patch(url, {'amount_paid': '1200', 'reference': 'pi_9'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.patch(url, {'amount_paid': '1e3'}, format='json').status_code, 400)
+
+        booking = self.client.get(f'/api/bookings/{self.booking.pk}/').json()
+        self.assertEqual(booking['paid_amount'], '1200.00')
+        self.assertEqual(booking['payment_status'], 'Advance Paid')
+
+    def test_admin_deletes_ledger_rows_only_with_their_booking(self):
+        payment, _, _ = record_payment(self.booking.pk, Decimal('100.00'))
+        admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.force_login(admin)
+
+        self.assertEqual(self.client.get(f'/admin/api/payment/{payment.pk}/delete/').status_code, 403)
+        response = self.client.post(f'/admin/api/booking/{self.booking.pk}/delete/', {'post': 'yes'})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Booking.objects.filter(pk=self.booking.pk).exists())
+        self.assertFalse(Payment.objects.exists())
+        self.assertFalse(BookingBalance.objects.exists())
+
+
+class OverlapConstraintTests(APITestBase):
+    def test_database_rejects_overlapping_approved_bookings(self):
+        make_booking(date(2030, 5, 1), 'approved', to_date=date(2030, 5, 3))
+        with self.assertRaises(IntegrityError) as caught, transaction.atomic():
+            Booking.objects.create(name="Clash", from_date=date(2030, 5, 3), status='approved')
+        self.assertTrue(is_overlap_error(caught.exception))
+
+    def test_non_overlapping_and_unapproved_bookings_are_allowed(self):
+        make_booking(date(2030, 5, 1), 'approved', start_time=time(9), end_time=time(13))
+        make_booking(date(2030, 5, 1), 'approved', start_time=time(13), end_time=time(18))
+        make_booking(date(2030, 5, 1), 'pending')
+        make_booking(date(2030, 5, 2), 'approved')
+        self.assertEqual(Booking.objects.filter(status='approved').count(), 3)
+
+    def test_approving_a_clash_is_refused_even_when_the_index_missed_it(self):
+        make_booking(date(2030, 6, 1), 'approved')
+        pending = make_booking(date(2030, 6, 1))
+        response = self.client.patch(f'/api/bookings/{pending.pk}/status/', {'status': 'approved'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], OVERLAP_MESSAGE)
+        pending.refresh_from_db()
+        self.assertEqual(pending.status, 'pending')
+
+    def test_serializer_maps_the_database_rejection_to_a_400(self):
+        make_booking(date(2030, 6, 1), 'approved')
+        booking = {'name': "Clash", 'phone': "9800000000", 'event_type': "Party",
+                   'from_date': '2030-06-01', 'to_date': '2030-06-01', 'status': 'approved'}
+        # A stale index in this worker lets validate() pass
+        with mock.patch.object(availability_index, 'is_free', return_value=True):
+            response = self.client.post('/api/bookings/', booking, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'non_field_errors': [OVERLAP_MESSAGE]})
+        self.assertEqual(Booking.objects.count(), 1)
+
+
+class AvailabilitySearchTests(APITestBase):
+    url = '/api/availability/search/'
+
+    def setUp(self):
+        super().setUp()
+        self.today = date.today()
+        make_booking(self.day(3), 'approved', to_date=self.day(4))
+        make_booking(self.day(6), 'approved', start_time=time(10), end_time=time(14))
+        make_booking(self.day(1))
+
+    def day(self, offset):
+        return self.today + timedelta(days=offset)
+
+    def search(self, first, last, **params):
+        params.update({'from': self.day(first).isoformat(), 'to': self.day(last).isoformat()})
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_free_day_ranges(self):
+        ranges = self.search(1, 8, duration_days=2)['ranges']
+        self.assertEqual(ranges, [
+            {'from_date': self.day(1).isoformat(), 'to_date': self.day(2).isoformat(), 'days': 2},
+            {'from_date': self.day(7).isoformat(), 'to_date': self.day(8).isoformat(), 'days': 2},
+        ])
+        self.assertEqual(len(self.search(1, 8, limit=1)['ranges']), 1)
+
+    def test_time_slots_around_timed_bookings(self):
+        slots = self.search(6, 7, min_hours=6)['slots']
+        midnight = [self.day(offset).isoformat() + 'T00:00:00' for offset in (6, 7, 8)]
+        self.assertEqual(slots, [
+            {'start': midnight[0], 'end': self.day(6).isoformat() + 'T10:00:00', 'hours': 10.0},
+            {'start': self.day(6).isoformat() + 'T14:00:00', 'end': midnight[1], 'hours': 10.0},
+            {'start': midnight[1], 'end': midnight[2], 'hours': 24.0},
+        ])
+        self.assertEqual(len(self.search(6, 6, min_hours=11)['slots']), 0)
+
+    def test_bad_params(self):
+        for params in ({'duration_days': 0}, {'limit': 101}, {'min_hours': 6, 'duration_days': 2},
+                       {'min_hours': 25}, {'from': '2030-02-01', 'to': '2030-01-01'}, {'from': 'soon'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(self.url, params).status_code, 400)
+
+    def test_map_follows_committed_changes(self):
+        self.assertEqual(self.search(10, 10)['ranges'][0]['days'], 1)
+        with self.captureOnCommitCallbacks() as callbacks:
+            booking = make_booking(self.day(10), 'approved')
+        self.assertEqual(len(self.search(10, 10)['ranges']), 1)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.search(10, 10)['ranges'], [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.delete()
+        self.assertEqual(len(self.search(10, 10)['ranges']), 1)
+
+
+class AnalyticsTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        make_booking(date(2030, 3, 30), 'approved', to_date=date(2030, 4, 2), estimated_guests=120)
+        make_booking(date(2030, 4, 10), 'approved', event_type="Party", estimated_guests=40)
+        make_booking(date(2030, 4, 20), estimated_guests=900)
+        Expense.objects.create(function_date=date(2030, 3, 15), advance=Decimal('1000'), gens=Decimal('100'))
+        Expense.objects.create(function_date=date(2030, 4, 15), advance=Decimal('500'), gens=Decimal('300'))
+
+    def get(self, section, **params):
+        response = self.client.get(f'/api/dashboard/{section}/', params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_occupancy_counts_approved_days(self):
+        report = self.get('occupancy', **{'from': '2030-03', 'to': '2030-04'})
+        occupancy = report['occupancy']
+        self.assertEqual((report['from'], report['to']), ('2030-03-01', '2030-04-30'))
+        self.assertEqual((occupancy['days'], occupancy['occupied_days']), (61, 5))
+        self.assertEqual(
+            [(m['month'], m['days'], m['occupied_days']) for m in occupancy['months']],
+            [(3, 31, 2), (4, 30, 3)],
+        )
+        self.assertEqual(sum(day['occupied_days'] for day in occupancy['weekdays']), 5)
+
+    def test_open_ends_come_from_the_data_and_supplied_bounds_are_kept(self):
+        report = self.get('occupancy')
+        self.assertEqual((report['from'], report['to']), ('2030-03-01', '2030-04-30'))
+        report = self.get('occupancy', **{'from': '2030-06'})
+        self.assertEqual((report['from'], report['to']), ('2030-06-01', '2030-06-30'))
+        self.assertEqual(report['occupancy']['occupied_days'], 0)
+        report = self.get('occupancy', to='2029-01')
+        self.assertEqual((report['from'], report['to']), ('2029-01-01', '2029-01-31'))
+
+    def test_inverted_range_is_a_bad_request(self):
+        response = self.client.get('/api/dashboard/occupancy/', {'from': '2030-06', 'to': '2030-05'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_guests_lead_time_and_expense_trends(self):
+        guests = self.get('guests')['guests']
+        self.assertEqual((guests['count'], guests['median']), (2, 80.0))
+        buckets = {bucket['range']: bucket['count'] for bucket in guests['buckets']}
+        self.assertEqual((buckets['0-49'], buckets['100-199'], buckets['500-999']), (1, 1, 0))
+        self.assertEqual([row['event_type'] for row in guests['event_types']], ["Party", "Wedding"])
+
+        self.assertEqual(self.get('lead-time')['lead_time']['count'], 2)
+
+        trends = self.get('expense-trends')['expense_trends']
+        self.assertEqual(trends['functions'], 2)
+        self.assertEqual([month['costs'] for month in trends['months']], ['100.00', '300.00'])
+        self.assertEqual(trends['months'][1]['net_per_function'], '200.00')
+        self.assertEqual(trends['cost_per_function_trend'], '200.00')
+
+    def test_writes_invalidate_the_cached_report_after_commit(self):
+        self.assertEqual(self.get('occupancy')['occupancy']['occupied_days'], 5)
+        with self.captureOnCommitCallbacks() as callbacks:
+            make_booking(date(2030, 4, 25), 'approved')
+        self.assertEqual(self.get('occupancy')['occupancy']['occupied_days'], 5)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.get('occupancy')['occupancy']['occupied_days'], 6)
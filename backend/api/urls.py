@@ -1,20 +1,44 @@
 # backend/api/urls.py
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     BookingViewSet,
     booking_receipt,  # ✅ Make sure imported
+    bulk_receipts,
+    bulk_import_bookings,
     booking_dates,
+    availability_check,
+    availability_search,
     dashboard_stats,
+    analytics_occupancy,
+    analytics_lead_time,
+    analytics_guests,
+    analytics_expense_trends,
     export_bookings_csv,
     update_booking_status,
     update_payment,
     create_payment_intent,
     expenses_list,
     expense_detail,
+    expenses_summary,
     export_expenses,
+    metrics,
 )
 
+if settings.ASGI_MODE:
+    # Under ASGI, the I/O-bound routes use their async variants
+    from .async_views import (
+        availability_check,
+        availability_search,
+        booking_dates,
+        bulk_receipts,
+        create_payment_intent,
+        dashboard_stats,
+        export_bookings_csv,
+        export_expenses,
+    )
+
 # Router for ViewSet
 router = DefaultRouter()
 router.register(r'bookings', BookingViewSet, basename='booking')
@@ -25,6 +49,12 @@ urlpatterns = [
     # 📌 Receipt - MUST be first
     path("bookings/<int:pk>/receipt/", booking_receipt, name="booking-receipt"),
     
+    # 📌 Bulk receipts (ZIP)
+    path("bookings/receipts/", bulk_receipts, name="bulk-receipts"),
+
+    # 📌 Bulk import (CSV / XLSX / JSON)
+    path("bookings/import/", bulk_import_bookings, name="bulk-import-bookings"),
+
     # 📌 Booking dates calendar
     path("bookings/dates/", booking_dates, name="booking-dates"),
     
@@ -40,8 +70,16 @@ urlpatterns = [
     # ✅ NOW include router (creates /bookings/ list and /bookings/<id>/ detail)
     path('', include(router.urls)),
     
+    # 📌 Availability
+    path("availability/check/", availability_check, name="availability-check"),
+    path("availability/search/", availability_search, name="availability-search"),
+
     # 📌 Dashboard
     path("dashboard-stats/", dashboard_stats, name="dashboard-stats"),
+    path("dashboard/occupancy/", analytics_occupancy, name="dashboard-occupancy"),
+    path("dashboard/lead-time/", analytics_lead_time, name="dashboard-lead-time"),
+    path("dashboard/guests/", analytics_guests, name="dashboard-guests"),
+    path("dashboard/expense-trends/", analytics_expense_trends, name="dashboard-expense-trends"),
     
     # 📌 Payment
     path("create-payment-intent/", create_payment_intent, name="create-payment-intent"),
@@ -49,5 +87,9 @@ urlpatterns = [
     # 📌 Expenses
     path("expenses/", expenses_list, name="expenses-list"),
     path("expenses/<int:pk>/", expense_detail, name="expense-detail"),
+    path("expenses/summary/", expenses_summary, name="expenses-summary"),
     path("expenses/export/", export_expenses, name="export-expenses"),
+
+    # 📌 Prometheus metrics
+    path("metrics/", metrics, name="metrics"),
 ]
\ No newline at end of file
@@ -1,13 +1,9 @@
-from django.core.mail import send_mail
-from django.conf import settings
-import logging
+from .outbox import enqueue
 
-logger = logging.getLogger(__name__)
-
-def send_booking_confirmation(booking):
-    try:
-        subject = f"Booking Confirmation - {booking.event_type}"
-        message = f"""
+def build_booking_confirmation(booking):
+    """Subject and body of the confirmation email for ``booking``."""
+    subject = f"Booking Confirmation - {booking.event_type}"
+    message = f"""
 Dear {booking.name},
 
 Thank you for booking with Sri Vari Mahal A/C!
@@ -32,26 +28,13 @@ Best regards,
 Sri Vari Mahal A/C Team
 📞 98431 86231 | 88702 01981
         """
+    return subject, message
+
+
+def queue_booking_confirmation(booking):
+    """Put the confirmation email in the outbox; the worker delivers it."""
+    if not booking.email:
+        return None
+    subject, message = build_booking_confirmation(booking)
+    return enqueue(subject, message, booking.email, booking=booking)
 
-        logger.info(f"📧 Sending email to: {booking.email}")
-        logger.info(f"📧 From: {settings.DEFAULT_FROM_EMAIL}")
-        logger.info(f"📧 Backend: {settings.EMAIL_BACKEND}")
-        
-        result = send_mail(
-            subject,
-            message,
-            settings.DEFAULT_FROM_EMAIL,
-            [booking.email],
-            fail_silently=False,
-        )
-        
-        if result == 1:
-            logger.info(f"✅ Email sent successfully to {booking.email}")
-        else:
-            logger.warning(f"⚠️ Email send returned {result}")
-        return True
-        
-    except Exception as e:
-        logger.error(f"❌ Email sending failed: {str(e)}")
-        logger.exception("Full traceback:")
-        return False
\ No newline at end of file
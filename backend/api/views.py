@@ -1,66 +1,163 @@
-import csv
-import os
-import stripe
-import openpyxl
-from openpyxl.styles import Font, PatternFill, Alignment
-from io import BytesIO
-from PIL import Image
-from django.utils import timezone
+import hmac
+import logging
+
 from django.conf import settings
-from django.views.decorators.csrf import csrf_exempt
 from rest_framework import viewsets, status
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
-from django.db.models import Count
-from django.db.models.functions import ExtractMonth
-from django.http import HttpResponse
-from datetime import datetime, time as dtime, timedelta
-from .utils import send_booking_confirmation
-from reportlab.pdfgen import canvas
-from reportlab.lib.utils import ImageReader
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib import colors
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
-from .models import Booking, Expense
-from .serializers import BookingSerializer, ExpenseSerializer
+from django.db import IntegrityError, transaction
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_etags
+from datetime import datetime
+from .utils import queue_booking_confirmation
+from .analytics import analytics_report
+from .availability import availability_index, slot_params
+from .calendar import CalendarFeed, calendar_window
+from .importer import ImportFormatError, detect_format, import_bookings, normalize_rows, read_rows
+from .expenses import expense_summary
+from .ledger import record_payment, with_balance
+from .occupancy import occupancy_map, search_params
+from .stats import dashboard_summary, month_range
+from .receipts import (
+    receipt_cache, receipt_context, receipt_digest, receipt_filename, stream_receipts_zip,
+)
+from .streaming import csv_stream, gzip_stream
+from .xlsx import stream_xlsx
+from .metrics import request_metrics
+from .models import Booking, BookingVersionConflict, Expense
+from .outbox import outbox_stats
+from .overlap import OVERLAP_MESSAGE, is_overlap_error
+from .payments import PaymentGatewayError, create_intent, parse_rupees
+from .pagination import ORDERING, BookingCursorPagination
+from .serializers import BookingRowSerializer, BookingSerializer, ExpenseSerializer
 from django.views.decorators.http import require_GET
 
-stripe.api_key = "YOUR_SECRET_KEY"
+logger = logging.getLogger(__name__)
+
+
+def booking_etag(version):
+    return f'"{version}"'
+
+
+def precondition_failed(request, booking):
+    """412 when ``If-Match`` names a version other than the stored one, else None."""
+    header = request.headers.get('If-Match')
+    if not header:
+        return None
+    etags = parse_etags(header)
+    if '*' in etags or booking_etag(booking.version) in etags:
+        return None
+    return Response(
+        {"error": "Booking has changed since it was fetched. Reload and try again."},
+        status=status.HTTP_412_PRECONDITION_FAILED,
+        headers={'ETag': booking_etag(booking.version)},
+    )
+
+
+def version_conflict(request):
+    """A save lost the race to a concurrent edit after the precondition passed."""
+    code = status.HTTP_412_PRECONDITION_FAILED if 'If-Match' in request.headers else status.HTTP_409_CONFLICT
+    return Response({"error": "Booking was modified by another request. Reload and try again."}, status=code)
 
 
 # ======================================================
 # 🔵 VIEWSET — Main CRUD (Used by Router)
 # ======================================================
 class BookingViewSet(viewsets.ModelViewSet):
-    queryset = Booking.objects.all().order_by('-from_date')
+    queryset = Booking.objects.all().order_by(*ORDERING)
     serializer_class = BookingSerializer
+    pagination_class = BookingCursorPagination
+
+    def requested_fields(self):
+        """
+        ``?fields=id,name,from_date`` narrows both the SELECT and the JSON.
+        Unknown names are rejected; ``id`` is always included.
+        """
+        raw = self.request.query_params.get('fields')
+        if not raw or self.action not in ('list', 'retrieve'):
+            return None
+        fields = {f.strip() for f in raw.split(',') if f.strip()} | {'id'}
+        unknown = fields - set(BookingSerializer().fields)
+        if unknown:
+            raise ValidationError({"fields": f"Unknown field(s): {', '.join(sorted(unknown))}"})
+        return sorted(fields)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('update', 'partial_update'):
+            # The response serializes the booking's payment totals
+            return queryset.select_related('balance')
+        if self.action != 'list':
+            return queryset
+
+        params = self.request.query_params
+        if params.get('status'):
+            queryset = queryset.filter(status__in=params['status'].split(','))
+        if params.get('event_type'):
+            queryset = queryset.filter(event_type__iexact=params['event_type'])
+        try:
+            if params.get('from'):
+                queryset = queryset.filter(from_date__gte=datetime.strptime(params['from'], '%Y-%m-%d').date())
+            if params.get('to'):
+                queryset = queryset.filter(from_date__lte=datetime.strptime(params['to'], '%Y-%m-%d').date())
+        except ValueError:
+            raise ValidationError({"date": "from/to must be YYYY-MM-DD."})
+
+        fields = self.requested_fields()
+        if fields:
+            # from_date stays loaded — the cursor paginator keys pages on (from_date, id)
+            columns = set(fields) & {field.name for field in Booking._meta.concrete_fields}
+            queryset = queryset.only(*columns | {'from_date'})
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.requested_fields()
+        if fields:
+            kwargs['fields'] = fields
+        return super().get_serializer(*args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        """Read path: build the JSON straight from ``values()`` rows."""
+        serializer = BookingRowSerializer(self.requested_fields())
+        queryset = with_balance(self.filter_queryset(self.get_queryset()), serializer.columns)
+        rows = queryset.values(*set(serializer.columns) | {'from_date'})
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(serializer.many(page))
+        return Response(serializer.many(rows))
+
+    def retrieve(self, request, *args, **kwargs):
+        serializer = BookingRowSerializer(self.requested_fields())
+        queryset = with_balance(self.get_queryset(), serializer.columns)
+        row = get_object_or_404(queryset.values(*set(serializer.columns) | {'version'}), pk=kwargs['pk'])
+        etag = booking_etag(row['version'])
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+        return Response(serializer.to_representation(row), headers={'ETag': etag})
 
     def update(self, request, *args, **kwargs):
-        """Override update to add debug logging"""
-        print("=" * 50)
-        print("📥 PATCH REQUEST RECEIVED")
-        print(f"Booking ID: {kwargs.get('pk')}")
-        print(f"Request Data: {request.data}")
-        print("=" * 50)
-        
+        """Override update to honour If-Match and log the change"""
+        logger.debug("Updating booking %s with %s", kwargs.get('pk'), request.data)
+
         try:
             partial = kwargs.pop('partial', False)
             instance = self.get_object()
+            failed = precondition_failed(request, instance)
+            if failed is not None:
+                return failed
             serializer = self.get_serializer(instance, data=request.data, partial=partial)
             serializer.is_valid(raise_exception=True)
             self.perform_update(serializer)
-            print("✅ Update successful")
-            return Response(serializer.data)
-        except Exception as e:
-            print(f"❌ Update failed: {str(e)}")
-            if hasattr(e, 'detail'):
-                print(f"Error details: {e.detail}")
-            import traceback
-            traceback.print_exc()
-            raise
+            logger.debug("Booking %s updated to version %s", instance.pk, instance.version)
+            return Response(serializer.data, headers={'ETag': booking_etag(instance.version)})
+        except BookingVersionConflict:
+            logger.info("Booking %s update lost a concurrent edit", kwargs.get('pk'))
+            return version_conflict(request)
 
     def partial_update(self, request, *args, **kwargs):
         """Override partial_update for PATCH requests"""
@@ -69,29 +166,14 @@ class BookingViewSet(viewsets.ModelViewSet):
 
     def create(self, request, *args, **kwargs):
         """
-        Override create to handle email in background
+        Override create to queue the confirmation email in the outbox
         """
         # Validate and save booking
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
-        booking = serializer.instance
-        
-        print(f"✔️ BOOKING CREATED — ID: {booking.id}")
-        
-        import threading
-        def send_email_async():
-            try:
-                print("📧 TRIGGERING EMAIL IN BACKGROUND")
-                send_booking_confirmation(booking)
-                print("✅ EMAIL SENT SUCCESSFULLY")
-            except Exception as e:
-                print(f"❌ EMAIL FAILED (but booking saved): {str(e)}")
-        
-        email_thread = threading.Thread(target=send_email_async)
-        email_thread.daemon = True
-        email_thread.start()
-        
+        logger.info("Booking %s created", serializer.instance.id)
+
         # Return success immediately
         headers = self.get_success_headers(serializer.data)
         return Response(
@@ -101,7 +183,10 @@ class BookingViewSet(viewsets.ModelViewSet):
         )
     
     def perform_create(self, serializer):
-        serializer.save()
+        # Booking and its email commit together — the send_queued_emails worker delivers it
+        with transaction.atomic():
+            booking = serializer.save()
+            queue_booking_confirmation(booking)
 
     def get_permissions(self):
         if self.action in ["list", "retrieve", "create"]:
@@ -115,7 +200,7 @@ class BookingViewSet(viewsets.ModelViewSet):
 @permission_classes([AllowAny])
 def bookings_list(request):
     if request.method == 'GET':
-        bookings = Booking.objects.order_by('-from_date')
+        bookings = Booking.objects.select_related('balance').order_by('-from_date')
         serializer = BookingSerializer(bookings, many=True)
         return Response(serializer.data)
 
@@ -140,8 +225,8 @@ def bookings_list(request):
             )
 
         except Exception as e:
-            print("❌ Booking creation error:", str(e))
-            print("⚙️ Received data:", request.data)
+            logger.info("Booking creation rejected: %s", e)
+            logger.debug("Rejected booking data: %s", request.data)
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -152,7 +237,7 @@ def bookings_list(request):
 @permission_classes([AllowAny])
 def booking_detail(request, pk):
     try:
-        booking = Booking.objects.get(id=pk)
+        booking = Booking.objects.select_related('balance').get(id=pk)
         return Response(BookingSerializer(booking).data)
     except Booking.DoesNotExist:
         return Response({"error": "Booking not found"}, status=status.HTTP_404_NOT_FOUND)
@@ -161,141 +246,202 @@ def booking_detail(request, pk):
 # ======================================================
 # 🟢 AVAILABILITY CALENDAR
 # ======================================================
+CALENDAR_PARAMS_ERROR = "start and end must be dates (YYYY-MM-DD) with start <= end."
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def booking_dates(request):
-    bookings = Booking.objects.all()
-    events = []
+    """
+    Calendar events for the public availability page.
+    Optional ``start``/``end`` query params (YYYY-MM-DD) narrow the window.
+    """
+    try:
+        start_day, end_day = calendar_window(request.GET.get('start'), request.GET.get('end'))
+    except ValueError:
+        return Response({"error": CALENDAR_PARAMS_ERROR}, status=status.HTTP_400_BAD_REQUEST)
+
+    feed = CalendarFeed(start_day, end_day)
+
+    # Unchanged months → 304 before any event is built
+    not_modified = get_conditional_response(request, etag=feed.etag, last_modified=feed.last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    response = Response(feed.events())
+    response['ETag'] = feed.etag
+    response['Last-Modified'] = http_date(feed.last_modified)
+    patch_cache_control(response, public=True, no_cache=True)
+    return response
+
+
+# ======================================================
+# 🟢 AVAILABILITY CHECK
+#     GET /api/availability/check/?from_date=...&to_date=...&start_time=...&end_time=...
+# ======================================================
+AVAILABILITY_PARAMS_ERROR = "from_date (YYYY-MM-DD) is required; to_date, start_time and end_time are optional."
 
-    for booking in bookings:
-        try:
-            start_date = booking.from_date
-            end_date = booking.to_date
-
-            if hasattr(booking, "start_time") and booking.start_time:
-                start_dt = datetime.combine(start_date, booking.start_time)
-            else:
-                start_dt = datetime.combine(start_date, dtime.min)
-
-            if hasattr(booking, "end_time") and booking.end_time:
-                end_dt = datetime.combine(end_date, booking.end_time)
-            else:
-                end_dt = datetime.combine(end_date, dtime.max.replace(microsecond=0))
-            
-            if end_dt <= start_dt:
-                end_dt = start_dt + timedelta(hours=1)
-
-            events.append({
-                "title": booking.event_type or "Booking",
-                "start": start_dt.isoformat(),
-                "end": end_dt.isoformat()
-            })
-        except Exception as e:
-            print(f"⚠️ Skipping booking id={getattr(booking, 'id', 'unknown')} due to error:", e)
-            continue
 
-    return Response(events)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def availability_check(request):
+    """Answer "is this slot free" from the in-process index, without a DB query."""
+    try:
+        from_date, to_date, start_time, end_time = slot_params(request.GET)
+    except ValueError:
+        return Response({"error": AVAILABILITY_PARAMS_ERROR}, status=status.HTTP_400_BAD_REQUEST)
+    if to_date < from_date:
+        return Response({"error": "to_date cannot be before from_date."}, status=status.HTTP_400_BAD_REQUEST)
+
+    available = availability_index.is_free(from_date, to_date, start_time, end_time)
+    return Response({"available": available})
+
+
+# ======================================================
+# 🟢 FREE SLOT SEARCH
+#     GET /api/availability/search/?duration_days=2&from=...&to=...&min_hours=...&limit=...
+# ======================================================
+SEARCH_PARAMS_ERROR = (
+    "from/to must be YYYY-MM-DD with from <= to; duration_days 1-366; limit 1-100; "
+    "min_hours within (0, 24] and only with duration_days=1."
+)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def availability_search(request):
+    """Next free date ranges (or, with ``min_hours``, time slots), from the in-process occupancy map."""
+    try:
+        first_day, last_day, duration_days, min_hours, limit = search_params(request.GET)
+    except ValueError:
+        return Response({"error": SEARCH_PARAMS_ERROR}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(occupancy_map.search(first_day, last_day, duration_days, min_hours, limit))
 
 
 # ======================================================
 # 🟢 DASHBOARD STATISTICS
 # ======================================================
+STATS_PARAMS_ERROR = "year must be YYYY; from/to must be YYYY-MM."
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def dashboard_stats(request):
+    """
+    Optional filters on the event start date:
+      ?year=2025             → that calendar year
+      ?from=2025-01&to=2025-06 → month range (either end may be omitted)
+    """
+    try:
+        first_day, last_day = month_range(
+            request.GET.get('year'), request.GET.get('from'), request.GET.get('to')
+        )
+    except ValueError:
+        return Response({"error": STATS_PARAMS_ERROR}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(dashboard_summary(first_day, last_day))
 
-    monthly = (
-        Booking.objects.annotate(month=ExtractMonth('from_date'))
-        .values('month')
-        .annotate(count=Count('id'))
-        .order_by('month')
-    )
 
-    event_types = (
-        Booking.objects.values('event_type')
-        .annotate(count=Count('id'))
-    )
+# ======================================================
+# 📈 DASHBOARD ANALYTICS (Admin Only)
+#     Same ?year= / ?from=&to= filters as dashboard-stats
+# ======================================================
+def analytics_response(request, section):
+    try:
+        first_day, last_day = month_range(
+            request.GET.get('year'), request.GET.get('from'), request.GET.get('to')
+        )
+        report = analytics_report(first_day, last_day)
+    except ValueError:
+        return Response({"error": STATS_PARAMS_ERROR}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({"from": report["from"], "to": report["to"], section: report[section]})
 
-    unread_inquiries = Booking.objects.filter(status='pending').count()
-    today = timezone.now().date()
-    upcoming_events = Booking.objects.filter(from_date__gte=today).count()
-    
-    stats = {
-        "bookings_per_month": list(monthly),
-        "event_type_distribution": list(event_types),
-        "total_bookings": Booking.objects.count(),
-        "unread_inquiries": unread_inquiries,
-        "upcoming_events": upcoming_events, 
-        
-    }
-    return Response(stats)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def analytics_occupancy(request):
+    """Share of days with an approved booking, per month and per weekday."""
+    return analytics_response(request, "occupancy")
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def analytics_lead_time(request):
+    """Days between a booking request and its event: mean, median, p90 and per-month means."""
+    return analytics_response(request, "lead_time")
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def analytics_guests(request):
+    """Distribution of ``estimated_guests``, overall and per event type."""
+    return analytics_response(request, "guests")
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def analytics_expense_trends(request):
+    """Costs, income and net per function by month, with the cost-per-function trend."""
+    return analytics_response(request, "expense_trends")
 
 
 # ======================================================
 # 🟢 EXPORT CSV
 # ======================================================
+EXPORT_CHUNK_SIZE = 2000
+
+BOOKING_EXPORT_HEADERS = [
+    'ID', 'Name', 'Phone', 'Email', 'Event Type',
+    'From Date', 'To Date', 'Start Time', 'End Time',
+    'Status', 'Estimated Guests', 'Food Preference',
+    'Alternate Phone', 'Message'
+]
+
+BOOKING_EXPORT_FIELDS = [
+    'id', 'name', 'phone', 'email', 'event_type',
+    'from_date', 'to_date', 'start_time', 'end_time',
+    'status', 'estimated_guests', 'food_preference',
+    'alternate_phone', 'message'
+]
+
 # ✅ Uses a plain Django view (not @api_view) to avoid DRF's 406 content negotiation
 @require_GET
 def export_bookings_csv(request):
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Bookings"
-
-    # Header row styling
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill("solid", fgColor="4B6CB7")
-    header_align = Alignment(horizontal="center", vertical="center")
-
-    headers = [
-        'ID', 'Name', 'Phone', 'Email', 'Event Type',
-        'From Date', 'To Date', 'Start Time', 'End Time',
-        'Status', 'Estimated Guests', 'Food Preference',
-        'Alternate Phone', 'Message'
-    ]
-
-    for col_num, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_num, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_align
-
-    # Data rows — ascending order by ID
-    for b in Booking.objects.all().order_by('id'):
-        ws.append([
-            b.id,
-            b.name,
-            b.phone,
-            b.email,
-            b.event_type,
-            str(b.from_date) if b.from_date else '',
-            str(b.to_date) if b.to_date else '',
-            str(b.start_time) if b.start_time else '',
-            str(b.end_time) if b.end_time else '',
-            b.status,
-            b.estimated_guests,
-            b.food_preference or '',
-            b.alternate_phone or '',
-            b.message or '',
-        ])
-
-    # Auto-fit column widths
-    for col in ws.columns:
-        max_len = max((len(str(cell.value)) if cell.value else 0) for cell in col)
-        ws.column_dimensions[col[0].column_letter].width = min(max_len + 4, 40)
-
-    # Write to buffer and return
-    buffer = BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
+    # Rows stream straight from a chunked DB cursor into the zip — memory stays flat
+    rows = (
+        Booking.objects.order_by('id')
+        .values_list(*BOOKING_EXPORT_FIELDS)
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+    def format_row(row):
+        (booking_id, name, phone, email, event_type, from_date, to_date, start_time, end_time,
+         booking_status, estimated_guests, food_preference, alternate_phone, message) = row
+        return [
+            booking_id,
+            name,
+            phone,
+            email,
+            event_type,
+            str(from_date) if from_date else '',
+            str(to_date) if to_date else '',
+            str(start_time) if start_time else '',
+            str(end_time) if end_time else '',
+            booking_status,
+            estimated_guests,
+            food_preference or '',
+            alternate_phone or '',
+            message or '',
+        ]
 
     today = datetime.now().strftime("%Y-%m-%d")
-    response = HttpResponse(
-        buffer.read(),
+    response = StreamingHttpResponse(
+        stream_xlsx("Bookings", BOOKING_EXPORT_HEADERS, map(format_row, rows)),
         content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
     )
     response['Content-Disposition'] = f'attachment; filename="sri_vari_mahal_bookings_{today}.xlsx"'
     return response
 
+
 # ======================================================
 # 🟣 UPDATE BOOKING STATUS (Admin Only)
 # ======================================================
@@ -303,7 +449,10 @@ def export_bookings_csv(request):
 @permission_classes([IsAuthenticated])
 def update_booking_status(request, pk):
     try:
-        booking = Booking.objects.get(id=pk)
+        booking = Booking.objects.select_related('balance').get(id=pk)
+        failed = precondition_failed(request, booking)
+        if failed is not None:
+            return failed
         new_status = request.data.get("status")
         if not new_status:
             return Response(
@@ -322,8 +471,15 @@ def update_booking_status(request, pk):
                 "message": f"Status updated to {new_status}.",
                 "booking": BookingSerializer(booking).data
             },
-            status=status.HTTP_200_OK
+            status=status.HTTP_200_OK,
+            headers={'ETag': booking_etag(booking.version)}
         )
+    except BookingVersionConflict:
+        return version_conflict(request)
+    except IntegrityError as e:
+        if not is_overlap_error(e):
+            raise
+        return Response({"error": OVERLAP_MESSAGE}, status=status.HTTP_400_BAD_REQUEST)
     except Booking.DoesNotExist:
         return Response(
             {"error": "Booking not found."}, 
@@ -343,74 +499,102 @@ def update_booking_status(request, pk):
 @permission_classes([AllowAny])   # payment can be updated by user or webhook
 def update_payment(request, pk):
     """
-    Called by frontend AFTER verifying payment success.
+    Called by frontend AFTER verifying payment success; appends the payment
+    to the booking's ledger.
     Example body:
     {
-        "amount_paid": 3000
+        "amount_paid": 3000,
+        "reference": "pi_123"   (optional: a repeated reference is recorded once)
     }
     """
-    try:
-        booking = Booking.objects.get(id=pk)
-        amount = request.data.get("amount_paid")
-        if amount is None:
-            return Response({"error": "amount_paid is required"}, status=400)
-        booking.paid_amount += float(amount)
-        booking.balance = float(booking.total_amount) - float(booking.paid_amount)
-        if booking.paid_amount >= booking.advance_amount:
-            booking.paid = True
-        booking.save()
-        return Response({"message": "Payment updated", "booking": BookingSerializer(booking).data})
-    except Booking.DoesNotExist:
+    booking = Booking.objects.only('id', 'version').filter(pk=pk).first()
+    if booking is None:
         return Response({"error": "Booking not found"}, status=404)
-    except Exception as e:
+    failed = precondition_failed(request, booking)
+    if failed is not None:
+        return failed
+    if not isinstance(request.data, dict):
+        return Response({"error": "Request body must be a JSON object."}, status=400)
+
+    amount = request.data.get("amount_paid")
+    if amount is None:
+        return Response({"error": "amount_paid is required"}, status=400)
+    reference = str(request.data.get("reference") or "").strip()
+    if len(reference) > 100:
+        return Response({"error": "reference cannot be longer than 100 characters"}, status=400)
+    try:
+        payment, balance, created = record_payment(booking.pk, parse_rupees(amount), reference)
+    except ValueError as e:
         return Response({"error": str(e)}, status=400)
+    except IntegrityError:
+        # The booking was deleted between the lookup and the insert
+        return Response({"error": "Booking not found"}, status=404)
+
+    return Response(
+        {
+            "message": "Payment recorded" if created else "Payment already recorded",
+            "payment": {
+                "id": payment.id,
+                "amount": f"{payment.amount:.2f}",
+                "reference": payment.reference,
+                "created_at": payment.created_at,
+            },
+            "total_amount": f"{balance.total_amount:.2f}",
+            "paid_amount": f"{balance.paid_amount:.2f}",
+            "balance_due": f"{balance.due:.2f}",
+            "payment_status": balance.payment_status,
+        },
+        status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        headers={'ETag': booking_etag(booking.version)},
+    )
 
 # ======================================================
 # 🟣 CREATE PAYMENT INTENT (Stripe)
 # ======================================================
+def payment_intent_response(data, headers):
+    """``(payload, status)`` for a payment intent request; shared with the async view."""
+    if not isinstance(data, dict):
+        return {"error": "Request body must be a JSON object."}, 400
+    booking = None
+    booking_id = data.get("booking_id")
+    if booking_id not in (None, ""):
+        try:
+            booking = (
+                Booking.objects.select_related('balance')
+                .only('id', 'version', 'balance__payment_count')
+                .filter(pk=int(booking_id)).first()
+            )
+        except (TypeError, ValueError):
+            return {"error": "booking_id must be an integer"}, 400
+        if booking is None:
+            return {"error": "Booking not found"}, 404
+    try:
+        intent = create_intent(data.get("amount"), booking=booking, client_key=headers.get('Idempotency-Key'))
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    except PaymentGatewayError as e:
+        return {"error": str(e)}, 502
+    return {"clientSecret": intent.client_secret}, 200
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def create_payment_intent(request):
     """
     FRONTEND calls:
     {
-        "amount": 5000
+        "amount": 5000,
+        "booking_id": 12    (optional: repeat calls reuse the booking's open intent)
     }
+    Without a booking, send an ``Idempotency-Key`` header so retries don't create a second intent.
     """
-    try:
-        amount = int(float(request.data["amount"]) * 100)  # ₹ to paise
-        intent = stripe.PaymentIntent.create(
-            amount=amount,
-            currency="inr",
-            automatic_payment_methods={"enabled": True}
-        )
-        return Response({"clientSecret": intent["client_secret"]})
-    except Exception as e:
-        return Response({"error": str(e)}, status=400)
-
+    payload, status_code = payment_intent_response(request.data, request.headers)
+    return Response(payload, status=status_code)
 
 # ======================================================
 # 📄 BOOKING RECEIPT (PDF) - Updated with GET support
 # ======================================================
 
-def draw_modern_header(c, doc):
-    """Draw modern header with gradient background"""
-    width, height = A4
-    
-    # Top gradient banner - compact
-    c.setFillColor(colors.HexColor("#1a237e"))
-    c.rect(0, height - 75, width, 75, fill=1, stroke=0)
-    
-    # Accent stripe
-    c.setFillColor(colors.HexColor("#00bcd4"))
-    c.rect(0, height - 82, width, 7, fill=1, stroke=0)
-    
-    # Bottom accent line
-    c.setStrokeColor(colors.HexColor("#00bcd4"))
-    c.setLineWidth(2)
-    c.line(40, height - 88, width - 40, height - 88)
-
-
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def booking_receipt(request, pk):
@@ -424,360 +608,142 @@ def booking_receipt(request, pk):
     issue_date_str = request.GET.get('issue_date')
     admin_remarks = request.GET.get('admin_remarks', '')
 
-    print("=" * 50)
-    print("GENERATING RECEIPT")
-    print(f"Booking ID: {pk}")
-    print(f"Receipt Number: {receipt_number}")
-    print(f"Booking Date: {issue_date_str}")
-    print(f"Admin Remarks: '{admin_remarks}'")
-    print(f"Admin Remarks Length: {len(admin_remarks)}")
-    print(f"Has Admin Remarks: {bool(admin_remarks and admin_remarks.strip())}")
-    print("=" * 50)
-
-    # Parse issue date
-    if issue_date_str:
-        try:
-            issue_date = datetime.strptime(issue_date_str, '%Y-%m-%d')
-        except:
-            issue_date = booking.created_at
-    else:
-        issue_date = booking.created_at
-
-    response = HttpResponse(content_type="application/pdf")
-    response["Content-Disposition"] = f'attachment; filename="Receipt_{receipt_number.replace("/", "_")}.pdf"'
-
-    # Create PDF with optimized margins
-    doc = SimpleDocTemplate(
-        response,
-        pagesize=A4,
-        rightMargin=38,
-        leftMargin=38,
-        topMargin=98,
-        bottomMargin=32
+    logger.debug(
+        "Receipt for booking %s: number=%s issue_date=%s remarks=%r",
+        pk, receipt_number, issue_date_str, admin_remarks,
     )
 
-    styles = getSampleStyleSheet()
-    story = []
-
-    # Custom Styles
-    label_style = ParagraphStyle(
-        'Label',
-        parent=styles['Normal'],
-        fontSize=10,
-        textColor=colors.HexColor("#555555"),
-        alignment=TA_LEFT,
-        fontName='Helvetica-Bold',
-        leading=13
-    )
+    context = receipt_context(booking, receipt_number, issue_date_str, admin_remarks)
+    digest = receipt_digest(context)
+    etag = f'"{digest}"'
 
-    value_style = ParagraphStyle(
-        'Value',
-        parent=styles['Normal'],
-        fontSize=11,
-        textColor=colors.HexColor("#212121"),
-        alignment=TA_LEFT,
-        fontName='Helvetica',
-        leading=14
-    )
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
 
-    section_style = ParagraphStyle(
-        'SectionHeader',
-        parent=styles['Heading2'],
-        fontSize=12,
-        textColor=colors.HexColor("#1a237e"),
-        spaceAfter=3,
-        spaceBefore=5,
-        alignment=TA_LEFT,
-        fontName='Helvetica-Bold',
-        leftIndent=10
-    )
+    # ✅ Rendered once per distinct content, then served from disk
+    try:
+        receipt = receipt_cache.get_or_render(context, digest)
+    except Exception as e:
+        logger.exception("Receipt rendering failed for booking %s", pk)
+        return HttpResponse(f"PDF generation failed: {str(e)}", status=500)
 
-    footer_style = ParagraphStyle(
-        'Footer',
-        parent=styles['Normal'],
-        fontSize=9,
-        textColor=colors.HexColor("#616161"),
-        alignment=TA_CENTER,
-        leading=11
+    response = FileResponse(
+        receipt,
+        as_attachment=True,
+        filename=receipt_filename(context),
+        content_type="application/pdf"
     )
+    response['ETag'] = etag
+    return response
 
-    # Receipt Info Bar
-    story.append(Spacer(1, 5))
+# ======================================================
+# 📦 BULK RECEIPTS (ZIP)
+#     GET /api/bookings/receipts/?ids=1,2,3
+#     GET /api/bookings/receipts/?from=2025-01-01&to=2025-01-31
+# ======================================================
+MAX_BULK_RECEIPTS = 500
 
-    # Format issue date
-    if isinstance(issue_date, datetime):
-        formatted_issue_date = issue_date.strftime('%d %b %Y')
-    else:
-        formatted_issue_date = issue_date.strftime('%d %b %Y') if hasattr(issue_date, 'strftime') else str(issue_date)
 
-    # Add a right-aligned style just for the booking date cell
-    receipt_right_style = ParagraphStyle(
-        'ReceiptRight',
-        parent=value_style,
-        alignment=TA_RIGHT,
-    )
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def bulk_receipts(request):
+    bookings = Booking.objects.order_by('from_date', 'id')
+    try:
+        if request.GET.get('ids'):
+            ids = [int(i) for i in request.GET['ids'].split(',') if i.strip()]
+            bookings = bookings.filter(id__in=ids)
+        elif request.GET.get('from') or request.GET.get('to'):
+            if request.GET.get('from'):
+                bookings = bookings.filter(from_date__gte=datetime.strptime(request.GET['from'], '%Y-%m-%d').date())
+            if request.GET.get('to'):
+                bookings = bookings.filter(from_date__lte=datetime.strptime(request.GET['to'], '%Y-%m-%d').date())
+        else:
+            return Response(
+                {"error": "Pass ids=1,2,3 or a from/to date range."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+    except ValueError:
+        return Response(
+            {"error": "ids must be integers; from/to must be YYYY-MM-DD."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
 
-    receipt_data = [
-        [
-            Paragraph(f"<b>Receipt:</b> {receipt_number}", value_style),
-            Paragraph(f"<b>Booking Date:</b> {formatted_issue_date}", receipt_right_style),
-        ]
-    ]
+    bookings = list(bookings[:MAX_BULK_RECEIPTS + 1])
+    if not bookings:
+        return Response({"error": "No bookings matched."}, status=status.HTTP_404_NOT_FOUND)
+    if len(bookings) > MAX_BULK_RECEIPTS:
+        return Response(
+            {"error": f"At most {MAX_BULK_RECEIPTS} receipts per download."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
 
-    status_colors = {
-        'pending': colors.HexColor("#fff9e6"),
-        'approved': colors.HexColor("#e8f5e9"),
-        'rejected': colors.HexColor("#ffebee")
-    }
+    contexts = [receipt_context(booking) for booking in bookings]
+    today = datetime.now().strftime("%Y-%m-%d")
+    response = StreamingHttpResponse(stream_receipts_zip(contexts), content_type="application/zip")
+    response['Content-Disposition'] = f'attachment; filename="receipts_{today}.zip"'
+    return response
 
-    receipt_table = Table(receipt_data, colWidths=[270, 270])
-    receipt_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, -1), status_colors.get(booking.status.lower(), colors.HexColor("#f5f5f5"))),
-        ('BOX', (0, 0), (-1, -1), 1.5, colors.HexColor("#00bcd4")),
-        ('ALIGN', (0, 0), (0, 0), 'LEFT'),
-        ('VALIGN', (1, 0), (1, 0), 'RIGHT'),
-        ('TOPPADDING', (0, 0), (-1, -1), 9),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 9),
-        ('LEFTPADDING', (0, 0), (-1, -1), 12),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 12),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-    ]))
-
-    story.append(receipt_table)
-    story.append(Spacer(1, 10))
-
-    # Customer Information
-    story.append(Paragraph("CUSTOMER INFORMATION", section_style))
-    story.append(Spacer(1, 2))
-
-    customer_data = [
-        [Paragraph("Full Name", label_style), Paragraph(booking.name, value_style)],
-        [Paragraph("Contact", label_style), Paragraph(booking.phone or "NA", value_style)],
-        [Paragraph("Email", label_style), Paragraph(booking.email or "NA", value_style)],
-        [Paragraph("Address", label_style), Paragraph(booking.address_line or "NA", value_style)],
-    ]
-
-    customer_table = Table(customer_data, colWidths=[130, 410])
-    customer_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor("#e3f2fd")),
-        ('LINEBELOW', (0, 0), (-1, -2), 0.5, colors.HexColor("#90caf9")),
-        ('LINEBELOW', (0, -1), (-1, -1), 0, colors.white),
-        ('TOPPADDING', (0, 0), (-1, -1), 5),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-        ('LEFTPADDING', (0, 0), (-1, -1), 12),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 12),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-    ]))
-
-    story.append(customer_table)
-    story.append(Spacer(1, 10))
-
-    # Event Details
-    story.append(Paragraph("EVENT DETAILS", section_style))
-    story.append(Spacer(1, 2))
-
-    same_day = booking.from_date == booking.to_date
-    if same_day:
-        event_date_str = booking.from_date.strftime('%d %B %Y')
-    else:
-        event_date_str = f"{booking.from_date.strftime('%d %b')} - {booking.to_date.strftime('%d %b %Y')}"
-
-    event_data = [
-        [Paragraph("Event Type", label_style), Paragraph(booking.event_type, value_style)],
-        [Paragraph("Event Date", label_style), Paragraph(event_date_str, value_style)],
-        [Paragraph("Event Time", label_style), Paragraph(
-            f"{booking.start_time.strftime('%I:%M %p') if booking.start_time else 'N/A'} - "
-            f"{booking.end_time.strftime('%I:%M %p') if booking.end_time else 'N/A'}",
-            value_style
-        )],
-        [Paragraph("Expected Guests", label_style), Paragraph(f"{booking.estimated_guests} Guests", value_style)],
-        [Paragraph("Food Preference", label_style), Paragraph(booking.food_preference or "To be decided", value_style)],
-    ]
-
-    event_table = Table(event_data, colWidths=[130, 410])
-    event_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor("#e3f2fd")),
-        ('LINEBELOW', (0, 0), (-1, -2), 0.5, colors.HexColor("#90caf9")),
-        ('LINEBELOW', (0, -1), (-1, -1), 0, colors.white),
-        ('TOPPADDING', (0, 0), (-1, -1), 5),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-        ('LEFTPADDING', (0, 0), (-1, -1), 12),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 12),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-    ]))
-
-    story.append(event_table)
-
-    # Special Requests
-    if booking.message:
-        story.append(Spacer(1, 10))
-        story.append(Paragraph("ADDITIONAL INQUERIES", section_style))
-        story.append(Spacer(1, 2))
-        message_data = [[Paragraph(booking.message, value_style)]]
-        message_table = Table(message_data, colWidths=[540])
-        message_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor("#fff3e0")),
-            ('BOX', (0, 0), (-1, -1), 1, colors.HexColor("#ffb74d")),
-            ('TOPPADDING', (0, 0), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('LEFTPADDING', (0, 0), (-1, -1), 12),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 12),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ]))
-
-        story.append(message_table)
-
-    # Admin Remarks
-    if admin_remarks and admin_remarks.strip():
-        print("✅ Adding admin remarks to PDF")
-        story.append(Spacer(1, 10))
-        story.append(Paragraph("FURTHER DETAILS", section_style))
-        story.append(Spacer(1, 2))
-
-        from html import escape
-        safe_remarks = escape(admin_remarks)
-        remarks_data = [[Paragraph(safe_remarks, value_style)]]
-        remarks_table = Table(remarks_data, colWidths=[540])
-        remarks_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor("#fffbe6")),
-            ('BOX', (0, 0), (-1, -1), 1.5, colors.HexColor("#ffc107")),
-            ('TOPPADDING', (0, 0), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('LEFTPADDING', (0, 0), (-1, -1), 12),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 12),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ]))
-
-        story.append(remarks_table)
-    else:
-        print("⚠️ No admin remarks to add")
 
-    # Status Badge
-    story.append(Spacer(1, 12))
+# ======================================================
+# 📥 BULK IMPORT
+#     POST /api/bookings/import/            multipart "file" (.csv / .xlsx / .json)
+#     POST /api/bookings/import/            JSON body: [{...}, {...}]
+#     ?dry_run=1 validates without inserting
+# ======================================================
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_import_bookings(request):
+    try:
+        upload = request.FILES.get('file')
+        if upload is not None:
+            rows = read_rows(upload.file, request.data.get('format') or detect_format(upload.name))
+        elif isinstance(request.data, list) or 'bookings' in request.data:
+            rows = normalize_rows(request.data)
+        else:
+            return Response(
+                {"error": "Upload a CSV/XLSX/JSON file as 'file' or post a JSON list of bookings."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+    except ImportFormatError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    dry_run = request.GET.get('dry_run') in ('1', 'true')
+    report = import_bookings(rows, dry_run=dry_run)
+    if dry_run:
+        code = status.HTTP_200_OK
+    elif report['created']:
+        code = status.HTTP_201_CREATED
+    else:
+        code = status.HTTP_400_BAD_REQUEST
+    return Response(report, status=code)
 
-    status_badge_colors = {
-        'pending': (colors.HexColor("#fff3cd"), colors.HexColor("#856404")),
-        'approved': (colors.HexColor("#d4edda"), colors.HexColor("#155724")),
-        'rejected': (colors.HexColor("#f8d7da"), colors.HexColor("#721c24"))
-    }
 
-    bg_color, text_color = status_badge_colors.get(
-        booking.status.lower(),
-        (colors.HexColor("#e0e0e0"), colors.black)
+# ======================================================
+# 📈 METRICS (Prometheus text format)
+#     GET /api/metrics/
+# ======================================================
+@require_GET
+def metrics(request):
+    if not settings.API_METRICS_ENABLED:
+        return HttpResponse("Metrics are disabled.", status=404, content_type="text/plain")
+    token = settings.API_METRICS_TOKEN
+    if not token and not settings.DEBUG:
+        return HttpResponse("Set API_METRICS_TOKEN to serve metrics.", status=403, content_type="text/plain")
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}"):
+        return HttpResponse("Unauthorized", status=401, content_type="text/plain")
+
+    queue = outbox_stats()
+    gauges = (
+        ('api_outbox_depth', "Emails waiting to be sent.", queue['depth']),
+        ('api_outbox_failed', "Emails that gave up after the last retry.", queue['failed']),
+        ('api_outbox_oldest_age_seconds', "Age of the oldest waiting email.", queue['oldest_age_seconds']),
     )
-
-    status_para = ParagraphStyle(
-        'StatusBadge',
-        parent=styles['Normal'],
-        fontSize=13,
-        textColor=text_color,
-        alignment=TA_CENTER,
-        fontName='Helvetica-Bold'
+    return HttpResponse(
+        request_metrics.render(gauges),
+        content_type="text/plain; version=0.0.4; charset=utf-8"
     )
 
-    status_data = [[Paragraph(f"BOOKING STATUS: {booking.status.upper()}", status_para)]]
-    status_table = Table(status_data, colWidths=[540])
-    status_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, -1), bg_color),
-        ('BOX', (0, 0), (-1, -1), 2, text_color),
-        ('TOPPADDING', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-    ]))
-
-    story.append(status_table)
-    story.append(Spacer(1, 10))
-
-    # Footer
-    divider = Table([['']], colWidths=[540])
-    divider.setStyle(TableStyle([
-        ('LINEABOVE', (0, 0), (-1, -1), 1.5, colors.HexColor("#00bcd4")),
-    ]))
-    story.append(divider)
-    story.append(Spacer(1, 6))
-
-    story.append(Paragraph(
-        "<b>Thank You for Choosing Sri Vari Thirumana Mandapam A/C</b>",
-        ParagraphStyle('ThankYou', parent=styles['Normal'], fontSize=11,
-                       textColor=colors.HexColor("#1a237e"), alignment=TA_CENTER,
-                       fontName='Helvetica-Bold', spaceAfter=4)
-    ))
-
-    story.append(Paragraph(
-        "<b>We look forward to making your celebration truly memorable.</b>",
-        footer_style
-    ))
-    story.append(Spacer(1, 5))
-
-    contact_data = [
-        [Paragraph("<b>Phone: +91 98431 86231 | +91 88702 01981</b>", footer_style)],
-        [Paragraph("<b>Email: srivarimahal2025kpm@gmail.com</b>", footer_style)],
-        [Paragraph("<b>Sri Vari Thirumana Mandapam A/C - Grand Marriage & Party Hall, Kannadasan Street, Abirami Nagar, Baluchetty Chatram, Sirunaiperugal, Kanchipuram - 631551</b>", footer_style)]
-    ]
-
-    contact_table = Table(contact_data, colWidths=[540])
-    contact_table.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('TOPPADDING', (0, 0), (-1, -1), 2),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
-    ]))
-
-    story.append(contact_table)
-    story.append(Spacer(1, 5))
-
-    # ✅ first_page defined INSIDE booking_receipt
-    def first_page(c, doc):
-        width, height = A4
-
-        # Watermark
-        try:
-            webp_path = os.path.join(settings.BASE_DIR, "static", "images", "2025-09-16-converted.png")
-            img = Image.open(webp_path).convert("RGBA")
-            r, g, b, a = img.split()
-            a = a.point(lambda i: int(i * 0.35))
-            img.putalpha(a)
-
-            png_buffer = BytesIO()
-            img.save(png_buffer, format="PNG")
-            png_buffer.seek(0)
-
-            c.saveState()
-            c.drawImage(
-                ImageReader(png_buffer),
-                0, 0,
-                width=width,
-                height=height,
-                mask='auto',
-                preserveAspectRatio=False
-            )
-            c.restoreState()
-        except Exception as e:
-            print(f"⚠️ Watermark skipped: {e}")
-            try:
-                c.restoreState()
-            except:
-                pass
-
-        # Header
-        c.saveState()
-        draw_modern_header(c, doc)
-        c.setFont('Helvetica-Bold', 20)
-        c.setFillColor(colors.white)
-        c.drawCentredString(width / 2, height - 35, "Sri Vari Thirumana Mandapam A/C")
-        c.setFont('Helvetica', 9)
-        c.setFillColor(colors.HexColor("#b3e5fc"))
-        c.drawCentredString(width / 2, height - 50, "Grand Marriage & Party Hall")
-        c.drawCentredString(width / 2, height - 62, "Booking Confirmation Receipt")
-        c.restoreState()
-
-    # ✅ Build PDF and return — both INSIDE booking_receipt
-    try:
-        doc.build(story, onFirstPage=first_page)
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return HttpResponse(f"PDF generation failed: {str(e)}", status=500)
-    return response
 
 # ======================================================
 # EXPENSES MANAGEMENT
@@ -819,24 +785,61 @@ def expense_detail(request, pk):
         return Response(status=204)
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def expenses_summary(request):
+    """
+    Monthly income, costs, net and per-category sums, so the expenses page
+    doesn't have to fetch every row and add them up itself.
+      ?year=2025               → that calendar year
+      ?from=2025-01&to=2025-06 → month range (either end may be omitted)
+    """
+    try:
+        first_day, last_day = month_range(
+            request.GET.get('year'), request.GET.get('from'), request.GET.get('to')
+        )
+    except ValueError:
+        return Response({"error": STATS_PARAMS_ERROR}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(expense_summary(first_day, last_day))
+
+
+EXPENSE_EXPORT_HEADERS = [
+    "Function Date", "Advance", "Balance", "Damage Recovery",
+    "Gens", "Ladies", "Flag", "Waste Cleaning",
+    "Electrician", "Radio", "Light", "Total"
+]
+
+EXPENSE_EXPORT_FIELDS = [
+    'function_date', 'advance', 'balance', 'damage_recovery',
+    'gens', 'ladies', 'flag', 'waste_room_cleaning',
+    'electrician', 'radio', 'light', 'total'
+]
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def export_expenses(request):
-    response = HttpResponse(content_type="text/csv")
-    response['Content-Disposition'] = 'attachment; filename="expenses.csv"'
-
-    writer = csv.writer(response)
-    writer.writerow([
-        "Function Date", "Advance", "Balance", "Damage Recovery",
-        "Gens", "Ladies", "Flag", "Waste Cleaning",
-        "Electrician", "Radio", "Light", "Total"
-    ])
-
-    for e in Expense.objects.all():
-        writer.writerow([
-            e.function_date, e.advance, e.balance, e.damage_recovery,
-            e.gens, e.ladies, e.flag, e.waste_room_cleaning,
-            e.electrician, e.radio, e.light, e.total
-        ])
-
-    return response
\ No newline at end of file
+    """
+    Streams expenses as CSV.
+      ?from=YYYY-MM-DD&to=YYYY-MM-DD → filter on function_date
+      ?gzip=1                        → download expenses.csv.gz, compressed on the fly
+    """
+    expenses = Expense.objects.order_by('function_date', 'id')
+    try:
+        if request.GET.get('from'):
+            expenses = expenses.filter(function_date__gte=datetime.strptime(request.GET['from'], '%Y-%m-%d').date())
+        if request.GET.get('to'):
+            expenses = expenses.filter(function_date__lte=datetime.strptime(request.GET['to'], '%Y-%m-%d').date())
+    except ValueError:
+        return Response({"error": "from/to must be YYYY-MM-DD."}, status=status.HTTP_400_BAD_REQUEST)
+
+    rows = expenses.values_list(*EXPENSE_EXPORT_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    content = csv_stream(EXPENSE_EXPORT_HEADERS, rows)
+
+    if request.GET.get('gzip') in ('1', 'true'):
+        response = StreamingHttpResponse(gzip_stream(content), content_type="application/gzip")
+        response['Content-Disposition'] = 'attachment; filename="expenses.csv.gz"'
+    else:
+        response = StreamingHttpResponse(content, content_type="text/csv")
+        response['Content-Disposition'] = 'attachment; filename="expenses.csv"'
+    return response
@@ -0,0 +1,154 @@
+"""
+Minimal streaming XLSX writer.
+
+openpyxl keeps the whole workbook (or, in write-only mode, a temp file) until
+``save()``; this writer emits the zip parts as rows arrive so the response
+starts immediately and memory stays flat. It supports one sheet of inline
+strings and numbers with a styled header row — what the exports need.
+"""
+import re
+import zipfile
+from itertools import chain, islice
+from xml.sax.saxutils import escape
+
+from openpyxl.utils import get_column_letter
+
+from .streaming import StreamBuffer
+
+# Rows used to size the columns; the rest of the export streams unsized
+WIDTH_SAMPLE_ROWS = 200
+ROWS_PER_CHUNK = 500
+
+_ILLEGAL_XML_CHARS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+
+ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{title}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+# Style 1 is the header: bold white text, centred, on the export blue
+STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="2">'
+    '<font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><color rgb="FFFFFFFF"/><name val="Calibri"/></font>'
+    '</fonts>'
+    '<fills count="3">'
+    '<fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill>'
+    '<fill><patternFill patternType="solid"><fgColor rgb="FF{header_fill}"/><bgColor indexed="64"/></patternFill></fill>'
+    '</fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="2">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="2" borderId="0" xfId="0" applyFont="1" applyFill="1" applyAlignment="1">'
+    '<alignment horizontal="center" vertical="center"/></xf>'
+    '</cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+)
+SHEET_END = '</sheetData></worksheet>'
+
+
+def _cell(ref, value, style=''):
+    if value is None or value == '':
+        return ''
+    if isinstance(value, bool):
+        return f'<c r="{ref}" t="b"{style}><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c r="{ref}"{style}><v>{value}</v></c>'
+    text = escape(_ILLEGAL_XML_CHARS.sub('', str(value)))
+    return f'<c r="{ref}" t="inlineStr"{style}><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def column_widths(headers, sample_rows, padding=4, maximum=40):
+    """Size each column from the header and a prefix of the rows."""
+    widths = [len(str(h)) for h in headers]
+    for row in sample_rows:
+        for i, value in enumerate(row):
+            if value not in (None, ''):
+                widths[i] = max(widths[i], len(str(value)))
+    return [min(width + padding, maximum) for width in widths]
+
+
+def stream_xlsx(title, headers, rows, header_fill='4B6CB7'):
+    """Yield the bytes of a one-sheet workbook built from ``headers`` and the ``rows`` iterable."""
+    rows = iter(rows)
+    sample = list(islice(rows, WIDTH_SAMPLE_ROWS))
+    letters = [get_column_letter(i) for i in range(1, len(headers) + 1)]
+
+    buffer = StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as workbook:
+        workbook.writestr('[Content_Types].xml', CONTENT_TYPES)
+        workbook.writestr('_rels/.rels', ROOT_RELS)
+        workbook.writestr('xl/workbook.xml', WORKBOOK.format(title=escape(title)))
+        workbook.writestr('xl/_rels/workbook.xml.rels', WORKBOOK_RELS)
+        workbook.writestr('xl/styles.xml', STYLES.format(header_fill=header_fill))
+        yield buffer.drain()
+
+        with workbook.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            cols = ''.join(
+                f'<col min="{i}" max="{i}" width="{width}" customWidth="1"/>'
+                for i, width in enumerate(column_widths(headers, sample), 1)
+            )
+            header = ''.join(_cell(f'{letter}1', h, ' s="1"') for letter, h in zip(letters, headers))
+            sheet.write(f'{SHEET_START}<cols>{cols}</cols><sheetData><row r="1">{header}</row>'.encode())
+
+            row_number = 1
+            pending = []
+            for row in chain(sample, rows):
+                row_number += 1
+                cells = ''.join(_cell(f'{letter}{row_number}', value) for letter, value in zip(letters, row))
+                pending.append(f'<row r="{row_number}">{cells}</row>')
+                if len(pending) >= ROWS_PER_CHUNK:
+                    sheet.write(''.join(pending).encode())
+                    pending.clear()
+                    yield buffer.drain()
+            sheet.write((''.join(pending) + SHEET_END).encode())
+
+    yield buffer.drain()
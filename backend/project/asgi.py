@@ -0,0 +1,7 @@
+import os
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
+from django.core.asgi import get_asgi_application
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project.settings')
+os.environ.setdefault('DJANGO_ASGI_MODE', 'True')
+# WhiteNoise's middleware is sync-only, so static files are served here instead
+application = ASGIStaticFilesHandler(get_asgi_application())
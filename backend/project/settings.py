@@ -47,6 +47,7 @@ INSTALLED_APPS = [
 # Middleware
 # ------------------------------------------------
 MIDDLEWARE = [
+    'api.middleware.RequestIdMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -56,8 +57,23 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.RequestMetricsMiddleware',
 ]
 
+# Set by project/asgi.py. Routes the async views and drops WhiteNoise's
+# sync-only middleware (asgi.py serves static files itself), so a request
+# never has to leave the event loop for a thread just to pass through it
+ASGI_MODE = os.getenv('DJANGO_ASGI_MODE', 'False') == 'True'
+if ASGI_MODE:
+    MIDDLEWARE.remove('whitenoise.middleware.WhiteNoiseMiddleware')
+
+# Per-view timings, query counts and response sizes at /api/metrics/ plus a
+# Server-Timing header; the middleware removes itself when this is off
+API_METRICS_ENABLED = os.getenv('API_METRICS_ENABLED', 'True') == 'True'
+# /api/metrics/ requires "Authorization: Bearer <token>"; without a token it
+# is only served when DEBUG is on
+API_METRICS_TOKEN = os.getenv('API_METRICS_TOKEN', '')
+
 # ------------------------------------------------
 # URLs & Templates
 # ------------------------------------------------
@@ -79,17 +95,33 @@ TEMPLATES = [
     },
 ]
 
+# JSON lines tagged with the request's correlation ID; records are queued on the
+# request thread and formatted/written by a listener thread (api.log)
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'formatters': {
+        'json': {
+            '()': 'api.log.JsonFormatter',
+        },
+    },
+    'filters': {
+        'request_id': {
+            '()': 'api.log.RequestIdFilter',
+        },
+    },
     'handlers': {
         'console': {
-            'class': 'logging.StreamHandler',
+            'class': 'api.log.QueueStreamHandler',
+            'filters': ['request_id'],
+            'formatter': 'json',
         },
     },
     'root': {
         'handlers': ['console'],
-        'level': 'INFO',
+        'level': LOG_LEVEL,
     },
     'loggers': {
         'django': {
@@ -112,6 +144,35 @@ DATABASES = {
     )
 }
 
+# ------------------------------------------------
+# Cache (per-process by default; set REDIS_URL to share it between workers)
+# ------------------------------------------------
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'srivari-mahal',
+    }
+}
+
+if os.environ.get('REDIS_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',  # needs the redis package
+        'LOCATION': os.environ['REDIS_URL'],
+    }
+
+# Seconds a cache version token (calendar, expense summary, analytics) lives.
+# The default cache is per process, so this bounds how long other workers serve
+# data from before a write; with a shared cache writes reach every worker at once.
+CACHE_VERSION_TTL = int(os.getenv(
+    'CACHE_VERSION_TTL', str(24 * 60 * 60) if os.environ.get('REDIS_URL') else '60'
+))
+
+# Seconds the in-process availability index may serve before reloading
+AVAILABILITY_INDEX_TTL = int(os.getenv('AVAILABILITY_INDEX_TTL', '60'))
+
+# Days from today covered by the free-slot search's occupancy map
+OCCUPANCY_HORIZON_DAYS = int(os.getenv('OCCUPANCY_HORIZON_DAYS', str(5 * 366)))
+
 # ------------------------------------------------
 # Static & Media
 # ------------------------------------------------
@@ -121,6 +182,12 @@ STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")  # Fixed path join
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Upper bound for rendered receipt PDFs kept under MEDIA_ROOT/receipts
+RECEIPT_CACHE_MAX_BYTES = int(os.getenv('RECEIPT_CACHE_MAX_BYTES', str(100 * 1024 * 1024)))
+
+# Processes rendering bulk receipt downloads (default: min(4, CPU count))
+RECEIPT_RENDER_WORKERS = int(os.getenv('RECEIPT_RENDER_WORKERS', '0')) or None
+
 # ------------------------------------------------
 # CORS — Allow Frontend
 # ------------------------------------------------
@@ -152,12 +219,19 @@ CORS_ALLOW_HEADERS = [
     'authorization',
     'content-type',
     'dnt',
+    'idempotency-key',
+    'if-match',
+    'if-none-match',
     'origin',
     'user-agent',
     'x-csrftoken',
+    'x-request-id',
     'x-requested-with',
 ]
 
+# Let the frontend read booking versions for If-Match and request IDs for bug reports
+CORS_EXPOSE_HEADERS = ['etag', 'x-request-id']
+
 CSRF_TRUSTED_ORIGINS = [
     "https://srivarimahalac.netlify.app",
     "https://srivari-mahal.onrender.com",
@@ -201,8 +275,26 @@ if DEBUG:
     print(f"📧 Password length: {len(EMAIL_HOST_PASSWORD)}")
 
 # ------------------------------------------------
-# PAYMENT SETTINGS (Razorpay Placeholder)
+# PAYMENT SETTINGS
 # ------------------------------------------------
+STRIPE_SECRET_KEY = os.getenv('STRIPE_SECRET_KEY', '')
+
+# api.payments.StubGateway never touches the network: the default in development
+# until a Stripe key is set, and what tests and load tests use
+PAYMENT_GATEWAY = os.getenv(
+    'PAYMENT_GATEWAY',
+    'api.payments.StubGateway' if DEBUG and not STRIPE_SECRET_KEY else 'api.payments.StripeGateway',
+)
+
+# Seconds; a stuck Stripe call fails the request instead of pinning a worker
+STRIPE_CONNECT_TIMEOUT = float(os.getenv('STRIPE_CONNECT_TIMEOUT', '3'))
+STRIPE_READ_TIMEOUT = float(os.getenv('STRIPE_READ_TIMEOUT', '10'))
+STRIPE_MAX_RETRIES = int(os.getenv('STRIPE_MAX_RETRIES', '2'))
+
+# Seconds each StubGateway call sleeps, to stand in for Stripe's latency in load tests
+PAYMENT_STUB_LATENCY = float(os.getenv('PAYMENT_STUB_LATENCY', '0'))
+
+# Razorpay placeholder
 # RAZORPAY_KEY_ID = os.getenv("RAZORPAY_KEY_ID", "rzp_test_xxxxxxxxx")
 # RAZORPAY_KEY_SECRET = os.getenv("RAZORPAY_KEY_SECRET", "xxxxxxxxxxxxxxx")
 